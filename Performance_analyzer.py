@@ -1,70 +1,17 @@
-import json
-import matplotlib.pyplot as plt
+import argparse
+import os
 import numpy as np
-import datetime
 from itertools import cycle  
-import base64
-import io
-
-def analyze_performance_data(performance_data):
-   
-
-   
-    titles = [item['quiz']['title'] for item in performance_data]
-    scores = [item['score'] for item in performance_data]
-    accuracies = [float(item['accuracy'].replace("%", "")) for item in performance_data]  
-    submitted_dates = [item['submitted_at'] for item in performance_data]
-    topics = [item['quiz']['topic'] for item in performance_data]
-    total_questions = [item['total_questions'] for item in performance_data]
-    incorrect_answers = [item['incorrect_answers'] for item in performance_data] 
-    correct_answers = [item['correct_answers'] for item in performance_data] 
-
-    
-    dates = [datetime.datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%f+05:30") for date_str in submitted_dates]
-
-    
-    sorted_indices = np.argsort(dates)
-    dates = [dates[i] for i in sorted_indices]
-    titles = [titles[i] for i in sorted_indices]
-    scores = [scores[i] for i in sorted_indices]
-    accuracies = [accuracies[i] for i in sorted_indices]
-    topics = [topics[i] for i in sorted_indices]  
-    total_questions = [total_questions[i] for i in sorted_indices] 
-    incorrect_answers = [incorrect_answers[i] for i in sorted_indices] 
-    correct_answers = [correct_answers[i] for i in sorted_indices]
-
-    
-    average_score = np.mean(scores)
-    highest_score = np.max(scores)
-    lowest_score = np.min(scores)
-    average_accuracy = np.mean(accuracies)
-
-  
-    topic_performance = {}
-    for i, topic in enumerate(topics):
-        if topic in topic_performance:
-            topic_performance[topic]['accuracies'].append(accuracies[i])
-            topic_performance[topic]['scores'].append(scores[i])
-        else:
-            topic_performance[topic] = {'accuracies': [accuracies[i]], 'scores': [scores[i]]}
-
-    topic_insights = {}
-    for topic, data in topic_performance.items():
-        avg_accuracy = np.mean(data['accuracies'])
-        topic_insights[topic] = avg_accuracy
-
-    
-    strong_topics = {k: v for k, v in topic_insights.items() if v >= 75}
-    weak_topics = {k: v for k, v in topic_insights.items() if v < 60}
-
-   
-    score_chart = generate_bar_chart(titles, scores)
-    accuracy_chart = generate_line_chart(dates, accuracies)
-    scatter_chart = generate_scatter_plot(scores, accuracies)
-    topic_chart = generate_topic_chart(topic_insights)
-
-
-    html_content = f"""
+from attempt_history import AttemptHistory
+from chart_cache import chart_cache_key
+from charts import render_chart, render_charts
+from history_stream import iter_history_records
+from mastery_model import STRONG_MASTERY, WEAK_MASTERY, load_mastery_model
+from performance_store import PerformanceStore
+from pipeline_timing import add_instrumentation_arguments, instrument, stage
+from report_renderer import chart_source, compile_template
+
+PERFORMANCE_REPORT_TEMPLATE = compile_template("""
     <!DOCTYPE html>
     <html>
     <head>
@@ -90,95 +37,177 @@ def analyze_performance_data(performance_data):
 
         <div class="section">
             <h2>Topic Performance</h2>
-            <p class="insight"><strong>Strong Topics (Accuracy >= 75%):</strong> {', '.join(strong_topics.keys()) or 'None'}</p>
-            <p class="insight"><strong>Weak Topics (Accuracy < 60%):</strong> {', '.join(weak_topics.keys()) or 'None'}</p>
+            <p class="insight"><strong>Strong Topics ({topic_measure} >= 75%):</strong> {strong_topics}</p>
+            <p class="insight"><strong>Weak Topics ({topic_measure} < 60%):</strong> {weak_topics}</p>
         </div>
 
         <div class="section">
             <h2>Graphs</h2>
-            <img src="data:image/png;base64,{score_chart}" alt="Scores by Quiz Title" class="graph">
-            <img src="data:image/png;base64,{accuracy_chart}" alt="Accuracy Over Time" class="graph">
-            <img src="data:image/png;base64,{scatter_chart}" alt="Score vs Accuracy" class="graph">
-            <img src="data:image/png;base64,{topic_chart}" alt="Average Accuracy by Topic" class="graph">
+            <img src="{score_chart}" alt="Scores by Quiz Title" class="graph">
+            <img src="{accuracy_chart}" alt="Accuracy Over Time" class="graph">
+            <img src="{scatter_chart}" alt="Score vs Accuracy" class="graph">
+            <img src="{topic_chart}" alt="Average Accuracy by Topic" class="graph">
         </div>
     </body>
     </html>
+    """)
+
+def performance_report_context(performance_data, performance_store=None, chart_dir=None, report_dir='.',
+                               chart_executor=None, mastery_model=None):
+    """
+    Builds the performance report's template context from a user's attempt
+    history.
+
+    `performance_data` may be any iterable of attempt records, e.g. the
+    generator returned by `history_stream.iter_history_records`. It is
+    consumed in a single pass into a columnar `AttemptHistory`, so the
+    embedded quiz objects and response maps never accumulate in memory.
+
+    With a `performance_store`, the summary figures are read from the
+    store's running aggregates, which record each submission once as it is
+    scored, instead of being recomputed from the history; the history is
+    not recorded again. Users the store has no attempts for are summarized
+    from the history.
+
+    Charts are rendered on `chart_executor` when given, otherwise on the
+    shared chart pool of `charts.render_charts`.
+
+    With a `mastery_model`, the records are also replayed into it, and the
+    strong and weak topics are read from the user's topic mastery instead
+    of their mean accuracy.
     """
 
-    return html_content
+    if mastery_model is not None:
+        performance_data = mastery_model.record_stream(performance_data)
+
+    with stage('history_load'):
+        history = AttemptHistory.from_records(performance_data)
+        history.sort_by_date()
+
+    dates = history.submitted_at
+    titles = history.title_labels()
+    scores = history.scores
+    accuracies = history.accuracies
+
+    with stage('aggregation'):
+        summary = None
+        if performance_store is not None:
+            summary = performance_store.summary(history.user_id)
+        if summary is None:
+            summary = summarize_history(history)
+
+    average_score = summary['average_score']
+    highest_score = summary['highest_score']
+    lowest_score = summary['lowest_score']
+    average_accuracy = summary['average_accuracy']
+    topic_insights = summary['topic_insights']
+
+    if mastery_model is not None:
+        topic_mastery = mastery_model.topic_mastery(history.user_id)
+        strong_topics = {k: v for k, v in topic_mastery.items() if v >= STRONG_MASTERY}
+        weak_topics = {k: v for k, v in topic_mastery.items() if v < WEAK_MASTERY}
+    else:
+        strong_topics = {k: v for k, v in topic_insights.items() if v >= 75}
+        weak_topics = {k: v for k, v in topic_insights.items() if v < 60}
+
+   
+    chart_specs = [
+        ('bar', (titles, scores)),
+        ('line', (dates, accuracies)),
+        ('scatter', (scores, accuracies)),
+        ('topic', (topic_insights,))
+    ]
+    charts = render_charts(chart_specs, chart_executor)
+    if chart_dir is None:
+        chart_keys = [None] * len(chart_specs)
+    else:
+        chart_keys = [chart_cache_key(chart_type, *chart_data) for chart_type, chart_data in chart_specs]
+    score_chart, accuracy_chart, scatter_chart, topic_chart = [
+        chart_source(chart, chart_dir, chart_key, report_dir) for chart, chart_key in zip(charts, chart_keys)]
+
+    return {
+        'average_score': average_score,
+        'highest_score': highest_score,
+        'lowest_score': lowest_score,
+        'average_accuracy': average_accuracy,
+        'strong_topics': ', '.join(strong_topics.keys()) or 'None',
+        'weak_topics': ', '.join(weak_topics.keys()) or 'None',
+        'topic_measure': 'Mastery' if mastery_model is not None else 'Accuracy',
+        'score_chart': score_chart,
+        'accuracy_chart': accuracy_chart,
+        'scatter_chart': scatter_chart,
+        'topic_chart': topic_chart
+    }
+
+def analyze_performance_data(performance_data, performance_store=None):
+    return PERFORMANCE_REPORT_TEMPLATE.render(
+        performance_report_context(performance_data, performance_store))
+
+def write_performance_report(performance_data, out, performance_store=None, chart_dir=None, report_dir='.',
+                             mastery_model=None):
+    """
+    Streams the performance report to `out`. With `chart_dir`, the charts are
+    written there as PNG files and linked instead of being inlined.
+    """
+    context = performance_report_context(performance_data, performance_store, chart_dir, report_dir,
+                                         mastery_model=mastery_model)
+    with stage('html_build'):
+        PERFORMANCE_REPORT_TEMPLATE.render_to(context, out)
+
+def summarize_history(history):
+    return {
+        'attempt_count': history.size,
+        'average_score': np.mean(history.scores),
+        'highest_score': np.max(history.scores),
+        'lowest_score': np.min(history.scores),
+        'average_accuracy': np.mean(history.accuracies),
+        'topic_insights': history.topic_accuracy()
+    }
 
 def generate_bar_chart(titles, scores):
-    plt.figure(figsize=(14, 7))
-    plt.bar(titles, scores, color="#66b3ff")
-    plt.xlabel("Quiz Title")
-    plt.ylabel("Score")
-    plt.title("Scores by Quiz Title")
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-
-    img = io.BytesIO()
-    plt.savefig(img, format='png')
-    plt.close()
-    img.seek(0)
-    return base64.b64encode(img.getvalue()).decode('utf8')
+    return render_chart('bar', titles, scores)
 
 def generate_line_chart(dates, accuracies):
-    plt.figure(figsize=(14, 7))
-    plt.plot(dates, accuracies, marker='o', linestyle='-', color="#ff7043")
-    plt.xlabel("Date")
-    plt.ylabel("Accuracy (%)")
-    plt.title("Accuracy Over Time")
-    plt.xticks(rotation=45, ha='right')
-    plt.grid(True)
-    plt.tight_layout()
-
-    img = io.BytesIO()
-    plt.savefig(img, format='png')
-    plt.close()
-    img.seek(0)
-    return base64.b64encode(img.getvalue()).decode('utf8')
+    return render_chart('line', dates, accuracies)
 
 def generate_scatter_plot(scores, accuracies):
-    plt.figure(figsize=(8, 6))
-    plt.scatter(scores, accuracies, color="#9575cd", alpha=0.7)
-    plt.xlabel("Score")
-    plt.ylabel("Accuracy (%)")
-    plt.title("Score vs Accuracy")
-    plt.grid(True)
-    plt.tight_layout()
-
-    img = io.BytesIO()
-    plt.savefig(img, format='png')
-    plt.close()
-    img.seek(0)
-    return base64.b64encode(img.getvalue()).decode('utf8')
+    return render_chart('scatter', scores, accuracies)
 
 def generate_topic_chart(topic_insights):
-    topic_names = list(topic_insights.keys())
-    topic_avg_accuracies = list(topic_insights.values())
-
-    plt.figure(figsize=(12, 6))
-    plt.bar(topic_names, topic_avg_accuracies, color="#4db6ac")
-    plt.xlabel("Topic")
-    plt.ylabel("Average Accuracy (%)")
-    plt.title("Average Accuracy by Topic")
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-
-    img = io.BytesIO()
-    plt.savefig(img, format='png')
-    plt.close()
-    img.seek(0)
-    return base64.b64encode(img.getvalue()).decode('utf8')
-
-if __name__ == "__main__":
-    
-    with open('Performance_data.txt', 'r') as f:
-        performance_data = json.load(f)
-
+    return render_chart('topic', topic_insights)
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Analyzes performance across multiple quiz attempts.")
+    parser.add_argument('--history', default='Performance_data.txt')
+    parser.add_argument('--output', default='performance_report.html')
+    parser.add_argument('--store', default=None,
+                        help="SQLite file of running per-user aggregates to report from "
+                             "(see performance_store.py).")
+    parser.add_argument('--chart-dir', default=None,
+                        help="Write charts as PNG files to this directory instead of inlining them.")
+    parser.add_argument('--mastery', default=None,
+                        help="Mastery state from mastery_model.py to update and read strong and weak topics from.")
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args(argv)
+
+    report_dir = os.path.dirname(os.path.abspath(args.output))
+    mastery_model = load_mastery_model(args.mastery) if args.mastery else None
+    with instrument(args.timings, args.profile), open(args.output, 'w') as f:
+        if args.store:
+            with PerformanceStore(args.store) as performance_store:
+                write_performance_report(iter_history_records(args.history), f,
+                                         performance_store, args.chart_dir, report_dir,
+                                         mastery_model)
+        else:
+            write_performance_report(iter_history_records(args.history), f,
+                                     chart_dir=args.chart_dir, report_dir=report_dir,
+                                     mastery_model=mastery_model)
+    if mastery_model is not None:
+        mastery_model.save(args.mastery)
 
-    html_report = analyze_performance_data(performance_data)
-    with open('performance_report.html', 'w') as f:
-        f.write(html_report)
+    print(f"Performance report generated successfully at {args.output}")
 
-    print("Performance report generated successfully at performance_report.html")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# attempt_history.py
+import numpy as np
+
+from timestamps import TIMESTAMP_UNIT, parse_timestamps
+from topic_registry import TopicRegistry
+
+INITIAL_CAPACITY = 64
+# Submission times are parsed in vectorized batches of this many rows.
+TIMESTAMP_BATCH_SIZE = 4096
+
+
+class AttemptHistory:
+    """
+    Columnar store of a user's quiz attempts.
+
+    Each attempt is one row across typed NumPy columns: score, accuracy,
+    submission time (UTC datetime64) and dictionary-encoded topic and title
+    codes. Topic and title strings are stored once in `topics` / `titles`
+    and referenced by their integer code, which keeps a row at 32 bytes
+    whatever the length of the strings. Topics are coded by a
+    `TopicRegistry`, so spelling variants of a topic share one code.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+
+        self.size = 0
+        self.user_id = None
+        self.titles = []
+        self._topic_registry = TopicRegistry()
+        self._title_codes = {}
+        self._scores = np.empty(capacity, dtype=np.float64)
+        self._accuracies = np.empty(capacity, dtype=np.float64)
+        self._submitted_at = np.empty(capacity, dtype=TIMESTAMP_UNIT)
+        self._pending_timestamps = []
+        self._topic_codes_column = np.empty(capacity, dtype=np.int32)
+        self._title_codes_column = np.empty(capacity, dtype=np.int32)
+
+    @classmethod
+    def from_records(cls, performance_data):
+        """Builds the history from any iterable of attempt records, in one pass."""
+
+        history = cls()
+        for item in performance_data:
+            history.append(item)
+
+        return history
+
+    @property
+    def topics(self):
+        return self._topic_registry.names
+
+    @property
+    def scores(self):
+        return self._scores[:self.size]
+
+    @property
+    def accuracies(self):
+        return self._accuracies[:self.size]
+
+    @property
+    def submitted_at(self):
+        self._parse_pending_timestamps()
+        return self._submitted_at[:self.size]
+
+    @property
+    def topic_codes(self):
+        return self._topic_codes_column[:self.size]
+
+    @property
+    def title_codes(self):
+        return self._title_codes_column[:self.size]
+
+    def append(self, item):
+
+        if self.size == len(self._scores):
+            self._grow()
+
+        if self.user_id is None:
+            self.user_id = item.get('user_id')
+
+        row = self.size
+        self._scores[row] = item['score']
+        self._accuracies[row] = float(item['accuracy'].replace("%", ""))
+        self._topic_codes_column[row] = self._topic_registry.topic_id(item['quiz']['topic'])
+        self._title_codes_column[row] = self._encode(
+            item['quiz']['title'], self._title_codes, self.titles)
+        self.size += 1
+
+        self._pending_timestamps.append(item['submitted_at'])
+        if len(self._pending_timestamps) >= TIMESTAMP_BATCH_SIZE:
+            self._parse_pending_timestamps()
+
+    def sort_by_date(self):
+        """Sorts every column by submission time, in place."""
+
+        order = np.argsort(self.submitted_at, kind='stable')
+        for column in (self.scores, self.accuracies, self.submitted_at,
+                       self.topic_codes, self.title_codes):
+            column[:] = column[order]
+
+    def title_labels(self):
+
+        return [self.titles[code] for code in self.title_codes.tolist()]
+
+    def topic_accuracy(self):
+        """
+        Returns the mean accuracy of every attempted topic, keyed by topic and
+        ordered by the topic's first attempt in the current row order.
+        """
+
+        num_topics = len(self.topics)
+        accuracy_sums = np.bincount(
+            self.topic_codes, weights=self.accuracies, minlength=num_topics)
+        attempt_counts = np.bincount(self.topic_codes, minlength=num_topics)
+
+        _, first_rows = np.unique(self.topic_codes, return_index=True)
+        codes_in_order = self.topic_codes[np.sort(first_rows)].tolist()
+
+        return {self.topics[code]: accuracy_sums[code] / attempt_counts[code]
+                for code in codes_in_order}
+
+    def _parse_pending_timestamps(self):
+
+        if self._pending_timestamps:
+            start = self.size - len(self._pending_timestamps)
+            self._submitted_at[start:self.size] = parse_timestamps(
+                self._pending_timestamps)
+            self._pending_timestamps = []
+
+    def _encode(self, value, codes, values):
+
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+
+        return code
+
+    def _grow(self):
+
+        self._parse_pending_timestamps()
+        capacity = 2 * len(self._scores)
+        for name in ('_scores', '_accuracies', '_submitted_at',
+                     '_topic_codes_column', '_title_codes_column'):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
@@ -0,0 +1,269 @@
+# batch_reports.py
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from itertools import islice
+
+import numpy as np
+
+from cohort_analytics import CohortAnalytics, add_cohort_percentiles
+from for_report_html import write_html_report
+from history_stream import iter_history_records
+from question_index import QUESTION_INDEX_FILE
+from quiz_analysis import analyze_quiz_submissions_batch
+from performance_store import PerformanceStore, submission_attempt
+from pipeline_timing import add_instrumentation_arguments, instrument, pipeline_timings, stage
+from quiz_bank import load_quiz
+from quiz_compiler import COMPILED_QUIZ_FILE
+from quiz_generator import QuestionBuckets, generate_next_quiz
+from shared_quiz import SharedQuiz
+
+REPORT_CHUNK_SIZE = 256
+UNSAFE_FILE_NAME_CHARACTERS = re.compile(r'[^A-Za-z0-9_.-]')
+
+# Per-process state set up once by `_init_worker` (once in all, with threads).
+_worker_state = {}
+
+
+def iter_submissions(source):
+    """
+    Yields the submissions of `source`: a directory of JSON files (one
+    submission each), a JSON array or an NDJSON file. Files in a directory
+    are yielded as paths and read by the worker that scores them.
+    """
+
+    if os.path.isdir(source):
+        for entry in sorted(os.scandir(source), key=lambda entry: entry.name):
+            if entry.is_file() and not entry.name.startswith('.'):
+                yield entry.path
+    else:
+        yield from iter_history_records(source)
+
+
+def report_file_name(quiz_submission_data):
+    """
+    `<user_id>_<submission id>.html`, so a student's several submissions in
+    one export get a report each. Submissions without an id are named after
+    their submission time instead.
+    """
+
+    user_id = quiz_submission_data.get('user_id')
+    submission = quiz_submission_data.get('id') or quiz_submission_data.get('submitted_at')
+    name = '_'.join(str(part) for part in (user_id, submission) if part is not None) or 'unknown'
+
+    return UNSAFE_FILE_NAME_CHARACTERS.sub('_', name) + '.html'
+
+
+def _init_worker(quiz_data, question_index, compiled_quiz, output_dir, cohort_path,
+                 timings_enabled, next_quiz_size=0, record_attempts=False):
+
+    pipeline_timings.enabled = timings_enabled
+    _worker_state['quiz_data'] = quiz_data
+    _worker_state['question_index'] = question_index
+    _worker_state['compiled_quiz'] = compiled_quiz
+    _worker_state['output_dir'] = output_dir
+    _worker_state['cohort'] = CohortAnalytics.load(cohort_path) if cohort_path else None
+    _worker_state['next_quiz_size'] = next_quiz_size
+    _worker_state['question_buckets'] = QuestionBuckets(
+        quiz_data, question_index, compiled_quiz) if next_quiz_size else None
+    _worker_state['record_attempts'] = record_attempts
+
+
+def _write_reports(chunk):
+    """
+    Scores a chunk of submissions together and writes one report per
+    submission. Returns the file names of the reports, the attempt
+    records of the submissions (when recording attempts) and the worker's
+    stage timings since its previous chunk.
+    """
+
+    quiz_submissions = []
+    for item in chunk:
+        if isinstance(item, str):
+            with stage('json_load'), open(item, 'r') as f:
+                item = json.load(f)
+        quiz_submissions.append(item)
+
+    all_results = analyze_quiz_submissions_batch(
+        _worker_state['quiz_data'], quiz_submissions, _worker_state['question_index'],
+        _worker_state['compiled_quiz'])
+
+    file_names = []
+    attempts = []
+    cohort = _worker_state['cohort']
+    question_buckets = _worker_state['question_buckets']
+    # One generator per chunk: generators must not be shared between threads.
+    rng = np.random.default_rng() if question_buckets is not None else None
+    for quiz_submission_data, analysis_results in zip(quiz_submissions, all_results):
+        if cohort is not None:
+            add_cohort_percentiles(analysis_results, cohort)
+        file_names.append(report_file_name(quiz_submission_data))
+        path = os.path.join(_worker_state['output_dir'], file_names[-1])
+        with open(path, 'w') as f:
+            write_html_report(analysis_results, f)
+        if question_buckets is not None:
+            questions = generate_next_quiz(question_buckets, analysis_results,
+                                           [quiz_submission_data],
+                                           _worker_state['next_quiz_size'], rng)
+            with open(path[:-len('.html')] + '.next.json', 'w') as f:
+                json.dump(questions, f)
+        if _worker_state['record_attempts']:
+            attempts.append(submission_attempt(quiz_submission_data, _worker_state['quiz_data']))
+
+    return file_names, attempts, pipeline_timings.drain()
+
+
+def generate_reports(quiz_data, submissions, output_dir, question_index=None,
+                     compiled_quiz=None, cohort_path=None, workers=None,
+                     chunk_size=REPORT_CHUNK_SIZE, progress=None, threads=False,
+                     next_quiz_size=0, store_path=None):
+    """
+    Writes an HTML report for every submission, fanning chunks of
+    submissions out over a process pool.
+
+    Each worker receives the quiz, its question index and its compiled
+    lookup tables once, when it starts, and scores a whole chunk with
+    `analyze_quiz_submissions_batch`. With `threads`, the chunks are
+    scored on a thread pool instead, all sharing one read-only
+    `SharedQuiz` (or the open `QuizBank`) in this process; this pays off
+    on free-threaded CPython builds and for banks too large to copy into
+    every worker.
+    With `next_quiz_size`, each report is followed by a personalised
+    follow-up quiz of that many questions (`<report>.next.json`), drawn from
+    question buckets each worker builds once. Only the questions answered
+    in that submission are excluded from it.
+    With `store_path`, each submission is also recorded in that
+    performance store, by the parent process as its chunk completes.
+    Submissions are read lazily and at most two chunks per worker are in
+    flight, so memory stays bounded however many submissions there are.
+    With stage timings enabled, the workers' timings are merged into this
+    process's `pipeline_timings`.
+
+    Args:
+        quiz_data (dict): The quiz bank.
+        submissions (iterable): Submission dicts, or paths of JSON files.
+        output_dir (str): Directory for the reports, named by `report_file_name`.
+        question_index (dict, optional): Preloaded question-feature index.
+        compiled_quiz (dict, optional): The quiz compiled by `compile_quiz`.
+        cohort_path (str, optional): Cohort statistics to add percentiles.
+        workers (int, optional): Number of processes or threads (default: CPU count).
+        chunk_size (int): Number of submissions per task.
+        progress (callable, optional): Called with the running submission count.
+        threads (bool): Score on threads instead of processes.
+        next_quiz_size (int): Questions per follow-up quiz; 0 for none.
+        store_path (str, optional): Performance store to record the
+            submissions in.
+
+    Returns:
+        tuple: The number of submissions scored and of distinct report
+            files written. They differ only when submissions share a file
+            name (same user and submission id), and later ones overwrote
+            earlier ones.
+    """
+
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    submissions = iter(submissions)
+    scored = 0
+    file_names = set()
+
+    if threads:
+        if isinstance(quiz_data, dict):
+            quiz_data = SharedQuiz(quiz_data, question_index, compiled_quiz)
+        _init_worker(quiz_data, None, None, output_dir, cohort_path, pipeline_timings.enabled,
+                     next_quiz_size, store_path is not None)
+        executor = ThreadPoolExecutor(max_workers=workers)
+    else:
+        executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(quiz_data, question_index, compiled_quiz, output_dir,
+                      cohort_path, pipeline_timings.enabled, next_quiz_size,
+                      store_path is not None))
+    performance_store = PerformanceStore(store_path) if store_path is not None else nullcontext()
+
+    with executor, performance_store:
+        pending = set()
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = list(islice(submissions, chunk_size))
+                if not chunk:
+                    break
+                pending.add(executor.submit(_write_reports, chunk))
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk_file_names, chunk_attempts, chunk_timings = future.result()
+                scored += len(chunk_file_names)
+                file_names.update(chunk_file_names)
+                if store_path is not None:
+                    performance_store.record_history(
+                        attempt for attempt in chunk_attempts if attempt is not None)
+                pipeline_timings.merge(chunk_timings)
+            if progress is not None:
+                progress(scored)
+
+    return scored, len(file_names)
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Generates an HTML report for every submission to a quiz.")
+    parser.add_argument('submissions',
+                        help="directory of submission JSON files, or a JSON array / NDJSON file")
+    parser.add_argument('--quiz', default='current_test_data.txt')
+    parser.add_argument('--index', default=QUESTION_INDEX_FILE)
+    parser.add_argument('--compiled', default=COMPILED_QUIZ_FILE)
+    parser.add_argument('--bank', help="memory-mapped quiz bank compiled from --quiz by quiz_bank.py")
+    parser.add_argument('--output-dir', default='reports')
+    parser.add_argument('--cohort', help="cohort statistics from cohort_analytics.py, to show percentiles")
+    parser.add_argument('--workers', type=int, help="number of processes (default: CPU count)")
+    parser.add_argument('--threads', action='store_true',
+                        help="score on threads sharing one read-only copy of the quiz")
+    parser.add_argument('--chunk-size', type=int, default=REPORT_CHUNK_SIZE)
+    parser.add_argument('--next-quiz', type=int, default=0, metavar='K',
+                        help="also write a personalised K-question follow-up quiz per student; "
+                             "only the questions of that submission are excluded, not those of "
+                             "the student's earlier ones (see quiz_generator.py --history)")
+    parser.add_argument('--store', help="performance store (see performance_store.py) to record "
+                                        "the submissions in")
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+
+    def show_progress(scored):
+        elapsed = time.perf_counter() - started
+        print(f"\rSubmissions scored: {scored} ({scored / elapsed:.0f}/s)",
+              end='', file=sys.stderr, flush=True)
+
+    # Only the parent process is profiled; the workers' stage timings are
+    # collected with their results.
+    with instrument(args.timings, args.profile):
+        quiz_data, question_index, compiled_quiz = load_quiz(
+            args.quiz, args.index, args.compiled, args.bank)
+
+        scored, written = generate_reports(
+            quiz_data, iter_submissions(args.submissions), args.output_dir,
+            question_index, compiled_quiz, args.cohort, args.workers, args.chunk_size,
+            show_progress, args.threads, args.next_quiz, args.store)
+
+    elapsed = time.perf_counter() - started
+    print(file=sys.stderr)
+    if written < scored:
+        print(f"Warning: {scored - written} reports were overwritten by later submissions "
+              f"with the same user and submission id.", file=sys.stderr)
+    print(f"Generated {written} reports from {scored} submissions in '{args.output_dir}' "
+          f"in {elapsed:.2f}s ({scored / elapsed if elapsed else 0:.0f} submissions/s).")
+
+
+if __name__ == "__main__":
+    main()
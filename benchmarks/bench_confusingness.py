@@ -0,0 +1,101 @@
+# benchmarks/bench_confusingness.py
+"""
+Microbenchmark for option confusingness scoring.
+
+Compares the original per-pair implementation (which reloaded the stopword
+corpus and re-tokenized both options for every pair) with the current
+single-question and batch APIs on the sample quiz bank, and checks that all
+three give the same scores.
+
+    python benchmarks/bench_confusingness.py [--repeat N]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nlp_utils import (assess_option_confusingness,  # noqa: E402
+                       assess_option_confusingness_batch, get_stop_words)
+
+
+def legacy_assess_option_confusingness(options):
+
+    from nltk.corpus import stopwords
+
+    option_texts = [option['description'] or "" for option in options]
+    num_options = len(option_texts)
+
+    if num_options < 2:
+        return 0
+
+    avg_length = np.mean([len(text) for text in option_texts])
+
+    total_common_words = 0
+
+    for i in range(num_options):
+        for j in range(i + 1, num_options):
+
+            words1 = set(re.findall(r'\b\w+\b', option_texts[i].lower()))
+            words2 = set(re.findall(r'\b\w+\b', option_texts[j].lower()))
+
+            stop_words = set(stopwords.words('english'))
+            words1 -= stop_words
+            words2 -= stop_words
+
+            common_words = words1.intersection(words2)
+            total_common_words += len(common_words)
+
+    avg_common_words = total_common_words / \
+        (num_options * (num_options - 1) / 2) if num_options > 1 else 0
+
+    return avg_common_words * avg_length / 100
+
+
+def best_of(func, repeat):
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings), result
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quiz', default='current_test_data.txt')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.quiz, 'r') as f:
+        options_lists = [question['options']
+                         for question in json.load(f)['quiz']['questions']]
+
+    get_stop_words()
+
+    legacy_time, legacy = best_of(
+        lambda: [legacy_assess_option_confusingness(options) for options in options_lists], args.repeat)
+    single_time, single = best_of(
+        lambda: [assess_option_confusingness(options) for options in options_lists], args.repeat)
+    batch_time, batch = best_of(
+        lambda: assess_option_confusingness_batch(options_lists), args.repeat)
+
+    assert single == legacy, "single-question scores differ from legacy"
+    assert np.array_equal(batch, legacy), "batch scores differ from legacy"
+
+    print(f"Questions: {len(options_lists)}")
+    print(f"  legacy : {legacy_time * 1000:9.2f} ms")
+    print(f"  single : {single_time * 1000:9.2f} ms  ({legacy_time / single_time:.1f}x)")
+    print(f"  batch  : {batch_time * 1000:9.2f} ms  ({legacy_time / batch_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
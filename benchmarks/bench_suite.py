@@ -0,0 +1,326 @@
+# benchmarks/bench_suite.py
+"""
+Benchmark suite for the analysis pipeline at multiples of the sample data.
+
+Each benchmark runs on synthetic data (see `synthetic_data.py`) at 10x, 100x
+and 1000x the size of the sample files: 128 quiz questions, one submission
+and 14 history records. Wall time is the best of `--repeat` runs; peak
+memory is measured with tracemalloc on one extra run, with charts rendered
+on threads of this process instead of the chart process pool, so their
+allocations are counted. Results are saved as
+JSON under benchmarks/results/, and `--compare` reports the benchmarks that
+got slower or bigger than an earlier results file.
+
+    python benchmarks/bench_suite.py [--scales 10,100] [--only quiz,rank]
+        [--repeat N] [--compare benchmarks/results/<earlier>.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Charts must be rendered, not served from a disk cache left by other runs.
+os.environ.pop('CHART_CACHE_DIR', None)
+
+from synthetic_data import (generate_history, generate_quiz,  # noqa: E402
+                            generate_submissions)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+BASE_QUESTIONS = 128
+BASE_SUBMISSIONS = 1
+BASE_HISTORY = 14
+DEFAULT_SCALES = (10, 100, 1000)
+# A benchmark regresses when it is this much slower or bigger than before.
+REGRESSION_THRESHOLD = 1.2
+
+
+def bench_quiz(scale):
+    """`analyze_quiz_data_advanced` on one submission to a scaled-up quiz."""
+
+    from question_index import build_question_index
+    from quiz_analysis import analyze_quiz_data_advanced
+    from quiz_compiler import compile_quiz
+
+    quiz_data = generate_quiz(BASE_QUESTIONS * scale, num_topics=12, seed=scale)
+    submission = generate_submissions(quiz_data, 1, seed=scale)[0]
+    question_index = build_question_index(quiz_data)
+    compiled_quiz = compile_quiz(quiz_data)
+
+    return BASE_QUESTIONS * scale, 'questions', lambda: analyze_quiz_data_advanced(
+        quiz_data, submission, question_index, compiled_quiz)
+
+
+def bench_quiz_batch(scale):
+    """`analyze_quiz_submissions_batch` on scaled-up submissions to a sample-sized quiz."""
+
+    from question_index import build_question_index
+    from quiz_analysis import analyze_quiz_submissions_batch
+    from quiz_compiler import compile_quiz
+
+    quiz_data = generate_quiz(BASE_QUESTIONS, num_topics=12, seed=scale)
+    submissions = generate_submissions(quiz_data, BASE_SUBMISSIONS * scale, seed=scale)
+    question_index = build_question_index(quiz_data)
+    compiled_quiz = compile_quiz(quiz_data)
+
+    return BASE_SUBMISSIONS * scale, 'submissions', lambda: analyze_quiz_submissions_batch(
+        quiz_data, submissions, question_index, compiled_quiz)
+
+
+def bench_confusingness(scale):
+    """`assess_option_confusingness` over every question of a scaled-up quiz."""
+
+    from nlp_utils import assess_option_confusingness, get_stop_words
+
+    options_lists = [question['options'] for question in
+                     generate_quiz(BASE_QUESTIONS * scale, seed=scale)['quiz']['questions']]
+    get_stop_words()
+
+    return BASE_QUESTIONS * scale, 'questions', lambda: [
+        assess_option_confusingness(options) for options in options_lists]
+
+
+def bench_confusingness_batch(scale):
+    """`assess_option_confusingness_batch` on a scaled-up quiz."""
+
+    from nlp_utils import assess_option_confusingness_batch, get_stop_words
+
+    options_lists = [question['options'] for question in
+                     generate_quiz(BASE_QUESTIONS * scale, seed=scale)['quiz']['questions']]
+    get_stop_words()
+
+    return BASE_QUESTIONS * scale, 'questions', lambda: assess_option_confusingness_batch(
+        options_lists)
+
+
+def bench_performance(scale):
+    """`analyze_performance_data`, charts included, on a scaled-up history."""
+
+    from chart_cache import chart_cache
+    from Performance_analyzer import analyze_performance_data
+
+    history = generate_history(BASE_HISTORY * scale, years=3, seed=scale)
+
+    def run():
+        chart_cache.clear()
+        return analyze_performance_data(history)
+
+    return BASE_HISTORY * scale, 'records', run
+
+
+def bench_charts(scale):
+    """Every chart of the performance report, rendered one after another."""
+
+    from attempt_history import AttemptHistory
+    from charts import render_png
+
+    history = AttemptHistory.from_records(
+        generate_history(BASE_HISTORY * scale, years=3, seed=scale))
+    history.sort_by_date()
+    chart_specs = [
+        ('bar', (history.title_labels(), history.scores)),
+        ('line', (history.submitted_at, history.accuracies)),
+        ('scatter', (history.scores, history.accuracies)),
+        ('topic', (history.topic_accuracy(),))
+    ]
+
+    return BASE_HISTORY * scale, 'records', lambda: [
+        render_png(chart_type, chart_data) for chart_type, chart_data in chart_specs]
+
+
+def bench_rank(scale):
+    """`predict_neet_ranks` on one accuracy per history record."""
+
+    import numpy as np
+
+    from rank_model import get_rank_model, predict_neet_ranks
+
+    accuracies = np.random.default_rng(scale).uniform(0, 100, BASE_HISTORY * scale)
+    get_rank_model()
+
+    return BASE_HISTORY * scale, 'predictions', lambda: predict_neet_ranks(accuracies)
+
+
+def bench_practice(scale):
+    """`PracticeIndex.similar` for one question against a scaled-up bank."""
+
+    from practice_index import PracticeIndex, write_practice_index
+
+    questions = generate_quiz(BASE_QUESTIONS * scale, num_topics=12, seed=scale)['quiz']['questions']
+    directory = tempfile.TemporaryDirectory()
+    path = os.path.join(directory.name, 'practice_index.bin')
+    write_practice_index(questions, path)
+    practice_index = PracticeIndex(path)
+    vector = practice_index.question_vector([questions[0]['id']])
+
+    # Binding `directory` keeps it for as long as the benchmark; it is
+    # removed once the benchmark is dropped.
+    def run(directory=directory):
+        return practice_index.similar(vector, exclude_ids=[questions[0]['id']])
+
+    return BASE_QUESTIONS * scale, 'questions', run
+
+
+def bench_next_quiz(scale):
+    """`generate_next_quiz` for one analysed submission against a scaled-up bank."""
+
+    import numpy as np
+
+    from question_index import build_question_index
+    from quiz_analysis import analyze_quiz_data_advanced
+    from quiz_compiler import compile_quiz
+    from quiz_generator import QuestionBuckets, generate_next_quiz
+
+    quiz_data = generate_quiz(BASE_QUESTIONS * scale, num_topics=12, seed=scale)
+    submission = generate_submissions(quiz_data, 1, seed=scale)[0]
+    question_index = build_question_index(quiz_data)
+    compiled_quiz = compile_quiz(quiz_data)
+    analysis_results = analyze_quiz_data_advanced(
+        quiz_data, submission, question_index, compiled_quiz)
+    question_buckets = QuestionBuckets(quiz_data, question_index, compiled_quiz)
+    rng = np.random.default_rng(scale)
+
+    return BASE_QUESTIONS * scale, 'questions', lambda: generate_next_quiz(
+        question_buckets, analysis_results, [submission], rng=rng)
+
+
+BENCHMARKS = {
+    'quiz': bench_quiz,
+    'quiz_batch': bench_quiz_batch,
+    'confusingness': bench_confusingness,
+    'confusingness_batch': bench_confusingness_batch,
+    'performance': bench_performance,
+    'charts': bench_charts,
+    'rank': bench_rank,
+    'practice': bench_practice,
+    'next_quiz': bench_next_quiz
+}
+
+
+def measure(func, repeat):
+    """
+    Returns the best and mean wall time of `repeat` runs and the peak traced
+    memory of one run. The traced run renders charts on threads, since
+    tracemalloc does not see allocations in the chart process pool, after
+    an untraced run on the same threads has done their first imports.
+    """
+
+    from charts import CHART_RENDER_WORKERS, chart_executor
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=CHART_RENDER_WORKERS) as executor, \
+            chart_executor(executor):
+        func()
+        tracemalloc.start()
+        try:
+            func()
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return min(timings), sum(timings) / len(timings), peak_memory
+
+
+def git_revision():
+
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous_path, threshold=REGRESSION_THRESHOLD):
+    """Prints the benchmarks that regressed against `previous_path` and returns their count."""
+
+    with open(previous_path, 'r') as f:
+        previous = {(result['benchmark'], result['scale']): result
+                    for result in json.load(f)['results']}
+
+    regressions = 0
+    for result in results:
+        before = previous.get((result['benchmark'], result['scale']))
+        if before is None:
+            continue
+        time_ratio = result['best_seconds'] / before['best_seconds']
+        memory_ratio = result['peak_memory_bytes'] / max(before['peak_memory_bytes'], 1)
+        regressed = time_ratio > threshold or memory_ratio > threshold
+        regressions += regressed
+        print(f"  {result['benchmark']:>20} x{result['scale']:<5} time {time_ratio:5.2f}x  "
+              f"memory {memory_ratio:5.2f}x{'  REGRESSION' if regressed else ''}")
+
+    return regressions
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)),
+                        help="comma-separated multiples of the sample data size")
+    parser.add_argument('--only', help="comma-separated benchmarks to run: " + ", ".join(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="results file (default: a new file in benchmarks/results)")
+    parser.add_argument('--compare', help="earlier results file to check for regressions")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(',')]
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = []
+    for name in names:
+        for scale in scales:
+            size, unit, func = BENCHMARKS[name](scale)
+            best, mean, peak_memory = measure(func, args.repeat)
+            results.append({
+                'benchmark': name, 'scale': scale, 'size': size, 'unit': unit,
+                'best_seconds': best, 'mean_seconds': mean,
+                'throughput': size / best if best else None,
+                'peak_memory_bytes': peak_memory
+            })
+            print(f"{name:>20} x{scale:<5} {size:>9} {unit:<11} {best * 1000:10.2f} ms  "
+                  f"{size / best if best else 0:12.0f} {unit}/s  {peak_memory / 2 ** 20:8.1f} MiB",
+                  flush=True)
+
+    revision = git_revision()
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{revision or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'revision': revision,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': args.repeat,
+            'results': results
+        }, f, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        print(f"Compared with {args.compare}:")
+        if compare(results, args.compare, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
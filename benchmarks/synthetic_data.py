@@ -0,0 +1,245 @@
+# benchmarks/synthetic_data.py
+"""
+Generators of synthetic quizzes, submissions and attempt histories in the
+same JSON schemas as `current_test_data.txt`, `Quiz_submission_data.txt`
+and `Performance_data.txt`.
+
+Every generator is deterministic for a given seed, so benchmark runs on
+different versions see identical data.
+
+    python benchmarks/synthetic_data.py --questions 1280 --submissions 1000 \
+        --history 140 --output-dir synthetic
+"""
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+IST = timezone(timedelta(hours=5, minutes=30))
+EPOCH = datetime(2022, 1, 1, tzinfo=IST)
+
+TOPICS = [
+    "structural organisation in animals", "cell structure and function", "plant physiology",
+    "human physiology", "genetics and evolution", "biotechnology", "ecology and environment",
+    "reproduction", "body fluids and circulation", "biomolecules", "cell cycle and cell division",
+    "neural control and coordination"
+]
+WORDS = (
+    "cell tissue membrane nucleus epithelial muscular connective neural gland hormone enzyme "
+    "protein lipid carbohydrate blood plasma lymph heart artery vein capillary kidney nephron "
+    "neuron synapse chromosome gene allele mutation replication transcription translation "
+    "ribosome mitochondria chloroplast photosynthesis respiration transpiration xylem phloem "
+    "root stem leaf flower pollen ovule seed fruit ecosystem population community species "
+    "the of a which is in and to following statement correct incorrect true false complex "
+    "basic fundamental advanced function structure layer surface secretion absorption"
+).split()
+
+
+def _text(rng, min_words, max_words):
+
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+
+def _timestamp(moment):
+
+    return moment.isoformat(timespec='milliseconds')
+
+
+def generate_quiz(num_questions=128, num_options=4, seed=0, quiz_id=1,
+                  first_question_id=1, first_option_id=1, num_topics=1):
+    """
+    Generates a quiz with `num_questions` questions of `num_options` options
+    each, exactly one of them correct.
+    """
+
+    rng = random.Random(seed)
+    created_at = _timestamp(EPOCH)
+    topics = TOPICS[:num_topics] if num_topics <= len(TOPICS) else \
+        [f"topic {number}" for number in range(num_topics)]
+
+    questions = []
+    option_id = first_option_id
+    for number in range(num_questions):
+        question_id = first_question_id + number
+        correct_option = rng.randrange(num_options)
+        options = []
+        for position in range(num_options):
+            options.append({
+                'id': option_id,
+                'description': _text(rng, 1, 6),
+                'question_id': question_id,
+                'is_correct': position == correct_option,
+                'created_at': created_at,
+                'updated_at': created_at,
+                'unanswered': False,
+                'photo_url': None
+            })
+            option_id += 1
+
+        questions.append({
+            'id': question_id,
+            'description': _text(rng, 8, 40),
+            'difficulty_level': None,
+            'topic': rng.choice(topics),
+            'is_published': True,
+            'created_at': created_at,
+            'updated_at': created_at,
+            'detailed_solution': _text(rng, 20, 200),
+            'type': "",
+            'topic_id': None,
+            'photo_url': None,
+            'photo_solution_url': None,
+            'options': options
+        })
+
+    return {
+        'quiz': {
+            'id': quiz_id,
+            'name': None,
+            'title': f"Synthetic Quiz ({quiz_id})",
+            'description': "",
+            'difficulty_level': None,
+            'topic': topics[0],
+            'created_at': created_at,
+            'updated_at': created_at,
+            'duration': num_questions,
+            'negative_marks': "1.0",
+            'correct_answer_marks': "4.0",
+            'questions_count': num_questions,
+            'questions': questions
+        }
+    }
+
+
+def generate_submission(quiz_data, rng, user_id, answer_rate=0.8, correct_rate=0.6):
+    """Generates one submission to `quiz_data`, answering questions at random."""
+
+    questions = quiz_data['quiz']['questions']
+    response_map = {}
+    correct_answers = 0
+    for question in questions:
+        if rng.random() >= answer_rate:
+            continue
+        options = question['options']
+        if rng.random() < correct_rate:
+            option = next(option for option in options if option['is_correct'])
+            correct_answers += 1
+        else:
+            option = rng.choice(options)
+            correct_answers += option['is_correct']
+        response_map[str(question['id'])] = option['id']
+
+    incorrect_answers = len(response_map) - correct_answers
+    submitted_at = EPOCH + timedelta(seconds=rng.randrange(3 * 365 * 86400))
+
+    return {
+        'id': rng.randrange(1, 10 ** 9),
+        'quiz_id': quiz_data['quiz']['id'],
+        'user_id': user_id,
+        'submitted_at': _timestamp(submitted_at),
+        'created_at': _timestamp(submitted_at),
+        'updated_at': _timestamp(submitted_at),
+        'score': 4 * correct_answers - incorrect_answers,
+        'accuracy': f"{round(100 * correct_answers / max(len(response_map), 1))} %",
+        'final_score': f"{4 * correct_answers - incorrect_answers:.1f}",
+        'negative_score': f"{incorrect_answers:.1f}",
+        'correct_answers': correct_answers,
+        'incorrect_answers': incorrect_answers,
+        'source': "live",
+        'type': "topic",
+        'started_at': _timestamp(submitted_at - timedelta(minutes=15)),
+        'ended_at': _timestamp(submitted_at),
+        'duration': "15:00",
+        'better_than': rng.randrange(500),
+        'total_questions': len(questions),
+        'response_map': response_map
+    }
+
+
+def generate_submissions(quiz_data, count, seed=0):
+
+    rng = random.Random(seed)
+
+    return [generate_submission(quiz_data, rng, f"user-{number}") for number in range(count)]
+
+
+def generate_history(num_attempts=14, years=1, num_topics=8, seed=0, user_id="user-0"):
+    """
+    Generates a user's attempt history spread over `years` years, in the
+    schema of `Performance_data.txt` (newest attempt first).
+    """
+
+    rng = random.Random(seed)
+    topics = TOPICS[:num_topics]
+    span = years * 365 * 86400
+
+    records = []
+    for number in range(num_attempts):
+        submitted_at = EPOCH + timedelta(seconds=rng.randrange(span))
+        total_questions = rng.choice((30, 50, 100, 128))
+        correct_answers = rng.randint(0, total_questions)
+        incorrect_answers = rng.randint(0, total_questions - correct_answers)
+        answered = correct_answers + incorrect_answers
+        quiz_id = rng.randrange(1, 1000)
+        records.append({
+            'id': number + 1,
+            'quiz_id': quiz_id,
+            'user_id': user_id,
+            'submitted_at': _timestamp(submitted_at),
+            'created_at': _timestamp(submitted_at),
+            'updated_at': _timestamp(submitted_at),
+            'score': 4 * correct_answers - incorrect_answers,
+            'accuracy': f"{round(100 * correct_answers / max(answered, 1))} %",
+            'final_score': f"{4 * correct_answers - incorrect_answers:.1f}",
+            'negative_score': f"{incorrect_answers:.1f}",
+            'correct_answers': correct_answers,
+            'incorrect_answers': incorrect_answers,
+            'source': "exam",
+            'type': "topic",
+            'total_questions': total_questions,
+            'response_map': {},
+            'quiz': {
+                'id': quiz_id,
+                'title': f"Synthetic Quiz ({quiz_id})",
+                'topic': rng.choice(topics),
+                'questions_count': total_questions
+            }
+        })
+
+    records.sort(key=lambda record: record['submitted_at'], reverse=True)
+
+    return records
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--questions', type=int, default=128)
+    parser.add_argument('--options', type=int, default=4)
+    parser.add_argument('--submissions', type=int, default=1)
+    parser.add_argument('--history', type=int, default=14)
+    parser.add_argument('--years', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-dir', default='synthetic')
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    quiz_data = generate_quiz(args.questions, args.options, args.seed)
+    with open(os.path.join(args.output_dir, 'quiz.json'), 'w') as f:
+        json.dump(quiz_data, f)
+
+    with open(os.path.join(args.output_dir, 'submissions.ndjson'), 'w') as f:
+        for submission in generate_submissions(quiz_data, args.submissions, args.seed):
+            f.write(json.dumps(submission) + "\n")
+
+    with open(os.path.join(args.output_dir, 'history.json'), 'w') as f:
+        json.dump(generate_history(args.history, args.years, seed=args.seed), f)
+
+    print(f"Wrote a {args.questions}-question quiz, {args.submissions} submissions and "
+          f"{args.history} history records to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
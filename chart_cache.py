@@ -0,0 +1,182 @@
+# chart_cache.py
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Bump when the look of the charts changes so stale renders are not served.
+CHART_CACHE_VERSION = 1
+# Disk pruning removes charts until the tier is at this share of its limit,
+# so that the next few writes do not each trigger a scan.
+DISK_PRUNE_TARGET = 0.9
+
+
+def _encode_value(value):
+
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def chart_cache_key(chart_type, *chart_data):
+    """
+    Returns the content address of a chart: a hash of its type and the data
+    it plots. Series order matters (it is the plotting order), so dicts are
+    hashed in insertion order rather than sorted.
+    """
+
+    payload = json.dumps([CHART_CACHE_VERSION, chart_type, chart_data],
+                         default=_encode_value, separators=(',', ':'))
+
+    return hashlib.sha256(payload.encode('utf8')).hexdigest()
+
+
+class ChartCache:
+    """
+    Two-tier cache of rendered charts (base64-encoded PNGs).
+
+    The in-memory tier is an LRU bounded both by entry count and by total
+    size; the optional on-disk tier keeps one file per chart under
+    `cache_dir`, bounded by `max_disk_bytes`, and is shared by every process
+    pointed at the same directory. Its size is tracked in memory from one
+    scan at the first write plus the size of each write, and the directory
+    is only rescanned and pruned once that total passes the limit, so a
+    write costs O(1) amortised rather than O(cache size).
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024,
+                 cache_dir=None, max_disk_bytes=1024 * 1024 * 1024):
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        # Bytes on disk as of the last scan plus writes since; None until scanned.
+        self._disk_size = None
+        self._lock = threading.Lock()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key):
+
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = self._read_disk(key)
+        if value is not None:
+            self._put_memory(key, value)
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+
+        self._put_memory(key, value)
+        self._write_disk(key, value)
+
+    def clear(self):
+
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _put_memory(self, key, value):
+
+        if len(value) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = value
+            self._size += len(value)
+
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _disk_path(self, key):
+
+        return os.path.join(self.cache_dir, f"{key}.b64")
+
+    def _read_disk(self, key):
+
+        if not self.cache_dir:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r') as f:
+                value = f.read()
+            # Refresh the mtime so disk pruning evicts least recently used first.
+            os.utime(path)
+        except OSError:
+            return None
+
+        return value
+
+    def _write_disk(self, key, value):
+
+        if not self.cache_dir:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._disk_size is not None:
+                self._disk_size += len(value)
+            prune = self._disk_size is None or self._disk_size > self.max_disk_bytes
+        if prune:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """
+        Scans the disk tier and, if it is over its limit, removes the least
+        recently used charts until it is at DISK_PRUNE_TARGET of the limit.
+        """
+
+        files = []
+        total = 0
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.b64'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        if total > self.max_disk_bytes:
+            for _, size, path in sorted(files):
+                if total <= self.max_disk_bytes * DISK_PRUNE_TARGET:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+
+        with self._lock:
+            self._disk_size = total
+
+
+chart_cache = ChartCache(cache_dir=os.environ.get('CHART_CACHE_DIR'))
+
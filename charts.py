@@ -0,0 +1,269 @@
+# charts.py
+import base64
+import io
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from chart_cache import chart_cache, chart_cache_key
+from pipeline_timing import pipeline_timings
+
+CHART_RENDER_EXECUTOR = os.environ.get('CHART_RENDER_EXECUTOR', 'process')
+CHART_RENDER_WORKERS = int(os.environ.get(
+    'CHART_RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def new_figure(figsize):
+    """
+    Creates a figure attached to its own Agg canvas.
+
+    Unlike `plt.figure`, this does not touch pyplot's global figure manager,
+    so figures can be built concurrently from threads or worker processes.
+    """
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+
+    return figure
+
+
+def rotate_xticklabels(ax):
+
+    from matplotlib.artist import setp
+
+    setp(ax.get_xticklabels(), rotation=45, ha='right')
+
+
+def bar_chart_figure(titles, scores):
+
+    figure = new_figure((14, 7))
+    ax = figure.subplots()
+    ax.bar(titles, scores, color="#66b3ff")
+    ax.set_xlabel("Quiz Title")
+    ax.set_ylabel("Score")
+    ax.set_title("Scores by Quiz Title")
+    rotate_xticklabels(ax)
+    figure.tight_layout()
+
+    return figure
+
+
+def line_chart_figure(dates, accuracies):
+
+    figure = new_figure((14, 7))
+    ax = figure.subplots()
+    ax.plot(dates, accuracies, marker='o', linestyle='-', color="#ff7043")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Accuracy (%)")
+    ax.set_title("Accuracy Over Time")
+    rotate_xticklabels(ax)
+    ax.grid(True)
+    figure.tight_layout()
+
+    return figure
+
+
+def scatter_plot_figure(scores, accuracies):
+
+    figure = new_figure((8, 6))
+    ax = figure.subplots()
+    ax.scatter(scores, accuracies, color="#9575cd", alpha=0.7)
+    ax.set_xlabel("Score")
+    ax.set_ylabel("Accuracy (%)")
+    ax.set_title("Score vs Accuracy")
+    ax.grid(True)
+    figure.tight_layout()
+
+    return figure
+
+
+def topic_chart_figure(topic_insights):
+
+    topic_names = list(topic_insights.keys())
+    topic_avg_accuracies = list(topic_insights.values())
+
+    figure = new_figure((12, 6))
+    ax = figure.subplots()
+    ax.bar(topic_names, topic_avg_accuracies, color="#4db6ac")
+    ax.set_xlabel("Topic")
+    ax.set_ylabel("Average Accuracy (%)")
+    ax.set_title("Average Accuracy by Topic")
+    rotate_xticklabels(ax)
+    figure.tight_layout()
+
+    return figure
+
+
+def question_category_figure(categories, counts):
+
+    figure = new_figure((10, 6))
+    ax = figure.subplots()
+    ax.bar(categories, counts, color='skyblue')
+    ax.set_xlabel("Question Category")
+    ax.set_ylabel("Number of Questions")
+    ax.set_title("Question Distribution by Category")
+    rotate_xticklabels(ax)
+    figure.tight_layout()
+
+    return figure
+
+
+def difficulty_pie_figure(difficulties, accuracies):
+
+    figure = new_figure((8, 8))
+    ax = figure.subplots()
+    ax.pie(accuracies, labels=difficulties, autopct='%1.1f%%',
+           startangle=140, colors=['lightcoral', 'lightgreen', 'lightskyblue'])
+    ax.set_title("Accuracy by Difficulty Level")
+    figure.tight_layout()
+
+    return figure
+
+
+def topic_accuracy_figure(topics, topic_accuracies):
+
+    figure = new_figure((10, 6))
+    ax = figure.subplots()
+    ax.bar(topics, topic_accuracies, color='lightgreen')
+    ax.set_xlabel("Topic")
+    ax.set_ylabel("Accuracy (%)")
+    ax.set_title("Performance by Topic")
+    rotate_xticklabels(ax)
+    figure.tight_layout()
+
+    return figure
+
+
+CHART_FIGURES = {
+    'bar': bar_chart_figure,
+    'line': line_chart_figure,
+    'scatter': scatter_plot_figure,
+    'topic': topic_chart_figure,
+    'question_categories': question_category_figure,
+    'difficulty_pie': difficulty_pie_figure,
+    'topic_accuracy': topic_accuracy_figure
+}
+
+
+def render_png(chart_type, chart_data):
+    """Renders a chart and returns it as a base64-encoded PNG, bypassing the cache."""
+
+    figure = CHART_FIGURES[chart_type](*chart_data)
+
+    img = io.BytesIO()
+    figure.savefig(img, format='png')
+
+    return base64.b64encode(img.getvalue()).decode('utf8')
+
+
+def render_png_timed(chart_type, chart_data):
+    """Renders like `render_png` and also returns the render time, measured where it ran."""
+
+    started = time.perf_counter()
+    chart = render_png(chart_type, chart_data)
+
+    return chart, time.perf_counter() - started
+
+
+def render_chart(chart_type, *chart_data):
+
+    key = chart_cache_key(chart_type, *chart_data)
+
+    chart = chart_cache.get(key)
+    if chart is None:
+        with pipeline_timings.stage(f"chart_render:{chart_type}"):
+            chart = render_png(chart_type, chart_data)
+        chart_cache.put(key, chart)
+
+    return chart
+
+
+def get_chart_executor():
+    """
+    Returns the pool used to render charts concurrently, creating it on first
+    use so that it is shared by every report the process generates.
+    """
+
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            if CHART_RENDER_EXECUTOR == 'thread':
+                _executor = ThreadPoolExecutor(max_workers=CHART_RENDER_WORKERS)
+            else:
+                _executor = ProcessPoolExecutor(max_workers=CHART_RENDER_WORKERS)
+
+    return _executor
+
+
+@contextmanager
+def chart_executor(executor):
+    """
+    Makes `executor` the shared chart pool while the block runs, e.g. a
+    thread pool so that a memory profiler in this process sees the
+    rendering. The previous pool is restored afterwards.
+    """
+
+    global _executor
+
+    with _executor_lock:
+        previous, _executor = _executor, executor
+    try:
+        yield executor
+    finally:
+        with _executor_lock:
+            _executor = previous
+
+
+def render_charts(chart_specs, executor=None):
+    """
+    Renders several charts concurrently.
+
+    Cached charts are served directly; the rest are rendered on `executor`
+    (by default the shared chart pool), so the total time is roughly that of
+    the slowest chart. Without an explicit `executor`, a single missing
+    chart is rendered in the calling thread.
+
+    Args:
+        chart_specs (list): (chart_type, chart_data) pairs, where chart_data
+            is the tuple of arguments of the chart's figure function.
+        executor (concurrent.futures.Executor, optional): Pool to render on.
+
+    Returns:
+        list: The base64-encoded PNG of each chart, in the order of chart_specs.
+    """
+
+    keys = [chart_cache_key(chart_type, *chart_data)
+            for chart_type, chart_data in chart_specs]
+    charts = [chart_cache.get(key) for key in keys]
+    missing = [i for i, chart in enumerate(charts) if chart is None]
+
+    # With stage timings on, each chart is timed in the process that renders it.
+    render = render_png_timed if pipeline_timings.enabled else render_png
+
+    if len(missing) == 1 and executor is None:
+        charts[missing[0]] = render(*chart_specs[missing[0]])
+    elif missing:
+        executor = executor or get_chart_executor()
+        futures = {i: executor.submit(render, *chart_specs[i])
+                   for i in missing}
+        for i, future in futures.items():
+            charts[i] = future.result()
+
+    if render is render_png_timed:
+        for i in missing:
+            charts[i], seconds = charts[i]
+            pipeline_timings.record(f"chart_render:{chart_specs[i][0]}", seconds)
+
+    for i in missing:
+        chart_cache.put(keys[i], charts[i])
+
+    return charts
@@ -0,0 +1,294 @@
+# cohort_analytics.py
+import argparse
+import json
+from itertools import islice
+
+import numpy as np
+
+from history_stream import iter_history_records
+from question_index import QUESTION_INDEX_FILE
+from quiz_analysis import encode_responses, prepare_quiz
+from quiz_bank import load_quiz
+from quiz_compiler import COMPILED_QUIZ_FILE
+from topic_registry import topic_key
+
+COHORT_STATS_FILE = 'cohort_stats.npz'
+SUBMISSION_CHUNK_SIZE = 4096
+
+
+class CohortAnalytics:
+    """
+    Item statistics over every submission to one quiz.
+
+    Submissions are scored a chunk at a time with the same response matrix
+    as `analyze_quiz_submissions_batch`, and only running sums are kept:
+    per-question correct counts, per-option selection counts, the sums
+    needed for point-biserial correlations and histograms of the overall and
+    per-topic number correct. Ingesting a cohort is therefore one pass with
+    memory bounded by the chunk size, and the sums are saved to an `.npz`
+    file so per-student reports can look up percentiles without rescanning
+    the submissions.
+    """
+
+    def __init__(self, question_ids, option_ids, option_positions, option_correct,
+                 question_topics, topics):
+
+        self.question_ids = np.asarray(question_ids, dtype=str)
+        self.option_ids = np.asarray(option_ids, dtype=str)
+        self.option_positions = np.asarray(option_positions, dtype=np.int64)
+        self.option_correct = np.asarray(option_correct, dtype=bool)
+        self.question_topics = np.asarray(question_topics, dtype=np.int64)
+        self.topics = np.asarray(topics, dtype=str)
+        self.prepared_quiz = None
+
+        num_questions = len(self.question_ids)
+        num_topics = len(self.topics)
+        self.topic_sizes = np.bincount(self.question_topics, minlength=num_topics)
+
+        self.submission_count = 0
+        self.correct_sums = np.zeros(num_questions, dtype=np.int64)
+        self.option_counts = np.zeros(len(self.option_ids), dtype=np.int64)
+        self.score_sum = 0
+        self.score_square_sum = 0
+        self.item_score_sums = np.zeros(num_questions, dtype=np.int64)
+        self.score_counts = np.zeros(num_questions + 1, dtype=np.int64)
+        self.topic_score_counts = np.zeros(
+            (num_topics, self.topic_sizes.max(initial=0) + 1), dtype=np.int64)
+
+    @classmethod
+    def from_quiz(cls, quiz_data, question_index=None, compiled_quiz=None):
+
+        prepared_quiz = prepare_quiz(quiz_data, question_index, compiled_quiz)
+        cohort = cls(
+            [str(question['id']) for question in prepared_quiz['questions']],
+            prepared_quiz['option_ids'],
+            prepared_quiz['option_positions'],
+            prepared_quiz['option_correct'][:-1],
+            prepared_quiz['question_topics'],
+            list(prepared_quiz['topic_codes']))
+        cohort.prepared_quiz = prepared_quiz
+
+        return cohort
+
+    def add_submissions(self, quiz_submissions):
+        """Adds a chunk of submissions to the running sums."""
+
+        if self.prepared_quiz is None:
+            raise ValueError("Submissions can only be added to statistics built with from_quiz")
+
+        selected = encode_responses(self.prepared_quiz, quiz_submissions)
+        correct = self.prepared_quiz['option_correct'][selected]
+        scores = correct.sum(axis=1)
+
+        topic_scores = correct @ np.eye(len(self.topics),
+                                        dtype=np.int64)[self.question_topics]
+        width = self.topic_score_counts.shape[1]
+        topic_cells = np.arange(len(self.topics)) * width + topic_scores
+
+        self.submission_count += len(quiz_submissions)
+        self.correct_sums += correct.sum(axis=0)
+        self.option_counts += np.bincount(
+            selected[selected >= 0], minlength=len(self.option_ids))
+        self.score_sum += int(scores.sum())
+        self.score_square_sum += int((scores * scores).sum())
+        self.item_score_sums += scores @ correct
+        self.score_counts += np.bincount(scores, minlength=len(self.score_counts))
+        self.topic_score_counts += np.bincount(
+            topic_cells.ravel(), minlength=self.topic_score_counts.size
+        ).reshape(self.topic_score_counts.shape)
+
+    def add_stream(self, quiz_submissions, chunk_size=SUBMISSION_CHUNK_SIZE):
+        """Adds submissions from any iterable, `chunk_size` at a time."""
+
+        quiz_submissions = iter(quiz_submissions)
+        while True:
+            chunk = list(islice(quiz_submissions, chunk_size))
+            if not chunk:
+                return
+            self.add_submissions(chunk)
+
+    def p_values(self):
+        """Returns the share of the cohort that answered each question correctly."""
+
+        return self.correct_sums / max(self.submission_count, 1)
+
+    def discrimination(self):
+        """
+        Returns the point-biserial correlation of each question with the rest
+        of the test (the number correct on the other questions), or NaN when
+        either has no variance.
+        """
+
+        count = max(self.submission_count, 1)
+        p = self.p_values()
+        mean_score = self.score_sum / count
+        score_variance = self.score_square_sum / count - mean_score ** 2
+        item_variance = p * (1 - p)
+        item_score_covariance = self.item_score_sums / count - p * mean_score
+
+        # Rest score = score - item, so its moments follow from the score's.
+        rest_covariance = item_score_covariance - item_variance
+        rest_variance = score_variance - 2 * item_score_covariance + item_variance
+        denominator = np.sqrt(item_variance * rest_variance)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(denominator > 1e-12, rest_covariance / denominator, np.nan)
+
+    def option_selection_rates(self):
+        """Returns the share of the cohort that selected each option."""
+
+        return self.option_counts / max(self.submission_count, 1)
+
+    def topic_accuracy(self):
+        """Returns the cohort's accuracy on each topic, keyed by topic."""
+
+        topic_correct = np.bincount(self.question_topics, weights=self.correct_sums,
+                                    minlength=len(self.topics))
+        totals = self.topic_sizes * max(self.submission_count, 1)
+
+        return {topic: float(topic_correct[code] / totals[code] * 100)
+                for code, topic in enumerate(self.topics.tolist())}
+
+    def percentile(self, overall_accuracy):
+        """Returns the percentage of the cohort that scored lower than `overall_accuracy`."""
+
+        return _percentile(self.score_counts, overall_accuracy, len(self.question_ids))
+
+    def topic_percentiles(self, topic_performance):
+        """
+        Returns, for each topic of a student's `topic_performance`, the
+        percentage of the cohort that answered fewer of its questions correctly.
+        """
+
+        # Keyed by canonical topic, so statistics saved under another
+        # spelling of a topic still match.
+        topic_codes = {}
+        for code, topic in enumerate(self.topics.tolist()):
+            topic_codes.setdefault(topic_key(topic), code)
+        percentiles = {}
+        for topic, performance in topic_performance.items():
+            code = topic_codes.get(topic_key(topic))
+            if code is None or not self.topic_sizes[code]:
+                continue
+            accuracy = performance['correct'] / self.topic_sizes[code] * 100
+            percentiles[topic] = _percentile(
+                self.topic_score_counts[code], accuracy, self.topic_sizes[code])
+
+        return percentiles
+
+    def item_statistics(self):
+        """
+        Returns one dict per question with its p-value, discrimination and
+        the selection rate of each of its options.
+        """
+
+        p_values = self.p_values().tolist()
+        discrimination = self.discrimination().tolist()
+        rates = self.option_selection_rates().tolist()
+
+        items = [{'question_id': question_id, 'p_value': p_value,
+                  'discrimination': None if np.isnan(value) else value,
+                  'option_selection_rates': {}}
+                 for question_id, p_value, value in zip(
+                     self.question_ids.tolist(), p_values, discrimination)]
+        for option_id, position, rate in zip(self.option_ids.tolist(),
+                                             self.option_positions.tolist(), rates):
+            items[position]['option_selection_rates'][option_id] = rate
+
+        return items
+
+    def save(self, path=COHORT_STATS_FILE):
+
+        np.savez(
+            path, question_ids=self.question_ids, option_ids=self.option_ids,
+            option_positions=self.option_positions, option_correct=self.option_correct,
+            question_topics=self.question_topics, topics=self.topics,
+            submission_count=self.submission_count, correct_sums=self.correct_sums,
+            option_counts=self.option_counts, score_sum=self.score_sum,
+            score_square_sum=self.score_square_sum, item_score_sums=self.item_score_sums,
+            score_counts=self.score_counts, topic_score_counts=self.topic_score_counts)
+
+    @classmethod
+    def load(cls, path=COHORT_STATS_FILE, quiz_data=None, question_index=None,
+             compiled_quiz=None):
+        """
+        Loads saved statistics. Pass the quiz to keep adding submissions to
+        them; its questions and options must match the saved ones.
+        """
+
+        with np.load(path, allow_pickle=False) as data:
+            cohort = cls(data['question_ids'], data['option_ids'], data['option_positions'],
+                         data['option_correct'], data['question_topics'], data['topics'])
+            cohort.submission_count = int(data['submission_count'])
+            cohort.correct_sums = data['correct_sums']
+            cohort.option_counts = data['option_counts']
+            cohort.score_sum = int(data['score_sum'])
+            cohort.score_square_sum = int(data['score_square_sum'])
+            cohort.item_score_sums = data['item_score_sums']
+            cohort.score_counts = data['score_counts']
+            cohort.topic_score_counts = data['topic_score_counts']
+
+        if quiz_data is not None:
+            prepared_quiz = prepare_quiz(quiz_data, question_index, compiled_quiz)
+            if list(prepared_quiz['option_ids']) != cohort.option_ids.tolist() or \
+                    prepared_quiz['option_positions'].tolist() != cohort.option_positions.tolist():
+                raise ValueError("The quiz does not match the saved cohort statistics")
+            cohort.prepared_quiz = prepared_quiz
+
+        return cohort
+
+
+def _percentile(score_counts, accuracy, num_questions):
+
+    total = int(score_counts.sum())
+    if not total:
+        return None
+
+    # Scores are whole numbers of correct answers.
+    score = int(round(accuracy * num_questions / 100))
+
+    return float(score_counts[:min(max(score, 0), len(score_counts))].sum() / total * 100)
+
+
+def add_cohort_percentiles(analysis_results, cohort):
+    """
+    Adds the student's overall and per-topic percentiles within `cohort` to
+    the results of `analyze_quiz_data_advanced`.
+    """
+
+    analysis_results['cohort_percentile'] = cohort.percentile(
+        analysis_results['overall_accuracy'])
+    analysis_results['topic_percentiles'] = cohort.topic_percentiles(
+        analysis_results['topic_performance'])
+
+    return analysis_results
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Compute item statistics over every submission to a quiz.")
+    parser.add_argument('--quiz', default='current_test_data.txt')
+    parser.add_argument('--submissions', required=True,
+                        help="JSON array or NDJSON of submissions to the quiz")
+    parser.add_argument('--index', default=QUESTION_INDEX_FILE)
+    parser.add_argument('--compiled', default=COMPILED_QUIZ_FILE)
+    parser.add_argument('--bank', help="memory-mapped quiz bank compiled from --quiz by quiz_bank.py")
+    parser.add_argument('--output', default=COHORT_STATS_FILE)
+    args = parser.parse_args(argv)
+
+    quiz_data, question_index, compiled_quiz = load_quiz(
+        args.quiz, args.index, args.compiled, args.bank)
+    cohort = CohortAnalytics.from_quiz(quiz_data, question_index, compiled_quiz)
+    cohort.add_stream(iter_history_records(args.submissions))
+    cohort.save(args.output)
+
+    print(json.dumps({
+        'submission_count': cohort.submission_count,
+        'topic_accuracy': cohort.topic_accuracy(),
+        'items': cohort.item_statistics()
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
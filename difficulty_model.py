@@ -0,0 +1,258 @@
+# difficulty_model.py
+import argparse
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from nlp_utils import WORD_PATTERN, predict_difficulty_level
+
+DIFFICULTY_MODEL_FILE = 'difficulty_model.npz'
+DIFFICULTY_LEVELS = ('Easy', 'Medium', 'Hard')
+# Questions answered correctly by at least EASY_CORRECT_RATE of the cohort
+# are labelled Easy, by at least MEDIUM_CORRECT_RATE Medium, others Hard.
+EASY_CORRECT_RATE = 0.7
+MEDIUM_CORRECT_RATE = 0.4
+REGULARIZATION = 1e-3
+
+
+def question_text(question):
+
+    return (question.get('description') or "") + " " + (question.get('detailed_solution') or "")
+
+
+def labels_from_correct_rates(correct_rates):
+    """Maps the share of a cohort answering each question correctly to a difficulty level."""
+
+    correct_rates = np.asarray(correct_rates, dtype=np.float64)
+    codes = np.where(correct_rates >= EASY_CORRECT_RATE, 0,
+                     np.where(correct_rates >= MEDIUM_CORRECT_RATE, 1, 2))
+
+    return [DIFFICULTY_LEVELS[code] for code in codes.tolist()]
+
+
+class DifficultyModel:
+    """
+    Multinomial logistic regression over TF-IDF features of the question
+    and solution text, plus the log of the text length that the heuristic
+    `predict_difficulty_level` relies on.
+
+    A whole quiz is featurized into one sparse matrix and scored with a
+    single matrix product, so predicting every question of a bank costs one
+    call rather than one per question.
+    """
+
+    def __init__(self, vocabulary, idf, weights, bias, labels, fingerprint=None):
+
+        self.vocabulary = {word: column for column, word in enumerate(vocabulary)}
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.labels = [str(label) for label in labels]
+        self.fingerprint = fingerprint
+
+    @staticmethod
+    def _term_counts(texts, vocabulary, grow=False):
+
+        from scipy import sparse
+
+        rows = []
+        columns = []
+        lengths = []
+        for row, text in enumerate(texts):
+            for word in WORD_PATTERN.findall(text.lower()):
+                column = vocabulary.get(word)
+                if column is None:
+                    if not grow:
+                        continue
+                    column = vocabulary[word] = len(vocabulary)
+                rows.append(row)
+                columns.append(column)
+            lengths.append(len(text))
+
+        counts = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, columns)), shape=(len(texts), len(vocabulary)))
+        counts.sum_duplicates()
+
+        return counts, np.array(lengths, dtype=np.float64)
+
+    @staticmethod
+    def _features(counts, lengths, idf):
+
+        from scipy import sparse
+
+        tfidf = sparse.csr_matrix(counts.multiply(idf))
+        norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1))).ravel()
+        norms[norms == 0] = 1
+        tfidf = sparse.diags(1 / norms) @ tfidf
+
+        return sparse.hstack([tfidf, np.log1p(lengths)[:, None]], format='csr')
+
+    @classmethod
+    def fit(cls, texts, labels, regularization=REGULARIZATION):
+        """
+        Fits the model by minimizing the L2-regularized cross-entropy with
+        L-BFGS.
+
+        Args:
+            texts (list): Question plus solution text of each question.
+            labels (list): Difficulty level of each question.
+            regularization (float): L2 penalty on the weights.
+
+        Returns:
+            DifficultyModel: The fitted model.
+        """
+
+        from scipy.optimize import minimize
+
+        vocabulary = {}
+        counts, lengths = cls._term_counts(texts, vocabulary, grow=True)
+        document_frequency = np.bincount(counts.indices, minlength=len(vocabulary))
+        idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+        features = cls._features(counts, lengths, idf)
+
+        classes = [level for level in DIFFICULTY_LEVELS if level in set(labels)]
+        targets = np.zeros((len(texts), len(classes)))
+        targets[np.arange(len(texts)), [classes.index(label) for label in labels]] = 1
+
+        num_features = features.shape[1]
+        num_classes = len(classes)
+
+        def loss(parameters):
+            weights = parameters[:-num_classes].reshape(num_features, num_classes)
+            bias = parameters[-num_classes:]
+            probabilities = _softmax(features @ weights + bias)
+            error = (probabilities - targets) / len(texts)
+            value = -np.sum(targets * np.log(probabilities + 1e-12)) / len(texts) + \
+                regularization / 2 * np.sum(weights ** 2)
+            gradient = np.concatenate([
+                (features.T @ error + regularization * weights).ravel(), error.sum(axis=0)])
+            return value, gradient
+
+        result = minimize(loss, np.zeros(num_features * num_classes + num_classes),
+                          jac=True, method='L-BFGS-B')
+        words = sorted(vocabulary, key=vocabulary.get)
+
+        return cls(words, idf, result.x[:-num_classes].reshape(num_features, num_classes),
+                   result.x[-num_classes:], classes)
+
+    def predict(self, texts):
+        """Predicts the difficulty level of every text in one matrix product."""
+
+        if not texts:
+            return []
+
+        counts, lengths = self._term_counts(texts, self.vocabulary)
+        scores = self._features(counts, lengths, self.idf) @ self.weights + self.bias
+
+        return [self.labels[code] for code in np.argmax(scores, axis=1).tolist()]
+
+    def save(self, path=DIFFICULTY_MODEL_FILE):
+
+        words = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez(path, vocabulary=np.array(words, dtype=str), idf=self.idf,
+                 weights=self.weights, bias=self.bias, labels=np.array(self.labels, dtype=str))
+
+    @classmethod
+    def load(cls, path=DIFFICULTY_MODEL_FILE):
+
+        with open(path, 'rb') as f:
+            fingerprint = hashlib.sha256(f.read()).hexdigest()[:16]
+
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['vocabulary'].tolist(), data['idf'], data['weights'],
+                       data['bias'], data['labels'].tolist(), fingerprint)
+
+
+def _softmax(scores):
+
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exponentials = np.exp(scores)
+
+    return exponentials / exponentials.sum(axis=1, keepdims=True)
+
+
+@lru_cache(maxsize=None)
+def get_difficulty_model(path=DIFFICULTY_MODEL_FILE):
+    """
+    Returns the difficulty model saved at `path`, loading it once per
+    process, or None when no model has been trained.
+    """
+
+    if not os.path.exists(path):
+        return None
+
+    return DifficultyModel.load(path)
+
+
+def difficulty_model_fingerprint(path=DIFFICULTY_MODEL_FILE):
+    """Identifies the model `predict_difficulty_levels` uses; None for the heuristic."""
+
+    model = get_difficulty_model(path)
+
+    return model.fingerprint if model is not None else None
+
+
+def predict_difficulty_levels(questions, path=DIFFICULTY_MODEL_FILE):
+    """
+    Predicts the difficulty level of many questions in one batch, with the
+    trained model when there is one and the `predict_difficulty_level`
+    heuristic otherwise.
+    """
+
+    model = get_difficulty_model(path)
+    if model is None:
+        return [predict_difficulty_level(question['description'], question['detailed_solution'])
+                for question in questions]
+
+    return model.predict([question_text(question) for question in questions])
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Trains the difficulty model on cohort correctness rates.")
+    parser.add_argument('--quiz', action='append', required=True,
+                        help="quiz JSON; repeat together with --cohort for each quiz")
+    parser.add_argument('--cohort', action='append', required=True,
+                        help="cohort statistics of the matching --quiz, from cohort_analytics.py")
+    parser.add_argument('--output', default=DIFFICULTY_MODEL_FILE)
+    args = parser.parse_args(argv)
+
+    if len(args.quiz) != len(args.cohort):
+        parser.error("pass one --cohort for every --quiz")
+
+    # Imported here because cohort_analytics depends on question_index,
+    # which imports this module.
+    from cohort_analytics import CohortAnalytics
+
+    texts = []
+    labels = []
+    for quiz_path, cohort_path in zip(args.quiz, args.cohort):
+        with open(quiz_path, 'r') as f:
+            quiz_data = json.load(f)
+        cohort = CohortAnalytics.load(cohort_path)
+        if not cohort.submission_count:
+            continue
+
+        questions = {str(question['id']): question for question in quiz_data['quiz']['questions']}
+        for question_id, label in zip(cohort.question_ids.tolist(),
+                                      labels_from_correct_rates(cohort.p_values())):
+            if question_id in questions:
+                texts.append(question_text(questions[question_id]))
+                labels.append(label)
+
+    if not texts:
+        parser.error("the cohorts have no submissions to train on")
+
+    model = DifficultyModel.fit(texts, labels)
+    model.save(args.output)
+
+    print(f"Trained on {len(texts)} questions: "
+          + ", ".join(f"{level} {labels.count(level)}" for level in model.labels))
+
+
+if __name__ == "__main__":
+    main()
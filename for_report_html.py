@@ -1,226 +1,18 @@
+import argparse
 import json
-from collections import defaultdict
-import numpy as np
-import matplotlib.pyplot as plt
-from nlp_utils import predict_difficulty_level, assess_option_confusingness
-import base64
-import io
-
-
-def analyze_quiz_data_advanced(quiz_data, quiz_submission_data):
-
-    questions = quiz_data['quiz']['questions']
-    total_questions_quiz_data = len(questions)
-    response_map = quiz_submission_data.get('response_map', {})
-
-    final_score = quiz_submission_data.get('final_score')
-    negative_score = quiz_submission_data.get('negative_score')
-    correct_answers_count = quiz_submission_data.get('correct_answers')
-    incorrect_answers_count = quiz_submission_data.get('incorrect_answers')
-    source = quiz_submission_data.get('source')
-    quiz_type = quiz_submission_data.get('type')
-    started_at = quiz_submission_data.get('started_at')
-    ended_at = quiz_submission_data.get('ended_at')
-    duration = quiz_submission_data.get('duration')
-    better_than = quiz_submission_data.get('better_than')
-    total_questions = quiz_submission_data.get('total_questions')
-
-    topic_performance = defaultdict(lambda: {'correct': 0, 'total': 0})
-    difficulty_performance = defaultdict(lambda: {'correct': 0, 'total': 0})
-    correct_count = 0
-
-    question_categories = {
-        "Easy - Correct": [],
-        "Easy - Incorrect": [],
-        "Medium - Correct": [],
-        "Medium - Incorrect": [],
-        "Hard - Correct": [],
-        "Hard - Incorrect": []
-    }
-
-    default_difficulty = quiz_data['quiz'].get(
-        'difficulty_level', 'Not Specified')
-
-    for question in questions:
-        question_id = str(question['id'])
-        topic = question['topic']
-
-        difficulty = question.get('difficulty_level', default_difficulty)
-
-        if difficulty is None or difficulty == "Not Specified":
-            question['difficulty_level'] = predict_difficulty_level(
-                question['description'], question['detailed_solution'])
-            difficulty = question['difficulty_level']
-
-        if difficulty is None:
-            difficulty = "Not Specified"
-
-        is_correct = False
-        if question_id in response_map:
-            selected_option_id = str(response_map[question_id])
-
-            for option in question['options']:
-                if str(option['id']) == selected_option_id:
-                    if option['is_correct']:
-                        is_correct = True
-                    break
-
-        topic_performance[topic]['total'] += 1
-        difficulty_performance[difficulty]['total'] += 1
-
-        if is_correct:
-            topic_performance[topic]['correct'] += 1
-            difficulty_performance[difficulty]['correct'] += 1
-            correct_count += 1
-
-        if is_correct:
-            category = f"{difficulty} - Correct"
-        else:
-            category = f"{difficulty} - Incorrect"
-        question_categories[category].append(question)
-
-        confusingness_score = assess_option_confusingness(question['options'])
-        question['confusingness'] = confusingness_score
-
-    overall_accuracy = (correct_count / total_questions_quiz_data) * \
-        100 if total_questions_quiz_data > 0 else 0
-
-    weak_topics = []
-    for topic, performance in topic_performance.items():
-        accuracy = (performance['correct'] / performance['total']
-                    ) * 100 if performance['total'] > 0 else 0
-        if accuracy < 60:
-            weak_topics.append({'topic': topic, 'accuracy': accuracy})
-
-    weak_topics = sorted(weak_topics, key=lambda x: x['accuracy'])
-
-    difficulty_analysis = []
-    for difficulty, performance in difficulty_performance.items():
-        accuracy = (performance['correct'] / performance['total']
-                    ) * 100 if performance['total'] > 0 else 0
-        difficulty_analysis.append(
-            {'difficulty': difficulty, 'accuracy': accuracy})
-
-    difficulty_analysis = sorted(
-        difficulty_analysis, key=lambda x: x['accuracy'])
-
-    recommendations = []
-
-    if weak_topics:
-        recommendations.append(
-            f"Focus on improving your understanding of the following topics: {', '.join([t['topic'] for t in weak_topics])}")
-    else:
-        recommendations.append(
-            "Good job! You have a strong understanding of all topics covered in this quiz.")
-
-    recommendations.append(
-        "Consider reviewing the detailed solutions for questions you answered incorrectly to reinforce your understanding.")
-
-    recommendations.append("\nQuestion Category Analysis:")
-    for category, questions_list in question_categories.items():
-        num_incorrect = len(questions_list)
-        recommendations.append(f"  - {category} (Count: {num_incorrect})")
-        if num_incorrect > 0:
-            recommendations.append("     Sample questions:")
-            for i in range(min(3, num_incorrect)):
-                recommendations.append(
-                    f"       - {questions_list[i]['description'][:100]}...")
-
-    student_persona = generate_student_persona(
-        overall_accuracy, weak_topics, difficulty_analysis)
-
-    results = {
-        "overall_accuracy": overall_accuracy,
-        "weak_topics": weak_topics,
-        "difficulty_analysis": difficulty_analysis,
-        "recommendations": recommendations,
-        "question_categories": question_categories,
-        "student_persona": student_persona,
-        "final_score": final_score,
-        "negative_score": negative_score,
-        "correct_answers": correct_answers_count,
-        "incorrect_answers": incorrect_answers_count,
-        "source": source,
-        "type": quiz_type,
-        "started_at": started_at,
-        "ended_at": ended_at,
-        "duration": duration,
-        "better_than": better_than,
-        "total_questions": total_questions
-    }
-
-    return results
-
-
-def generate_student_persona(overall_accuracy, weak_topics, difficulty_analysis):
-
-    persona = {}
-
-    if overall_accuracy >= 90:
-        persona['name'] = "The Ace"
-        persona['description'] = "Consistently demonstrates mastery. Excels in understanding and application."
-        persona['strengths'] = "Strong grasp of fundamental concepts, excellent problem-solving skills."
-        persona['weaknesses'] = "Potential overconfidence, may benefit from exploring advanced topics."
-    elif overall_accuracy >= 70:
-        persona['name'] = "The Diligent Learner"
-        persona['description'] = "Shows good understanding with room for improvement. Responds well to targeted practice."
-        persona['strengths'] = "Solid foundation, consistent effort, willing to learn."
-        persona['weaknesses'] = "Inconsistencies in applying knowledge, needs to reinforce weaker areas."
-    else:
-        persona['name'] = "The Budding Biologist"
-        persona['description'] = "Demonstrates potential but struggles with core concepts. Requires focused attention and practice."
-        persona['strengths'] = "Enthusiastic and curious."
-        persona['weaknesses'] = "Gaps in foundational knowledge, needs a structured approach to learning."
-
-    if weak_topics:
-        persona['specific_weaknesses'] = f"Struggles with: {', '.join([t['topic'] for t in weak_topics])}"
-    else:
-        persona['specific_weaknesses'] = "No significant topic weaknesses identified."
-
-    if difficulty_analysis and all(item['difficulty'] in ["Not Specified", None, ""] for item in difficulty_analysis) is False:
-        valid_difficulties = [
-            d for d in difficulty_analysis if d['difficulty'] != "Not Specified"]
-        easiest = valid_difficulties[-1]['difficulty'] if valid_difficulties else "Unknown"
-        hardest = valid_difficulties[0]['difficulty'] if valid_difficulties else "Unknown"
-        persona['difficulty_profile'] = f"Excels at {easiest} difficulty, struggles with {hardest}."
-    else:
-        persona['difficulty_profile'] = "Difficulty level performance is not specified"
-
-    return persona
-
-
-def predict_neet_rank(quiz_accuracy):
-
-    predicted_rank = predict_rank_from_dataset(quiz_accuracy)
-
-    return predicted_rank
-
-
-def predict_rank_from_dataset(quiz_accuracy):
-
-    global neet_data
-
-    predicted_score = quiz_accuracy / 100 * 720
-
-    nearest_index = np.argmin(np.abs(neet_data['score'] - predicted_score))
-
-    predicted_rank = neet_data['rank'][nearest_index]
-
-    return predicted_rank
-
-
-neet_data = {
-    'score': [100, 150, 200, 250, 300, 350, 400, 450, 500, 510, 520, 530, 640, 650, 660, 670, 680, 690, 700, 710, 715, 720],
-    'rank': [700000, 650000, 600000, 550000, 450000, 400000, 350000, 300000, 250000, 240000, 230000, 220000, 110000, 100000, 90000, 80000, 70000, 60000, 50000, 25000, 12500, 1]
-}
-
-neet_data['score'] = np.array(neet_data['score'])
-neet_data['rank'] = np.array(neet_data['rank'])
-
-
-def generate_html_report(analysis_results):
-
-    html_content = f"""
+from cohort_analytics import CohortAnalytics, add_cohort_percentiles
+from mastery_model import add_topic_mastery, load_mastery_model
+from performance_store import PerformanceStore, submission_attempt
+from practice_index import PracticeIndex, recommend_practice_questions
+from question_index import QUESTION_INDEX_FILE
+from report_renderer import compile_template, stream_items
+from quiz_analysis import analyze_quiz_data_advanced
+from pipeline_timing import add_instrumentation_arguments, instrument, stage
+from quiz_bank import load_quiz
+from quiz_compiler import COMPILED_QUIZ_FILE
+
+
+QUIZ_REPORT_TEMPLATE = compile_template("""
     <!DOCTYPE html>
     <html>
     <head>
@@ -238,66 +30,186 @@ def generate_html_report(analysis_results):
 
         <div class="section">
             <h2>Overall Performance</h2>
-            <p class="insight"><strong>Overall Accuracy:</strong> {analysis_results['overall_accuracy']:.2f}%</p>
-            <p class="insight"><strong>Final Score:</strong> {analysis_results['final_score']}</p>
-            <p class="insight"><strong>Negative Score:</strong> {analysis_results['negative_score']}</p>
-            <p class="insight"><strong>Correct Answers:</strong> {analysis_results['correct_answers']}</p>
-            <p class="insight"><strong>Incorrect Answers:</strong> {analysis_results['incorrect_answers']}</p>
-            <p class="insight"><strong>Source:</strong> {analysis_results['source']}</p>
-            <p class="insight"><strong>Type:</strong> {analysis_results['type']}</p>
-            <p class="insight"><strong>Started At:</strong> {analysis_results['started_at']}</p>
-            <p class="insight"><strong>Ended At:</strong> {analysis_results['ended_at']}</p>
-            <p class="insight"><strong>Duration:</strong> {analysis_results['duration']}</p>
-            <p class="insight"><strong>Better Than:</strong> {analysis_results['better_than']}%</p>
-            <p class="insight"><strong>Total Questions:</strong> {analysis_results['total_questions']}</p>
+            <p class="insight"><strong>Overall Accuracy:</strong> {overall_accuracy:.2f}%</p>
+            <p class="insight"><strong>Final Score:</strong> {final_score}</p>
+            <p class="insight"><strong>Negative Score:</strong> {negative_score}</p>
+            <p class="insight"><strong>Correct Answers:</strong> {correct_answers}</p>
+            <p class="insight"><strong>Incorrect Answers:</strong> {incorrect_answers}</p>
+            <p class="insight"><strong>Source:</strong> {source}</p>
+            <p class="insight"><strong>Type:</strong> {type}</p>
+            <p class="insight"><strong>Started At:</strong> {started_at}</p>
+            <p class="insight"><strong>Ended At:</strong> {ended_at}</p>
+            <p class="insight"><strong>Duration:</strong> {duration}</p>
+            <p class="insight"><strong>Better Than:</strong> {better_than}%</p>{cohort_percentile_item}
+            <p class="insight"><strong>Total Questions:</strong> {total_questions}</p>
         </div>
 
         <div class="section">
             <h2>Weak Topics</h2>
             <ul>
-                {"".join(f"<li>{topic_data['topic']}: {topic_data['accuracy']:.2f}% accuracy</li>" for topic_data in analysis_results['weak_topics'])}
+                {weak_topic_items}
             </ul>
-        </div>
+        </div>{topic_mastery_section}{topic_percentile_section}
 
         <div class="section">
             <h2>Difficulty Level Analysis</h2>
             <ul>
-                {"".join(f"<li>{difficulty_data['difficulty']}: {difficulty_data['accuracy']:.2f}% accuracy</li>" for difficulty_data in analysis_results['difficulty_analysis'])}
+                {difficulty_items}
             </ul>
         </div>
 
         <div class="section">
             <h2>Recommendations</h2>
             <ul>
-                {"".join(f"<li>{recommendation}</li>" for recommendation in analysis_results['recommendations'])}
+                {recommendation_items}
             </ul>
-        </div>
+        </div>{practice_section}
 
         <div class="section">
             <h2>Student Persona</h2>
-            <p class="insight"><strong>Name:</strong> {analysis_results['student_persona']['name']}</p>
-            <p class="insight"><strong>Description:</strong> {analysis_results['student_persona']['description']}</p>
-            <p class="insight"><strong>Strengths:</strong> {analysis_results['student_persona']['strengths']}</p>
-            <p class="insight"><strong>Weaknesses:</strong> {analysis_results['student_persona']['weaknesses']}</p>
+            <p class="insight"><strong>Name:</strong> {student_persona[name]}</p>
+            <p class="insight"><strong>Description:</strong> {student_persona[description]}</p>
+            <p class="insight"><strong>Strengths:</strong> {student_persona[strengths]}</p>
+            <p class="insight"><strong>Weaknesses:</strong> {student_persona[weaknesses]}</p>
         </div>
     </body>
     </html>
-    """
-    return html_content
+    """)
+
+
+def quiz_report_context(analysis_results):
+
+    context = dict(analysis_results)
+    context['weak_topic_items'] = stream_items(
+        "<li>{topic}: {accuracy:.2f}% accuracy</li>", analysis_results['weak_topics'])
+    context['difficulty_items'] = stream_items(
+        "<li>{difficulty}: {accuracy:.2f}% accuracy</li>", analysis_results['difficulty_analysis'])
+    context['recommendation_items'] = stream_items(
+        "<li>{recommendation}</li>",
+        ({'recommendation': recommendation} for recommendation in analysis_results['recommendations']))
+    context['cohort_percentile_item'] = stream_items(
+        '\n            <p class="insight"><strong>Cohort Percentile:</strong> {cohort_percentile:.1f}%</p>',
+        [analysis_results] if analysis_results.get('cohort_percentile') is not None else [])
+    context['topic_mastery_section'] = stream_items(
+        """
+
+        <div class="section">
+            <h2>Topic Mastery</h2>
+            <ul>
+                {items}
+            </ul>
+        </div>""",
+        [{'items': ''.join(f"<li>{topic}: {mastery:.1f}% mastery</li>"
+                           for topic, mastery in analysis_results['topic_mastery'].items())}]
+        if analysis_results.get('topic_mastery') else [])
+    context['topic_percentile_section'] = stream_items(
+        """
 
+        <div class="section">
+            <h2>Cohort Topic Percentiles</h2>
+            <ul>
+                {items}
+            </ul>
+        </div>""",
+        [{'items': ''.join(f"<li>{topic}: {percentile:.1f}% of the cohort scored lower</li>"
+                           for topic, percentile in analysis_results['topic_percentiles'].items()
+                           if percentile is not None)}]
+        if analysis_results.get('cohort_percentile') is not None and
+        analysis_results.get('topic_percentiles') else [])
+    context['practice_section'] = stream_items(
+        """
 
-with open('current_test_data.txt', 'r') as f:
-    quiz_data = json.load(f)
-with open('quiz_submission_data.txt', 'r') as f:
-    quiz_submission_data = json.load(f)
+        <div class="section">
+            <h2>Practice Questions</h2>
+            <ul>
+                {items}
+            </ul>
+        </div>""",
+        [{'items': ''.join(_practice_items(analysis_results['practice_questions']))}]
+        if analysis_results.get('practice_questions') and (
+            analysis_results['practice_questions']['by_question'] or
+            analysis_results['practice_questions']['by_topic']) else [])
+
+    return context
 
-analysis_results = analyze_quiz_data_advanced(quiz_data, quiz_submission_data)
 
+def _practice_items(practice_questions):
 
-html_report = generate_html_report(analysis_results)
+    def practice_list(practice):
+        return ''.join(f"<li>#{question['id']}: {question['description'][:100]}...</li>"
+                       for question in practice)
 
+    for topic, practice in practice_questions['by_topic'].items():
+        yield f"<li>{topic}<ul>{practice_list(practice)}</ul></li>"
+    for question in practice_questions['by_question']:
+        yield f"<li>Similar to \"{question['description'][:100]}...\"<ul>{practice_list(question['practice'])}</ul></li>"
 
-with open('report.html', 'w') as f:
-    f.write(html_report)
 
-print("HTML report generated successfully! Open 'report.html' in your browser to view.")
+def generate_html_report(analysis_results):
+
+    return QUIZ_REPORT_TEMPLATE.render(quiz_report_context(analysis_results))
+
+
+def write_html_report(analysis_results, out):
+    """Streams the HTML report to `out` (a file, socket file or HTTP response)."""
+
+    context = quiz_report_context(analysis_results)
+    with stage('html_build'):
+        QUIZ_REPORT_TEMPLATE.render_to(context, out)
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Generates an HTML report for a single quiz attempt.")
+    parser.add_argument('--quiz', default='current_test_data.txt')
+    parser.add_argument('--submission', default='Quiz_submission_data.txt')
+    parser.add_argument('--index', default=QUESTION_INDEX_FILE)
+    parser.add_argument('--compiled', default=COMPILED_QUIZ_FILE)
+    parser.add_argument('--bank', help="memory-mapped quiz bank compiled from --quiz by quiz_bank.py")
+    parser.add_argument('--output', default='report.html')
+    parser.add_argument('--cohort', help="cohort statistics from cohort_analytics.py, to show percentiles")
+    parser.add_argument('--mastery', help="mastery state from mastery_model.py; the submission is "
+                                          "recorded in it and weak topics are based on mastery")
+    parser.add_argument('--practice-index', help="practice-question index from practice_index.py, "
+                                                 "to recommend similar questions")
+    parser.add_argument('--store', help="performance store (see performance_store.py) to record "
+                                        "the submission in")
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with instrument(args.timings, args.profile):
+        with stage('json_load'), open(args.submission, 'r') as f:
+            quiz_submission_data = json.load(f)
+
+        quiz_data, question_index, compiled_quiz = load_quiz(
+            args.quiz, args.index, args.compiled, args.bank)
+
+        analysis_results = analyze_quiz_data_advanced(
+            quiz_data, quiz_submission_data, question_index, compiled_quiz)
+        if args.cohort:
+            add_cohort_percentiles(analysis_results, CohortAnalytics.load(args.cohort))
+        if args.mastery:
+            mastery_model = load_mastery_model(args.mastery)
+            mastery_model.record_submissions(
+                quiz_data, [quiz_submission_data], question_index, compiled_quiz)
+            add_topic_mastery(analysis_results, mastery_model, quiz_submission_data['user_id'])
+            mastery_model.save(args.mastery)
+        if args.store:
+            attempt = submission_attempt(quiz_submission_data, quiz_data)
+            if attempt is not None:
+                with PerformanceStore(args.store) as performance_store:
+                    performance_store.record_attempt(attempt)
+        if args.practice_index:
+            with PracticeIndex(args.practice_index) as practice_index:
+                recommend_practice_questions(practice_index, analysis_results)
+
+        with open(args.output, 'w') as f:
+            write_html_report(analysis_results, f)
+
+        print(
+            f"HTML report generated successfully! Open '{args.output}' in your browser to view.")
+
+
+if __name__ == "__main__":
+    main()
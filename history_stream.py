@@ -0,0 +1,90 @@
+# history_stream.py
+import io
+import json
+
+READ_CHUNK_SIZE = 1 << 16
+
+
+def iter_history_records(path, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yields the attempt records of a performance-history export one at a time.
+
+    Both export formats are supported: a JSON array of records (like
+    `Performance_data.txt`) and NDJSON with one record per line. Only the
+    record being decoded is held in memory, so multi-GB exports can be
+    processed with constant memory.
+
+    Args:
+        path (str): Location of the export.
+        chunk_size (int): Number of characters read at a time.
+
+    Yields:
+        dict: One attempt record.
+    """
+
+    with open(path, 'rb') as f:
+        first = _peek_non_whitespace(f)
+        if first == b'[':
+            yield from _iter_json_array(f, chunk_size)
+        elif first:
+            yield from _iter_ndjson(io.TextIOWrapper(f, encoding='utf-8'))
+
+
+def _peek_non_whitespace(f):
+
+    while True:
+        position = f.tell()
+        char = f.read(1)
+        if not char or not char.isspace():
+            f.seek(position)
+            return char
+
+
+def _iter_ndjson(f):
+
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _iter_json_array(f, chunk_size):
+
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+    if ijson is not None:
+        yield from ijson.items(f, 'item', use_float=True)
+        return
+
+    f = io.TextIOWrapper(f, encoding='utf-8')
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size)
+    position = buffer.index('[') + 1
+    eof = False
+
+    while True:
+        while position < len(buffer) and (buffer[position].isspace() or buffer[position] == ','):
+            position += 1
+
+        if position < len(buffer) and buffer[position] == ']':
+            return
+
+        try:
+            if position >= len(buffer):
+                raise json.JSONDecodeError("Unterminated array", buffer, position)
+            record, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # The record continues past the end of the buffer: drop what has
+            # been consumed and read on.
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        yield record
+        position = end
@@ -0,0 +1,426 @@
+# mastery_model.py
+import argparse
+import json
+
+import numpy as np
+
+from history_stream import iter_history_records
+from quiz_analysis import (encode_responses, generate_student_persona, prepare_quiz,
+                           topic_recommendation)
+from timestamps import parse_timestamps
+from topic_registry import TopicRegistry
+
+MASTERY_STATE_FILE = 'mastery_state.npz'
+INITIAL_CAPACITY = 64
+# Ratings are in logits: a student rated r on a topic answers a question of
+# difficulty offset b in it correctly with probability 1 / (1 + exp(b - r)).
+DIFFICULTY_OFFSETS = {'Easy': -1.0, 'Medium': 0.0, 'Hard': 1.0}
+# An update moves the rating by K / (responses + RESPONSE_PRIOR) times the
+# surplus of correct answers over the expected number, with
+# K = K_INITIAL / (1 + K_DECAY * earlier attempts), so ratings settle as a
+# topic gathers attempts and one-question attempts move them only a little.
+K_INITIAL = 4.0
+K_DECAY = 0.1
+RESPONSE_PRIOR = 5.0
+WEAK_MASTERY = 60
+STRONG_MASTERY = 75
+NO_SUBMISSION = np.iinfo(np.int64).min
+
+
+def _expit(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _occurrences(keys):
+    """The number of earlier entries of `keys` equal to each entry."""
+
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    run_lengths = np.diff(np.r_[starts, len(keys)])
+    occurrences = np.empty(len(keys), dtype=np.int64)
+    occurrences[order] = np.arange(len(keys)) - np.repeat(starts, run_lengths)
+
+    return occurrences
+
+
+class MasteryModel:
+    """
+    Elo-style mastery estimate for every (student, topic) pair.
+
+    Each pair keeps a rating in logits and its attempt count, in dense
+    (students x topics) arrays with dictionary-encoded student ids and
+    canonical topic ids (see `TopicRegistry`), plus the time of each
+    student's latest recorded submission and the (student, attempt id) of
+    every attempt recorded.
+    An attempt moves a pair's rating by the difference between the correct
+    answers and the number its rating predicted, so recording a submission
+    costs O(responses) and never rereads the student's history. Mastery is
+    the predicted chance, in percent, of answering a Medium question of the
+    topic correctly.
+
+    Submissions and history records are replayed as arrays: every student
+    and topic of a batch is updated at once, in as many rounds as the most
+    attempts a single pair has in the batch. Attempts are recorded at most
+    once, by student and attempt `id` (their submission time when they
+    have none), so replaying an export that overlaps the saved state only
+    adds what is new, whether it is older or newer than what was recorded.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+
+        self.user_ids = []
+        self._user_codes = {}
+        self._topic_registry = TopicRegistry()
+        self._ratings = np.zeros((capacity, 0), dtype=np.float64)
+        self._attempts = np.zeros((capacity, 0), dtype=np.int32)
+        self._last_submitted_at = np.full(capacity, NO_SUBMISSION, dtype=np.int64)
+        self._recorded_attempts = set()
+        # Latest submission of each student in states saved before attempts
+        # were recorded by id; attempts up to it were recorded then.
+        self._legacy_watermark = None
+
+    @property
+    def topics(self):
+        return self._topic_registry.names
+
+    @property
+    def ratings(self):
+        return self._ratings[:len(self.user_ids)]
+
+    @property
+    def attempts(self):
+        return self._attempts[:len(self.user_ids)]
+
+    @property
+    def last_submitted_at(self):
+        return self._last_submitted_at[:len(self.user_ids)]
+
+    def user_codes(self, user_ids):
+        """Row of each of `user_ids`, adding rows for new students."""
+
+        codes = np.empty(len(user_ids), dtype=np.int64)
+        for row, user_id in enumerate(user_ids):
+            user_id = str(user_id)
+            code = self._user_codes.get(user_id)
+            if code is None:
+                code = self._user_codes[user_id] = len(self.user_ids)
+                self.user_ids.append(user_id)
+            codes[row] = code
+
+        if len(self.user_ids) > len(self._last_submitted_at):
+            self._grow(len(self.user_ids))
+
+        return codes
+
+    def topic_codes(self, topics):
+        """Column of each of `topics`, adding columns for new topics."""
+
+        codes = self._topic_registry.topic_ids(topics)
+
+        new_topics = len(self.topics) - self._ratings.shape[1]
+        if new_topics:
+            self._ratings = np.pad(self._ratings, ((0, 0), (0, new_topics)))
+            self._attempts = np.pad(self._attempts, ((0, 0), (0, new_topics)))
+
+        return codes
+
+    def record_submissions(self, quiz_data, quiz_submissions, question_index=None,
+                           compiled_quiz=None):
+        """
+        Updates the mastery of every student in `quiz_submissions` on every
+        topic of the quiz they answered questions in. Unanswered questions
+        are not evidence either way and are left out.
+
+        Args:
+            quiz_data (dict, QuizBank or SharedQuiz): The quiz submitted to.
+            quiz_submissions (list): Submissions with `user_id`,
+                `submitted_at` and `response_map`.
+            question_index (dict, optional): Preloaded question-feature index.
+            compiled_quiz (dict, optional): The quiz compiled by `compile_quiz`.
+
+        Returns:
+            int: The number of submissions recorded.
+        """
+
+        users, submitted_at, rows = self._new_attempts(
+            [quiz_submission_data['user_id'] for quiz_submission_data in quiz_submissions],
+            [quiz_submission_data['submitted_at'] for quiz_submission_data in quiz_submissions],
+            [quiz_submission_data.get('id') for quiz_submission_data in quiz_submissions])
+        if not len(rows):
+            return 0
+
+        prepared_quiz = prepare_quiz(quiz_data, question_index, compiled_quiz)
+        selected = encode_responses(prepared_quiz, [quiz_submissions[row] for row in rows])
+        answered = selected >= 0
+        correct = prepared_quiz['option_correct'][selected]
+
+        columns = self.topic_codes(list(prepared_quiz['topic_codes']))
+        question_topics = prepared_quiz['question_topics']
+        topic_matrix = np.eye(len(columns))[question_topics]
+        difficulty_offsets = np.array(
+            [DIFFICULTY_OFFSETS.get(difficulty, 0.0)
+             for difficulty in prepared_quiz['difficulty_codes']])[
+                 prepared_quiz['question_difficulties']]
+
+        # A student's submissions are applied in time order, one per round.
+        occurrences = _occurrences(users)
+        for occurrence in range(int(occurrences.max()) + 1):
+            batch = np.flatnonzero(occurrences == occurrence)
+            batch_users = users[batch]
+            ratings = self._ratings[batch_users[:, None], columns[question_topics]]
+            expected = (_expit(ratings - difficulty_offsets) * answered[batch]) @ topic_matrix
+            observed = correct[batch] @ topic_matrix
+            responses = answered[batch] @ topic_matrix
+
+            pair_rows, pair_topics = np.nonzero(responses)
+            self._update(batch_users[pair_rows], columns[pair_topics],
+                         observed[pair_rows, pair_topics], expected[pair_rows, pair_topics],
+                         responses[pair_rows, pair_topics])
+
+        np.maximum.at(self._last_submitted_at, users, submitted_at)
+
+        return len(rows)
+
+    def record_history(self, performance_data):
+        """
+        Replays attempt records in the schema of `Performance_data.txt`. Each
+        record counts as `correct_answers` right and `incorrect_answers`
+        wrong answers on its quiz's topic.
+
+        Returns:
+            int: The number of records recorded.
+        """
+
+        records = [(item['user_id'], item['submitted_at'], item.get('id'), item['quiz']['topic'],
+                    item['correct_answers'], item['incorrect_answers'])
+                   for item in performance_data]
+        if not records:
+            return 0
+
+        user_ids, timestamps, attempt_ids, topics, correct_answers, incorrect_answers = \
+            zip(*records)
+        users, submitted_at, rows = self._new_attempts(user_ids, timestamps, attempt_ids)
+        if not len(rows):
+            return 0
+
+        columns = self.topic_codes([topics[row] for row in rows])
+        observed = np.array(correct_answers, dtype=np.float64)[rows]
+        responses = observed + np.array(incorrect_answers, dtype=np.float64)[rows]
+        answered = responses > 0
+        users, columns, observed, responses = (
+            users[answered], columns[answered], observed[answered], responses[answered])
+
+        occurrences = _occurrences(users * len(self.topics) + columns)
+        for occurrence in range(int(occurrences.max(initial=-1)) + 1):
+            batch = occurrences == occurrence
+            expected = responses[batch] * _expit(self._ratings[users[batch], columns[batch]])
+            self._update(users[batch], columns[batch], observed[batch], expected,
+                         responses[batch])
+
+        np.maximum.at(self._last_submitted_at, users, submitted_at[answered])
+
+        return len(rows)
+
+    def record_stream(self, performance_data):
+        """
+        Passes attempt records through while keeping what the model needs
+        from each, and replays them with `record_history` once the stream
+        is exhausted, so the model can be updated in the same pass that
+        builds a report.
+        """
+
+        records = []
+        for item in performance_data:
+            records.append({'id': item.get('id'), 'user_id': item['user_id'],
+                            'submitted_at': item['submitted_at'],
+                            'quiz': {'topic': item['quiz']['topic']},
+                            'correct_answers': item['correct_answers'],
+                            'incorrect_answers': item['incorrect_answers']})
+            yield item
+
+        self.record_history(records)
+
+    def topic_mastery(self, user_id, topics=None):
+        """
+        The student's mastery of `topics` (default: every topic they have
+        attempted), in percent. Topics they have not attempted are left out.
+        """
+
+        row = self._user_codes.get(str(user_id))
+        if row is None:
+            return {}
+
+        if topics is None:
+            topics = self.topics
+        mastery = {}
+        for topic in topics:
+            column = self._topic_registry.get(topic)
+            if column is not None and self._attempts[row, column]:
+                mastery[topic] = float(_expit(self._ratings[row, column]) * 100)
+
+        return mastery
+
+    def _new_attempts(self, user_ids, timestamps, attempt_ids):
+        """
+        Encodes the students and times of a batch of attempts and orders it
+        by time, dropping attempts already recorded (and repeats within the
+        batch), and marks the rest recorded. Returns the user codes, times
+        (in ms) and original positions of the attempts kept.
+        """
+
+        users = self.user_codes(user_ids)
+        submitted_at = parse_timestamps(list(timestamps)).astype(np.int64)
+
+        candidates = range(len(users))
+        if self._legacy_watermark is not None:
+            watermark = np.full(len(users), NO_SUBMISSION, dtype=np.int64)
+            known = users < len(self._legacy_watermark)
+            watermark[known] = self._legacy_watermark[users[known]]
+            candidates = np.flatnonzero(submitted_at > watermark).tolist()
+
+        rows = []
+        for row in candidates:
+            key = (str(user_ids[row]),
+                   str(timestamps[row] if attempt_ids[row] is None else attempt_ids[row]))
+            if key not in self._recorded_attempts:
+                self._recorded_attempts.add(key)
+                rows.append(row)
+
+        rows = np.array(rows, dtype=np.int64)
+        rows = rows[np.argsort(submitted_at[rows], kind='stable')]
+
+        return users[rows], submitted_at[rows], rows
+
+    def _update(self, users, columns, observed, expected, responses):
+        # Each (user, column) pair appears at most once per call.
+
+        attempts = self._attempts[users, columns]
+        step = K_INITIAL / (1 + K_DECAY * attempts) / (responses + RESPONSE_PRIOR)
+        self._ratings[users, columns] += step * (observed - expected)
+        self._attempts[users, columns] = attempts + 1
+
+    def _grow(self, size):
+
+        capacity = max(2 * len(self._last_submitted_at), size)
+        extra = capacity - len(self._last_submitted_at)
+        self._ratings = np.pad(self._ratings, ((0, extra), (0, 0)))
+        self._attempts = np.pad(self._attempts, ((0, extra), (0, 0)))
+        self._last_submitted_at = np.pad(
+            self._last_submitted_at, (0, extra), constant_values=NO_SUBMISSION)
+
+    def save(self, path=MASTERY_STATE_FILE):
+
+        np.savez(
+            path, user_ids=np.asarray(self.user_ids, dtype=str),
+            topics=np.asarray(self.topics, dtype=str), ratings=self.ratings,
+            attempts=self.attempts, last_submitted_at=self.last_submitted_at,
+            recorded_attempts=np.array(sorted(self._recorded_attempts), dtype=str).reshape(-1, 2))
+
+    @classmethod
+    def load(cls, path=MASTERY_STATE_FILE):
+
+        with np.load(path, allow_pickle=False) as data:
+            model = cls(capacity=max(len(data['user_ids']), INITIAL_CAPACITY))
+            model.user_codes(data['user_ids'].tolist())
+            columns = model.topic_codes(data['topics'].tolist())
+            size = len(model.user_ids)
+            ratings, attempts = data['ratings'], data['attempts']
+            if len(model.topics) < len(columns):
+                # Topics saved apart that are now one canonical topic are
+                # merged, their ratings weighted by attempts.
+                merged = np.zeros((len(model.topics), 2, size))
+                np.add.at(merged, columns, np.stack([ratings * attempts, attempts], axis=1).T)
+                ratings = merged[:, 0].T / np.maximum(merged[:, 1].T, 1)
+                attempts = merged[:, 1].T
+            model._ratings[:size] = ratings
+            model._attempts[:size] = attempts
+            model._last_submitted_at[:size] = data['last_submitted_at']
+            if 'recorded_attempts' in data:
+                model._recorded_attempts = set(map(tuple, data['recorded_attempts'].tolist()))
+            else:
+                model._legacy_watermark = data['last_submitted_at'].copy()
+
+        return model
+
+
+def load_mastery_model(path=MASTERY_STATE_FILE):
+    """Loads the saved mastery state at `path`, or starts an empty one if there is none."""
+
+    try:
+        return MasteryModel.load(path)
+    except FileNotFoundError:
+        return MasteryModel()
+
+
+def add_topic_mastery(analysis_results, mastery_model, user_id):
+    """
+    Adds the student's mastery of each quiz topic to the results of
+    `analyze_quiz_data_advanced` and bases the weak topics, and the
+    recommendation and persona that mention them, on mastery instead of
+    this quiz's accuracy alone. Record the submission in `mastery_model`
+    first so its answers count.
+    """
+
+    topic_performance = analysis_results['topic_performance']
+    topic_mastery = mastery_model.topic_mastery(user_id, list(topic_performance))
+
+    weak_topics = []
+    for topic, mastery in topic_mastery.items():
+        if mastery < WEAK_MASTERY:
+            performance = topic_performance[topic]
+            accuracy = (performance['correct'] / performance['total']
+                        ) * 100 if performance['total'] > 0 else 0
+            weak_topics.append({'topic': topic, 'accuracy': accuracy, 'mastery': mastery})
+    weak_topics = sorted(weak_topics, key=lambda x: x['mastery'])
+
+    analysis_results['topic_mastery'] = topic_mastery
+    analysis_results['weak_topics'] = weak_topics
+    analysis_results['recommendations'][0] = topic_recommendation(weak_topics)
+    analysis_results['student_persona'] = generate_student_persona(
+        analysis_results['overall_accuracy'], weak_topics, analysis_results['difficulty_analysis'])
+
+    return analysis_results
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Replays attempt histories and quiz submissions into per-topic mastery estimates.")
+    parser.add_argument('--history', action='append', default=[],
+                        help="attempt records (JSON array or NDJSON); may be repeated")
+    parser.add_argument('--quiz', help="quiz the --submissions were made to")
+    parser.add_argument('--submissions', help="JSON array or NDJSON of submissions to --quiz")
+    parser.add_argument('--state', default=MASTERY_STATE_FILE,
+                        help="saved mastery state, updated in place")
+    parser.add_argument('--new', action='store_true', help="start from an empty state")
+    args = parser.parse_args(argv)
+
+    if args.submissions and not args.quiz:
+        parser.error("--submissions needs --quiz")
+
+    mastery_model = MasteryModel() if args.new else load_mastery_model(args.state)
+
+    recorded = read = 0
+    for path in args.history:
+        performance_data = list(iter_history_records(path))
+        read += len(performance_data)
+        recorded += mastery_model.record_history(performance_data)
+    if args.submissions:
+        from quiz_bank import load_quiz
+        quiz_data, question_index, compiled_quiz = load_quiz(args.quiz)
+        quiz_submissions = list(iter_history_records(args.submissions))
+        read += len(quiz_submissions)
+        recorded += mastery_model.record_submissions(
+            quiz_data, quiz_submissions, question_index, compiled_quiz)
+    mastery_model.save(args.state)
+
+    print(f"Recorded {recorded} attempts ({read - recorded} skipped as already recorded); "
+          f"{len(mastery_model.user_ids)} students and {len(mastery_model.topics)} topics "
+          f"in {args.state}")
+    if len(mastery_model.user_ids) == 1:
+        print(json.dumps(mastery_model.topic_mastery(mastery_model.user_ids[0]), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,24 @@
 # nlp_utils.py
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-import numpy as np
 import re
+from functools import lru_cache
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r'\b\w+\b')
+
+
+@lru_cache(maxsize=None)
+def get_stop_words():
+    """Returns the English stopword set, loaded from NLTK once per process."""
+
+    from nltk.corpus import stopwords
+
+    return frozenset(stopwords.words('english'))
+
+
+def tokenize_option(text, stop_words):
+
+    return set(WORD_PATTERN.findall(text.lower())) - stop_words
 
 
 def predict_difficulty_level(question_text, solution_text):
@@ -38,19 +53,14 @@ def assess_option_confusingness(options):
 
     avg_length = np.mean([len(text) for text in option_texts])
 
+    stop_words = get_stop_words()
+    option_words = [tokenize_option(text, stop_words) for text in option_texts]
+
     total_common_words = 0
 
     for i in range(num_options):
         for j in range(i + 1, num_options):
-
-            words1 = set(re.findall(r'\b\w+\b', option_texts[i].lower()))
-            words2 = set(re.findall(r'\b\w+\b', option_texts[j].lower()))
-
-            stop_words = set(stopwords.words('english'))
-            words1 -= stop_words
-            words2 -= stop_words
-
-            common_words = words1.intersection(words2)
+            common_words = option_words[i].intersection(option_words[j])
             total_common_words += len(common_words)
 
     avg_common_words = total_common_words / \
@@ -59,3 +69,73 @@ def assess_option_confusingness(options):
     confusingness = avg_common_words * avg_length / 100
 
     return confusingness
+
+
+def assess_option_confusingness_batch(options_lists):
+    """
+    Scores the options of many questions in one call.
+
+    Every option is tokenized once into a row of a sparse option x word
+    incidence matrix. Summing the rows of each question gives, for every word,
+    the number of its options containing it, and a word shared by c options
+    contributes c * (c - 1) / 2 to the question's pairwise common-word total.
+
+    Args:
+        options_lists (list): The `options` list of each question.
+
+    Returns:
+        np.ndarray: The confusingness of each question, equal to
+            `assess_option_confusingness` applied to each options list.
+    """
+
+    from scipy import sparse
+
+    num_questions = len(options_lists)
+    stop_words = get_stop_words()
+
+    vocabulary = {}
+    option_rows = []
+    word_columns = []
+    option_questions = []
+    option_lengths = []
+
+    for question_index, options in enumerate(options_lists):
+        for option in options:
+            text = option['description'] or ""
+            option_row = len(option_lengths)
+            for word in tokenize_option(text, stop_words):
+                option_rows.append(option_row)
+                word_columns.append(vocabulary.setdefault(word, len(vocabulary)))
+            option_questions.append(question_index)
+            option_lengths.append(len(text))
+
+    num_options_total = len(option_lengths)
+    option_questions = np.array(option_questions, dtype=np.int64)
+
+    incidence = sparse.csr_matrix(
+        (np.ones(len(option_rows), dtype=np.int64), (option_rows, word_columns)),
+        shape=(num_options_total, len(vocabulary)))
+    membership = sparse.csr_matrix(
+        (np.ones(num_options_total, dtype=np.int64),
+         (option_questions, np.arange(num_options_total))),
+        shape=(num_questions, num_options_total))
+
+    word_counts = (membership @ incidence).tocsr()
+    shared_pairs = word_counts.data * (word_counts.data - 1) / 2
+    count_rows = np.repeat(np.arange(num_questions),
+                           np.diff(word_counts.indptr))
+    total_common_words = np.bincount(
+        count_rows, weights=shared_pairs, minlength=num_questions)
+
+    num_options = np.bincount(option_questions, minlength=num_questions)
+    total_length = np.bincount(
+        option_questions, weights=option_lengths, minlength=num_questions)
+
+    confusingness = np.zeros(num_questions)
+    scored = num_options >= 2
+    avg_length = total_length[scored] / num_options[scored]
+    avg_common_words = total_common_words[scored] / \
+        (num_options[scored] * (num_options[scored] - 1) / 2)
+    confusingness[scored] = avg_common_words * avg_length / 100
+
+    return confusingness
@@ -0,0 +1,263 @@
+# performance_store.py
+import argparse
+import json
+import sqlite3
+
+from history_stream import iter_history_records
+from timestamps import parse_timestamp
+from topic_registry import canonical_topic, topic_key
+
+PERFORMANCE_STORE_FILE = 'performance_store.sqlite3'
+COMMIT_BATCH_SIZE = 1000
+# Stored in the database's `user_version`. Version 1 keys topic_aggregates
+# by canonical topic, compared without case; older stores are migrated on open.
+SCHEMA_VERSION = 1
+
+TOPIC_AGGREGATES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS topic_aggregates (
+    user_id TEXT NOT NULL,
+    topic TEXT NOT NULL COLLATE NOCASE,
+    attempt_count INTEGER NOT NULL,
+    accuracy_sum REAL NOT NULL,
+    first_submitted_at INTEGER NOT NULL,
+    PRIMARY KEY (user_id, topic)
+);
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recorded_attempts (
+    attempt_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_aggregates (
+    user_id TEXT PRIMARY KEY,
+    attempt_count INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    highest_score REAL NOT NULL,
+    lowest_score REAL NOT NULL,
+    accuracy_sum REAL NOT NULL
+);
+""" + TOPIC_AGGREGATES_SCHEMA
+
+
+class PerformanceStore:
+    """
+    Per-user running performance aggregates, persisted in SQLite.
+
+    Each new attempt updates the user's running sums, count, min and max
+    and the running sums of its topic with two upserts, so recording an
+    attempt costs O(1) however long the user's history is. Submissions are
+    recorded once, as they are scored (see `submission_attempt`), and
+    reports read `summary` without replaying the history. Attempts are
+    recorded at most once (by attempt `id`), so importing an export that
+    overlaps what is already stored only adds the new attempts. Topics are
+    stored under their canonical name and compared without case, so
+    spelling variants of a topic share one row; stores written before
+    topics were canonical are migrated when opened.
+    """
+
+    def __init__(self, path=PERFORMANCE_STORE_FILE):
+
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self._migrate_topics()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+
+        self.connection.commit()
+        self.connection.close()
+
+    def _migrate_topics(self):
+        """
+        Re-keys topic_aggregates by canonical topic, in one transaction.
+        Rows of spelling variants of a topic are merged: their counts and
+        sums are added and the earliest first attempt is kept. The topic is
+        named after the canonical name of its earliest row.
+        """
+
+        self.connection.commit()
+        self.connection.execute("BEGIN")
+        try:
+            merged = {}
+            for user_id, topic, attempt_count, accuracy_sum, first_submitted_at in \
+                    self.connection.execute("""
+                        SELECT user_id, topic, attempt_count, accuracy_sum, first_submitted_at
+                        FROM topic_aggregates ORDER BY first_submitted_at
+                        """):
+                row = merged.setdefault((user_id, topic_key(topic)),
+                                        [user_id, canonical_topic(topic), 0, 0.0, first_submitted_at])
+                row[2] += attempt_count
+                row[3] += accuracy_sum
+
+            self.connection.execute("DROP TABLE topic_aggregates")
+            self.connection.execute(TOPIC_AGGREGATES_SCHEMA)
+            self.connection.executemany("""
+                INSERT INTO topic_aggregates
+                    (user_id, topic, attempt_count, accuracy_sum, first_submitted_at)
+                VALUES (?, ?, ?, ?, ?)
+                """, merged.values())
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        except BaseException:
+            self.connection.rollback()
+            raise
+        self.connection.commit()
+
+    def record_attempt(self, item):
+        """
+        Adds one attempt record to its user's aggregates.
+
+        Returns:
+            bool: False if the attempt had already been recorded.
+        """
+
+        user_id = str(item['user_id'])
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO recorded_attempts (attempt_id, user_id) VALUES (?, ?)",
+            (str(item['id']), user_id))
+        if cursor.rowcount == 0:
+            return False
+
+        score = float(item['score'])
+        accuracy = float(item['accuracy'].replace("%", ""))
+        submitted_at = int(parse_timestamp(item['submitted_at']).timestamp() * 1000)
+
+        self.connection.execute("""
+            INSERT INTO user_aggregates
+                (user_id, attempt_count, score_sum, highest_score, lowest_score, accuracy_sum)
+            VALUES (?, 1, ?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                attempt_count = attempt_count + 1,
+                score_sum = score_sum + excluded.score_sum,
+                highest_score = max(highest_score, excluded.highest_score),
+                lowest_score = min(lowest_score, excluded.lowest_score),
+                accuracy_sum = accuracy_sum + excluded.accuracy_sum
+            """, (user_id, score, score, score, accuracy))
+
+        self.connection.execute("""
+            INSERT INTO topic_aggregates
+                (user_id, topic, attempt_count, accuracy_sum, first_submitted_at)
+            VALUES (?, ?, 1, ?, ?)
+            ON CONFLICT (user_id, topic) DO UPDATE SET
+                attempt_count = attempt_count + 1,
+                accuracy_sum = accuracy_sum + excluded.accuracy_sum,
+                first_submitted_at = min(first_submitted_at, excluded.first_submitted_at)
+            """, (user_id, canonical_topic(item['quiz']['topic']), accuracy, submitted_at))
+
+        return True
+
+    def record_history(self, performance_data):
+        """
+        Imports the attempt records of an export, in the schema of
+        `Performance_data.txt`. Commits every COMMIT_BATCH_SIZE records.
+
+        Returns:
+            int: The number of attempts not recorded before.
+        """
+
+        recorded = 0
+        for count, item in enumerate(performance_data, start=1):
+            recorded += self.record_attempt(item)
+            if count % COMMIT_BATCH_SIZE == 0:
+                self.connection.commit()
+
+        self.connection.commit()
+
+        return recorded
+
+    def summary(self, user_id):
+        """
+        Reads a user's aggregates.
+
+        Returns:
+            dict: The attempt count, average/highest/lowest score, average
+                accuracy and per-topic average accuracy (ordered by each
+                topic's first attempt), or None if the user has no attempts.
+        """
+
+        row = self.connection.execute("""
+            SELECT attempt_count, score_sum, highest_score, lowest_score, accuracy_sum
+            FROM user_aggregates WHERE user_id = ?
+            """, (str(user_id),)).fetchone()
+        if row is None:
+            return None
+
+        attempt_count, score_sum, highest_score, lowest_score, accuracy_sum = row
+
+        topic_rows = self.connection.execute("""
+            SELECT topic, accuracy_sum / attempt_count FROM topic_aggregates
+            WHERE user_id = ? ORDER BY first_submitted_at
+            """, (str(user_id),)).fetchall()
+
+        return {
+            'attempt_count': attempt_count,
+            'average_score': score_sum / attempt_count,
+            'highest_score': highest_score,
+            'lowest_score': lowest_score,
+            'average_accuracy': accuracy_sum / attempt_count,
+            'topic_insights': dict(topic_rows)
+        }
+
+
+def submission_attempt(quiz_submission_data, quiz_data):
+    """
+    The attempt record of a quiz submission, with only the fields
+    `record_attempt` reads, or None if the submission has no `id` to record
+    it once by.
+
+    Args:
+        quiz_submission_data (dict): The submission.
+        quiz_data (dict, QuizBank or SharedQuiz): The quiz submitted to.
+            Its topic is used when the submission does not embed its quiz.
+    """
+
+    if quiz_submission_data.get('id') is None:
+        return None
+
+    quiz = quiz_submission_data.get('quiz') or (
+        quiz_data['quiz'] if isinstance(quiz_data, dict) else quiz_data.quiz)
+    attempt = {field: quiz_submission_data[field]
+               for field in ('id', 'user_id', 'score', 'accuracy', 'submitted_at')}
+    attempt['quiz'] = {'topic': quiz['topic']}
+
+    return attempt
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Imports attempt histories and quiz submissions into the performance store.")
+    parser.add_argument('--history', action='append', default=[],
+                        help="attempt records (JSON array or NDJSON); may be repeated")
+    parser.add_argument('--quiz', help="quiz the --submissions were made to")
+    parser.add_argument('--submissions', help="JSON array or NDJSON of submissions to --quiz")
+    parser.add_argument('--store', default=PERFORMANCE_STORE_FILE,
+                        help="SQLite file of running per-user aggregates, updated in place")
+    args = parser.parse_args(argv)
+
+    if args.submissions and not args.quiz:
+        parser.error("--submissions needs --quiz")
+
+    with PerformanceStore(args.store) as performance_store:
+        recorded = 0
+        for path in args.history:
+            recorded += performance_store.record_history(iter_history_records(path))
+        if args.submissions:
+            with open(args.quiz, 'r') as f:
+                quiz_data = json.load(f)
+            attempts = (submission_attempt(quiz_submission_data, quiz_data)
+                        for quiz_submission_data in iter_history_records(args.submissions))
+            recorded += performance_store.record_history(
+                attempt for attempt in attempts if attempt is not None)
+
+    print(f"Recorded {recorded} new attempts in {args.store}")
+
+
+if __name__ == "__main__":
+    main()
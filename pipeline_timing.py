@@ -0,0 +1,153 @@
+# pipeline_timing.py
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Set PIPELINE_TIMINGS=1 to record stage timings in every process, e.g. in
+# a long-running service; the scripts also enable it with --timings.
+PIPELINE_TIMINGS = os.environ.get('PIPELINE_TIMINGS', '') not in ('', '0')
+
+_disabled_stage = nullcontext()
+
+
+class StageTimings:
+    """
+    Per-stage wall-clock timings of the analysis pipeline.
+
+    Each stage keeps a call count, the total and the maximum duration. When
+    recording is disabled `stage` returns a shared no-op context manager, so
+    instrumented code pays one attribute check per stage.
+    """
+
+    def __init__(self, enabled=False):
+
+        self.enabled = enabled
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        """Times the enclosed block as one call of stage `name`."""
+
+        if not self.enabled:
+            return _disabled_stage
+
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name, seconds):
+
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                self._stages[name] = {'count': 1, 'total_seconds': seconds,
+                                      'max_seconds': seconds}
+            else:
+                stage['count'] += 1
+                stage['total_seconds'] += seconds
+                stage['max_seconds'] = max(stage['max_seconds'], seconds)
+
+    def merge(self, summary):
+        """Adds the stages of another process's `summary` to these timings."""
+
+        with self._lock:
+            for name, stage in summary.items():
+                merged = self._stages.setdefault(
+                    name, {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+                merged['count'] += stage['count']
+                merged['total_seconds'] += stage['total_seconds']
+                merged['max_seconds'] = max(merged['max_seconds'], stage['max_seconds'])
+
+    def summary(self):
+
+        with self._lock:
+            return {name: dict(stage) for name, stage in self._stages.items()}
+
+    def drain(self):
+        """Returns the summary and resets the timings."""
+
+        with self._lock:
+            stages, self._stages = self._stages, {}
+
+        return stages
+
+    def to_json(self):
+
+        return json.dumps({'stages': self.summary()}, indent=2)
+
+    def to_prometheus(self):
+        """Renders the timings in the Prometheus text exposition format."""
+
+        lines = []
+        metrics = [
+            ('pipeline_stage_calls_total', 'counter', 'Number of times each stage ran.', 'count'),
+            ('pipeline_stage_seconds_total', 'counter', 'Total time spent in each stage.',
+             'total_seconds'),
+            ('pipeline_stage_seconds_max', 'gauge', 'Longest single run of each stage.',
+             'max_seconds')
+        ]
+        stages = self.summary()
+        for metric, metric_type, description, field in metrics:
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for name, stage in stages.items():
+                lines.append(f'{metric}{{stage="{name}"}} {stage[field]:.9g}')
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Writes the summary to `path`: Prometheus text for `.prom`, JSON otherwise."""
+
+        with open(path, 'w') as f:
+            f.write(self.to_prometheus() if path.endswith('.prom') else self.to_json())
+
+
+pipeline_timings = StageTimings(enabled=PIPELINE_TIMINGS)
+
+
+def stage(name):
+    """Times the enclosed block as stage `name` of the process-wide timings."""
+
+    return pipeline_timings.stage(name)
+
+
+@contextmanager
+def instrument(timings_path=None, profile_path=None):
+    """
+    Enables stage timings for the enclosed run and writes their summary to
+    `timings_path`, and profiles the run with cProfile into `profile_path`
+    (readable with `pstats` or snakeviz). Either path may be None.
+    """
+
+    if timings_path:
+        pipeline_timings.enabled = True
+
+    profiler = cProfile.Profile() if profile_path else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield pipeline_timings
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        if timings_path:
+            pipeline_timings.write(timings_path)
+
+
+def add_instrumentation_arguments(parser):
+
+    parser.add_argument('--timings', metavar='PATH',
+                        help="write per-stage timings to PATH (Prometheus text for .prom, else JSON)")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="write a cProfile dump of the run to PATH")
@@ -0,0 +1,336 @@
+# practice_index.py
+import argparse
+import json
+from collections import Counter
+
+import numpy as np
+
+from difficulty_model import question_text
+from nlp_utils import WORD_PATTERN, get_stop_words
+from quiz_bank import map_column_file, write_column_file
+from topic_registry import TopicRegistry, topic_key
+
+PRACTICE_INDEX_FILE = 'practice_index.bin'
+PRACTICE_INDEX_MAGIC = b'PRACTIDX'
+PRACTICE_INDEX_VERSION = 1
+PRACTICE_QUESTIONS = 3
+# A query whose terms' posting lists hold more entries than this drops its
+# lowest-weighted (most common) terms until it fits, which bounds the cost
+# of a query whatever the size of the bank. Smaller queries are exact.
+MAX_QUERY_POSTINGS = 1_000_000
+
+
+def _term_counts(text, stop_words):
+
+    counts = Counter(word for word in WORD_PATTERN.findall(text.lower()) if word not in stop_words)
+
+    return list(counts), np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+
+
+def write_practice_index(questions, path=PRACTICE_INDEX_FILE):
+    """
+    Builds the practice-question index of a question bank.
+
+    Each question's description and detailed solution become a TF-IDF
+    vector (sublinear term frequency, stopwords removed) scaled to unit
+    length, so the dot product of two rows is their cosine similarity. The
+    vectors are stored twice: as rows, to look up a question's own vector,
+    and as per-term posting lists, so a query only touches the questions
+    sharing one of its terms.
+
+    Args:
+        questions (iterable): Questions with integer `id`s, from one or more
+            quiz JSON files.
+        path (str): Where to write the index.
+    """
+
+    from scipy import sparse
+
+    stop_words = get_stop_words()
+    vocabulary = {}
+    topic_registry = TopicRegistry()
+    question_ids = []
+    question_topics = []
+    descriptions = []
+    rows = []
+    columns = []
+    counts = []
+
+    for row, question in enumerate(questions):
+        try:
+            question_ids.append(int(question['id']))
+        except ValueError:
+            raise ValueError("Only questions with integer ids can be indexed") from None
+        question_topics.append(topic_registry.topic_id(question['topic']))
+        descriptions.append((question.get('description') or "").encode('utf-8'))
+
+        terms, term_counts = _term_counts(question_text(question), stop_words)
+        rows.extend([row] * len(terms))
+        columns.extend(vocabulary.setdefault(term, len(vocabulary)) for term in terms)
+        counts.append(term_counts)
+
+    num_questions = len(question_ids)
+    counts = np.concatenate(counts) if counts else np.empty(0)
+    document_frequency = np.bincount(columns, minlength=len(vocabulary))
+    idf = np.log((1 + num_questions) / (1 + document_frequency)) + 1
+
+    weights = (1 + np.log(counts)) * idf[columns]
+    norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=num_questions))
+    norms[norms == 0] = 1
+    weights /= norms[rows]
+
+    vectors = sparse.csr_matrix((weights.astype(np.float32), (rows, columns)),
+                                shape=(num_questions, len(vocabulary)))
+    postings = vectors.tocsc()
+
+    description_offsets = np.zeros(num_questions + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in descriptions], out=description_offsets[1:])
+    question_ids = np.array(question_ids, dtype=np.int64)
+
+    write_column_file(path, PRACTICE_INDEX_MAGIC, {
+        'version': PRACTICE_INDEX_VERSION,
+        'terms': sorted(vocabulary, key=vocabulary.get),
+        'idf': idf.tolist(),
+        'topics': topic_registry.names
+    }, {
+        'question_ids': question_ids,
+        'id_order': np.argsort(question_ids, kind='stable'),
+        'question_topics': np.array(question_topics, dtype=np.int32),
+        'row_offsets': vectors.indptr.astype(np.int64),
+        'row_terms': vectors.indices.astype(np.int32),
+        'row_weights': vectors.data,
+        'posting_offsets': postings.indptr.astype(np.int64),
+        'posting_questions': postings.indices.astype(np.int32),
+        'posting_weights': postings.data,
+        'description_offsets': description_offsets,
+        'descriptions': np.frombuffer(b''.join(descriptions), dtype=np.uint8)
+    })
+
+
+class PracticeIndex:
+    """
+    Read-only, memory-mapped practice-question index written by
+    `write_practice_index`.
+
+    A query is a sparse TF-IDF vector. Its score against every question is
+    accumulated from the posting lists of its terms only, so answering it
+    costs the total length of those lists rather than a scan of the bank's
+    text, and the top k are picked with a partial sort. Nothing is written
+    after the index is opened, so it can be queried from many threads.
+    """
+
+    def __init__(self, path=PRACTICE_INDEX_FILE):
+
+        self.path = path
+        self._mmap, header, columns = map_column_file(
+            path, PRACTICE_INDEX_MAGIC, PRACTICE_INDEX_VERSION)
+
+        self.header = header
+        self.topics = header['topics']
+        self.idf = np.array(header['idf'])
+        self.vocabulary = {term: column for column, term in enumerate(header['terms'])}
+        self._topic_keys = np.array([topic_key(topic) for topic in self.topics], dtype=object)
+        for name, column in columns.items():
+            setattr(self, name, column)
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def __reduce__(self):
+        # Processes receive the path and map the file themselves.
+        return (type(self), (self.path,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+
+        for name in self.header['columns']:
+            delattr(self, name)
+        self._mmap.close()
+
+    def positions(self, question_ids):
+        """Positions of the indexed questions among `question_ids`; others are dropped."""
+
+        question_ids = np.asarray(question_ids, dtype=np.int64)
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+
+        sorted_ids = self.question_ids[self.id_order]
+        found = np.searchsorted(sorted_ids, question_ids).clip(max=len(self) - 1)
+
+        return self.id_order[found[sorted_ids[found] == question_ids]]
+
+    def question_vector(self, question_ids):
+        """The sum of the stored vectors of `question_ids`, as (terms, weights)."""
+
+        positions = self.positions(question_ids)
+        starts = self.row_offsets[positions]
+        ends = self.row_offsets[positions + 1]
+        entries = _ranges(starts, ends)
+
+        return _sum_terms(self.row_terms[entries], self.row_weights[entries])
+
+    def text_vector(self, text):
+        """The TF-IDF vector of free text, as (terms, weights). Unknown words are ignored."""
+
+        words, counts = _term_counts(text, get_stop_words())
+        known = [position for position, word in enumerate(words) if word in self.vocabulary]
+        terms = np.array([self.vocabulary[words[position]] for position in known], dtype=np.int64)
+        weights = (1 + np.log(counts[known])) * self.idf[terms]
+
+        return terms, weights / (np.linalg.norm(weights) or 1)
+
+    def similar(self, vector, k=PRACTICE_QUESTIONS, exclude_ids=(), topic=None):
+        """
+        The `k` questions most similar to `vector`, best first.
+
+        Args:
+            vector (tuple): Terms and weights, from `question_vector` or
+                `text_vector`.
+            k (int): Number of questions to return.
+            exclude_ids (iterable): Question ids never to return, e.g. the
+                questions the student has already seen.
+            topic (str, optional): Only return questions of this topic (any
+                spelling of it).
+
+        Returns:
+            list: Dicts with the `id`, `topic`, `description` and cosine
+                `similarity` of each question. Questions sharing no term
+                with the query are never returned.
+        """
+
+        terms, weights = vector
+        starts = self.posting_offsets[terms]
+        ends = self.posting_offsets[terms + 1]
+        if (ends - starts).sum() > MAX_QUERY_POSTINGS:
+            heaviest = np.argsort(-weights, kind='stable')
+            kept = heaviest[np.cumsum((ends - starts)[heaviest]) <= MAX_QUERY_POSTINGS]
+            terms, weights, starts, ends = terms[kept], weights[kept], starts[kept], ends[kept]
+        entries = _ranges(starts, ends)
+        scores = np.bincount(
+            self.posting_questions[entries],
+            weights=self.posting_weights[entries] * np.repeat(weights, ends - starts),
+            minlength=len(self))
+
+        if topic is not None:
+            topic_codes = np.flatnonzero(self._topic_keys == topic_key(topic))
+            if not len(topic_codes):
+                return []
+            scores[~np.isin(self.question_topics, topic_codes)] = 0
+        exclude_ids = list(exclude_ids)
+        if exclude_ids:
+            scores[self.positions(exclude_ids)] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        return [{'id': int(self.question_ids[position]),
+                 'topic': self.topics[self.question_topics[position]],
+                 'description': self.description(position),
+                 'similarity': float(scores[position])}
+                for position in candidates.tolist()]
+
+    def description(self, position):
+
+        start, end = self.description_offsets[position:position + 2]
+        return self.descriptions[start:end].tobytes().decode('utf-8')
+
+
+def _ranges(starts, ends):
+    """Indices of the concatenated ranges [start, end)."""
+
+    lengths = ends - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+
+    return np.arange(lengths.sum()) + offsets
+
+
+def _sum_terms(terms, weights):
+
+    terms, inverse = np.unique(terms, return_inverse=True)
+    weights = np.bincount(inverse, weights=weights, minlength=len(terms))
+
+    return terms, weights / (np.linalg.norm(weights) or 1)
+
+
+def recommend_practice_questions(practice_index, analysis_results, k=PRACTICE_QUESTIONS,
+                                 seen_ids=()):
+    """
+    Adds practice questions to the results of `analyze_quiz_data_advanced`:
+    for each question answered incorrectly, the `k` most similar questions
+    of the bank, and for each weak topic, the `k` questions of that topic
+    most similar to all of its incorrect answers together. The quiz's own
+    questions and `seen_ids` are never recommended.
+    """
+
+    question_categories = analysis_results['question_categories']
+    exclude_ids = {int(question['id']) for questions in question_categories.values()
+                   for question in questions}
+    exclude_ids.update(int(question_id) for question_id in seen_ids)
+
+    incorrect = [question for category, questions in question_categories.items()
+                 if category.endswith("Incorrect") for question in questions]
+
+    by_question = []
+    for question in incorrect:
+        practice = practice_index.similar(
+            practice_index.question_vector([question['id']]), k, exclude_ids)
+        if practice:
+            by_question.append({'id': question['id'], 'description': question['description'],
+                                'practice': practice})
+
+    by_topic = {}
+    for weak_topic in analysis_results['weak_topics']:
+        topic = weak_topic['topic']
+        key = topic_key(topic)
+        question_ids = [question['id'] for question in incorrect if topic_key(question['topic']) == key]
+        practice = practice_index.similar(
+            practice_index.question_vector(question_ids), k, exclude_ids, topic)
+        if practice:
+            by_topic[topic] = practice
+
+    analysis_results['practice_questions'] = {'by_question': by_question, 'by_topic': by_topic}
+
+    return analysis_results
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Builds or queries the practice-question similarity index of a question bank.")
+    parser.add_argument('--quiz', action='append', default=[],
+                        help="quiz JSON whose questions to index; may be repeated")
+    parser.add_argument('--index', default=PRACTICE_INDEX_FILE)
+    parser.add_argument('--similar-to', type=int, metavar='QUESTION_ID',
+                        help="print the questions most similar to an indexed question")
+    parser.add_argument('--query', help="print the questions most similar to this text")
+    parser.add_argument('-k', type=int, default=PRACTICE_QUESTIONS)
+    args = parser.parse_args(argv)
+
+    if args.quiz:
+        questions = []
+        for path in args.quiz:
+            with open(path, 'r') as f:
+                questions.extend(json.load(f)['quiz']['questions'])
+        write_practice_index(questions, args.index)
+        print(f"Indexed {len(questions)} questions in {args.index}")
+
+    if args.similar_to is not None or args.query:
+        with PracticeIndex(args.index) as practice_index:
+            if args.similar_to is not None:
+                vector = practice_index.question_vector([args.similar_to])
+                exclude_ids = [args.similar_to]
+            else:
+                vector = practice_index.text_vector(args.query)
+                exclude_ids = []
+            print(json.dumps(practice_index.similar(vector, args.k, exclude_ids), indent=2))
+
+
+if __name__ == "__main__":
+    main()
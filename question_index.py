@@ -0,0 +1,110 @@
+# question_index.py
+import json
+import os
+
+from difficulty_model import difficulty_model_fingerprint, predict_difficulty_levels
+from nlp_utils import assess_option_confusingness_batch
+from pipeline_timing import stage
+
+QUESTION_INDEX_FILE = 'question_index.json'
+QUESTION_INDEX_VERSION = 1
+
+
+def update_question_index(question_index, questions):
+    """
+    Recomputes the entries of `question_index` that are missing or stale.
+
+    An entry is stale when its `updated_at` no longer matches the question's,
+    i.e. the question was edited after the entry was built, or when it was
+    predicted by a different difficulty model than the current one.
+
+    Args:
+        question_index (dict): Question id -> features, updated in place.
+        questions (list): Questions from the quiz bank.
+
+    Returns:
+        list: The ids of the entries that were (re)computed.
+    """
+
+    model_fingerprint = difficulty_model_fingerprint()
+
+    stale = []
+    for question in questions:
+        entry = question_index.get(str(question['id']))
+        if entry is None or entry.get('updated_at') != question.get('updated_at') or \
+                entry.get('difficulty_model') != model_fingerprint:
+            stale.append(question)
+
+    if not stale:
+        return []
+
+    with stage('nlp_features'):
+        confusingness = assess_option_confusingness_batch(
+            [question['options'] for question in stale])
+        difficulty_levels = predict_difficulty_levels(stale)
+
+    updated = []
+    for question, difficulty_level, confusingness_score in zip(
+            stale, difficulty_levels, confusingness):
+        question_id = str(question['id'])
+        question_index[question_id] = {
+            'updated_at': question.get('updated_at'),
+            'difficulty_model': model_fingerprint,
+            'difficulty_level': difficulty_level,
+            'confusingness': float(confusingness_score)
+        }
+        updated.append(question_id)
+
+    return updated
+
+
+def build_question_index(quiz_data):
+
+    question_index = {}
+    update_question_index(question_index, quiz_data['quiz']['questions'])
+
+    return question_index
+
+
+def read_question_index(path=QUESTION_INDEX_FILE):
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, 'r') as f:
+        stored = json.load(f)
+
+    if stored.get('version') != QUESTION_INDEX_VERSION:
+        return {}
+
+    return stored['questions']
+
+
+def write_question_index(question_index, path=QUESTION_INDEX_FILE):
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': QUESTION_INDEX_VERSION,
+                  'questions': question_index}, f)
+    os.replace(tmp_path, path)
+
+
+def load_question_index(quiz_data, path=QUESTION_INDEX_FILE):
+    """
+    Loads the persisted question index for a quiz bank, recomputing only the
+    entries of questions that are new or were edited since the last build.
+
+    Args:
+        quiz_data (dict): The quiz bank.
+        path (str): Location of the persisted index.
+
+    Returns:
+        dict: Question id -> features for every question in the bank.
+    """
+
+    question_index = read_question_index(path)
+
+    if update_question_index(question_index, quiz_data['quiz']['questions']):
+        write_question_index(question_index, path)
+
+    return question_index
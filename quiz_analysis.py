@@ -0,0 +1,427 @@
+# quiz_analysis.py
+import numpy as np
+
+from pipeline_timing import stage
+from question_index import build_question_index, update_question_index
+from quiz_bank import QuizBank
+from quiz_compiler import compile_quiz
+from shared_quiz import SharedQuiz
+
+
+def analyze_quiz_data_advanced(quiz_data, quiz_submission_data, question_index=None,
+                               compiled_quiz=None):
+    """
+    Analyzes one submission to a quiz.
+
+    Difficulties and confusingness are read from the question index; the
+    quiz itself is never modified. A `QuizBank` or `SharedQuiz` is scored
+    from its prepared tables, which is safe to do from many threads at once.
+    """
+
+    if isinstance(quiz_data, (QuizBank, SharedQuiz)):
+        return analyze_quiz_submissions_batch(quiz_data, [quiz_submission_data])[0]
+
+    questions = quiz_data['quiz']['questions']
+
+    if question_index is None:
+        question_index = build_question_index(quiz_data)
+    else:
+        update_question_index(question_index, questions)
+    if compiled_quiz is None:
+        compiled_quiz = compile_quiz(quiz_data)
+    question_ids = compiled_quiz['question_ids']
+    correct_options = compiled_quiz['correct_options']
+    topic_codes = compiled_quiz['topic_codes']
+    question_topics = compiled_quiz['question_topics']
+    total_questions_quiz_data = len(questions)
+    response_map = quiz_submission_data.get('response_map', {})
+
+    difficulty_codes = {}
+    question_difficulties = np.empty(total_questions_quiz_data, dtype=np.int64)
+    correct = np.zeros(total_questions_quiz_data, dtype=bool)
+
+    question_categories = {
+        "Easy - Correct": [],
+        "Easy - Incorrect": [],
+        "Medium - Correct": [],
+        "Medium - Incorrect": [],
+        "Hard - Correct": [],
+        "Hard - Incorrect": []
+    }
+
+    default_difficulty = quiz_data['quiz'].get(
+        'difficulty_level', 'Not Specified')
+
+    with stage('question_loop'):
+        for position, question in enumerate(questions):
+            question_id = question_ids[position]
+
+            difficulty = question.get('difficulty_level', default_difficulty)
+
+            features = question_index[question_id]
+
+            if difficulty is None or difficulty == "Not Specified":
+                difficulty = features['difficulty_level']
+
+            if difficulty is None:
+                difficulty = "Not Specified"
+
+            is_correct = response_map.get(question_id) in correct_options[position]
+
+            question_difficulties[position] = difficulty_codes.setdefault(
+                difficulty, len(difficulty_codes))
+            correct[position] = is_correct
+
+            if is_correct:
+                category = f"{difficulty} - Correct"
+            else:
+                category = f"{difficulty} - Incorrect"
+            question_categories[category].append(question)
+
+    overall_accuracy = (int(correct.sum()) / total_questions_quiz_data) * \
+        100 if total_questions_quiz_data > 0 else 0
+
+    with stage('aggregation'):
+        topic_correct = np.bincount(question_topics, weights=correct, minlength=len(topic_codes))
+        topic_total = np.bincount(question_topics, minlength=len(topic_codes))
+        difficulty_correct = np.bincount(question_difficulties, weights=correct,
+                                         minlength=len(difficulty_codes))
+        difficulty_total = np.bincount(question_difficulties, minlength=len(difficulty_codes))
+
+        topic_performance = {
+            topic: {'correct': int(topic_correct[code]), 'total': int(topic_total[code])}
+            for topic, code in topic_codes.items()}
+        difficulty_performance = {
+            difficulty: {'correct': int(difficulty_correct[code]),
+                         'total': int(difficulty_total[code])}
+            for difficulty, code in difficulty_codes.items()}
+
+        return build_analysis_results(quiz_submission_data, overall_accuracy, topic_performance,
+                                      difficulty_performance, question_categories)
+
+
+def analyze_quiz_submissions_batch(quiz_data, quiz_submissions, question_index=None,
+                                   compiled_quiz=None):
+    """
+    Analyzes many submissions for the same quiz in one pass.
+
+    The quiz is prepared once: question difficulties and confusingness are
+    resolved from the question index and every (question, option) pair is
+    given an integer code by the compiled quiz. All response maps are then
+    packed into a (submissions x questions) matrix of option codes, and
+    per-student topic and difficulty accuracies are computed as matrix
+    group-bys.
+
+    Args:
+        quiz_data (dict, QuizBank or SharedQuiz): The quiz bank shared by all submissions.
+        quiz_submissions (list): Submission dicts with a `response_map`.
+        question_index (dict, optional): Preloaded question-feature index.
+        compiled_quiz (dict, optional): The quiz compiled by `compile_quiz`.
+
+    Returns:
+        list: One results dict per submission, identical to what
+            `analyze_quiz_data_advanced` returns for it.
+    """
+
+    prepared_quiz = prepare_quiz(quiz_data, question_index, compiled_quiz)
+    questions = prepared_quiz['questions']
+    total_questions_quiz_data = len(questions)
+    topic_codes = prepared_quiz['topic_codes']
+    difficulty_codes = prepared_quiz['difficulty_codes']
+    question_topics = prepared_quiz['question_topics']
+    question_difficulties = prepared_quiz['question_difficulties']
+
+    with stage('batch_scoring'):
+        selected = encode_responses(prepared_quiz, quiz_submissions)
+        correct = prepared_quiz['option_correct'][selected]
+
+        topic_correct = correct @ np.eye(len(topic_codes),
+                                         dtype=np.int64)[question_topics]
+        difficulty_correct = correct @ np.eye(len(difficulty_codes),
+                                              dtype=np.int64)[question_difficulties]
+        topic_total = np.bincount(question_topics, minlength=len(topic_codes))
+        difficulty_total = np.bincount(
+            question_difficulties, minlength=len(difficulty_codes))
+
+        correct_counts = correct.sum(axis=1)
+    difficulty_positions = [np.flatnonzero(question_difficulties == code)
+                            for code in range(len(difficulty_codes))]
+
+    results = []
+    for row, quiz_submission_data in enumerate(quiz_submissions):
+        overall_accuracy = (int(correct_counts[row]) / total_questions_quiz_data) * \
+            100 if total_questions_quiz_data > 0 else 0
+
+        question_categories = {
+            "Easy - Correct": [],
+            "Easy - Incorrect": [],
+            "Medium - Correct": [],
+            "Medium - Incorrect": [],
+            "Hard - Correct": [],
+            "Hard - Incorrect": []
+        }
+        for difficulty, code in difficulty_codes.items():
+            positions = difficulty_positions[code]
+            answered_correctly = correct[row, positions]
+            question_categories[f"{difficulty} - Correct"].extend(
+                questions[position] for position in positions[answered_correctly])
+            question_categories[f"{difficulty} - Incorrect"].extend(
+                questions[position] for position in positions[~answered_correctly])
+
+        topic_performance = {
+            topic: {'correct': int(topic_correct[row, code]), 'total': int(topic_total[code])}
+            for topic, code in topic_codes.items()}
+        difficulty_performance = {
+            difficulty: {'correct': int(difficulty_correct[row, code]),
+                         'total': int(difficulty_total[code])}
+            for difficulty, code in difficulty_codes.items()}
+
+        with stage('aggregation'):
+            results.append(build_analysis_results(
+                quiz_submission_data, overall_accuracy, topic_performance,
+                difficulty_performance, question_categories))
+
+    return results
+
+
+def prepare_quiz(quiz_data, question_index=None, compiled_quiz=None):
+    """
+    Prepares a quiz for scoring many submissions at once.
+
+    Question difficulties and confusingness are resolved from the question
+    index, and the answer lookup tables and canonical topic ids are taken
+    from the compiled quiz.
+    A memory-mapped `QuizBank` or a `SharedQuiz` is already prepared; the
+    index and compiled quiz are not needed for it. The quiz is not modified.
+
+    Args:
+        quiz_data (dict, QuizBank or SharedQuiz): The quiz bank.
+        question_index (dict, optional): Preloaded question-feature index.
+        compiled_quiz (dict, optional): The quiz compiled by `compile_quiz`.
+
+    Returns:
+        dict: The questions, their positions by id, the option codes of
+            each question, a correctness flag per option code (plus a
+            trailing False for code -1), the question of each option code,
+            the topic and difficulty code and the confusingness of every
+            question.
+    """
+
+    if isinstance(quiz_data, (QuizBank, SharedQuiz)):
+        return quiz_data.prepared_quiz
+
+    questions = quiz_data['quiz']['questions']
+
+    if question_index is None:
+        question_index = build_question_index(quiz_data)
+    else:
+        update_question_index(question_index, questions)
+    if compiled_quiz is None:
+        compiled_quiz = compile_quiz(quiz_data)
+
+    default_difficulty = quiz_data['quiz'].get(
+        'difficulty_level', 'Not Specified')
+
+    difficulty_codes = {}
+    question_difficulties = []
+    confusingness = []
+
+    for position, question in enumerate(questions):
+        difficulty = question.get('difficulty_level', default_difficulty)
+
+        features = question_index[compiled_quiz['question_ids'][position]]
+
+        if difficulty is None or difficulty == "Not Specified":
+            difficulty = features['difficulty_level']
+
+        if difficulty is None:
+            difficulty = "Not Specified"
+
+        confusingness.append(features['confusingness'])
+
+        question_difficulties.append(
+            difficulty_codes.setdefault(difficulty, len(difficulty_codes)))
+
+    return {
+        'questions': questions,
+        'question_positions': compiled_quiz['question_positions'],
+        'option_codes': compiled_quiz['option_codes'],
+        'option_ids': [str(option_id) for option_id in compiled_quiz['option_ids']],
+        'option_positions': np.array(compiled_quiz['option_positions'], dtype=np.int64),
+        # Code -1 marks an unanswered question or an option that does not
+        # belong to it; it indexes the trailing False.
+        'option_correct': np.array(compiled_quiz['option_correct'] + [False]),
+        'topic_codes': compiled_quiz['topic_codes'],
+        'difficulty_codes': difficulty_codes,
+        'question_topics': compiled_quiz['question_topics'],
+        'question_difficulties': np.array(question_difficulties, dtype=np.int64),
+        'confusingness': np.array(confusingness, dtype=np.float64)
+    }
+
+
+def encode_responses(prepared_quiz, quiz_submissions):
+    """
+    Packs the response maps of `quiz_submissions` into a (submissions x
+    questions) matrix of option codes, with -1 for unanswered questions.
+    """
+
+    question_positions = prepared_quiz['question_positions']
+    option_codes = prepared_quiz['option_codes']
+
+    selected = np.full(
+        (len(quiz_submissions), len(option_codes)), -1, dtype=np.int32)
+
+    for row, quiz_submission_data in enumerate(quiz_submissions):
+        response_map = quiz_submission_data.get('response_map', {})
+        for question_id, selected_option_id in response_map.items():
+            position = question_positions.get(question_id)
+            if position is not None:
+                selected[row, position] = option_codes[position].get(
+                    selected_option_id, -1)
+
+    return selected
+
+
+def build_analysis_results(quiz_submission_data, overall_accuracy, topic_performance,
+                           difficulty_performance, question_categories):
+    """
+    Builds the analysis results of one submission from its per-group counts.
+
+    Args:
+        quiz_submission_data (dict): The student's submission.
+        overall_accuracy (float): Accuracy over all quiz questions.
+        topic_performance (dict): Topic -> correct/total counts, in question order.
+        difficulty_performance (dict): Difficulty -> correct/total counts, in question order.
+        question_categories (dict): Questions grouped by difficulty and correctness.
+
+    Returns:
+        dict: The analysis results.
+    """
+
+    final_score = quiz_submission_data.get('final_score')
+    negative_score = quiz_submission_data.get('negative_score')
+    correct_answers_count = quiz_submission_data.get('correct_answers')
+    incorrect_answers_count = quiz_submission_data.get('incorrect_answers')
+    source = quiz_submission_data.get('source')
+    quiz_type = quiz_submission_data.get('type')
+    started_at = quiz_submission_data.get('started_at')
+    ended_at = quiz_submission_data.get('ended_at')
+    duration = quiz_submission_data.get('duration')
+    better_than = quiz_submission_data.get('better_than')
+    total_questions = quiz_submission_data.get('total_questions')
+
+    weak_topics = []
+    for topic, performance in topic_performance.items():
+        accuracy = (performance['correct'] / performance['total']
+                    ) * 100 if performance['total'] > 0 else 0
+        if accuracy < 60:
+            weak_topics.append({'topic': topic, 'accuracy': accuracy})
+
+    weak_topics = sorted(weak_topics, key=lambda x: x['accuracy'])
+
+    difficulty_analysis = []
+    for difficulty, performance in difficulty_performance.items():
+        accuracy = (performance['correct'] / performance['total']
+                    ) * 100 if performance['total'] > 0 else 0
+        difficulty_analysis.append(
+            {'difficulty': difficulty, 'accuracy': accuracy})
+
+    difficulty_analysis = sorted(
+        difficulty_analysis, key=lambda x: x['accuracy'])
+
+    recommendations = [topic_recommendation(weak_topics)]
+
+    recommendations.append(
+        "Consider reviewing the detailed solutions for questions you answered incorrectly to reinforce your understanding.")
+
+    recommendations.append("\nQuestion Category Analysis:")
+    for category, questions_list in question_categories.items():
+        num_incorrect = len(questions_list)
+        recommendations.append(f"  - {category} (Count: {num_incorrect})")
+        if num_incorrect > 0:
+            recommendations.append("     Sample questions:")
+            for i in range(min(3, num_incorrect)):
+                recommendations.append(
+                    f"       - {questions_list[i]['description'][:100]}...")
+
+    student_persona = generate_student_persona(
+        overall_accuracy, weak_topics, difficulty_analysis)
+
+    results = {
+        "overall_accuracy": overall_accuracy,
+        "weak_topics": weak_topics,
+        "difficulty_analysis": difficulty_analysis,
+        "recommendations": recommendations,
+        "question_categories": question_categories,
+        "student_persona": student_persona,
+        "final_score": final_score,
+        "negative_score": negative_score,
+        "correct_answers": correct_answers_count,
+        "incorrect_answers": incorrect_answers_count,
+        "source": source,
+        "type": quiz_type,
+        "started_at": started_at,
+        "ended_at": ended_at,
+        "duration": duration,
+        "better_than": better_than,
+        "total_questions": total_questions,
+        "topic_performance": topic_performance
+    }
+
+    return results
+
+
+def topic_recommendation(weak_topics):
+
+    if weak_topics:
+        return f"Focus on improving your understanding of the following topics: {', '.join([t['topic'] for t in weak_topics])}"
+
+    return "Good job! You have a strong understanding of all topics covered in this quiz."
+
+
+def generate_student_persona(overall_accuracy, weak_topics, difficulty_analysis):
+    """
+    Generates a student persona based on quiz performance.
+
+    Args:
+        overall_accuracy (float): Overall quiz accuracy.
+        weak_topics (list): List of weak topics.
+        difficulty_analysis (list): Analysis of performance by difficulty.
+
+    Returns:
+        dict: A dictionary representing the student persona.
+    """
+
+    persona = {}
+
+    if overall_accuracy >= 90:
+        persona['name'] = "The Ace"
+        persona['description'] = "Consistently demonstrates mastery. Excels in understanding and application."
+        persona['strengths'] = "Strong grasp of fundamental concepts, excellent problem-solving skills."
+        persona['weaknesses'] = "Potential overconfidence, may benefit from exploring advanced topics."
+    elif overall_accuracy >= 70:
+        persona['name'] = "The Diligent Learner"
+        persona['description'] = "Shows good understanding with room for improvement. Responds well to targeted practice."
+        persona['strengths'] = "Solid foundation, consistent effort, willing to learn."
+        persona['weaknesses'] = "Inconsistencies in applying knowledge, needs to reinforce weaker areas."
+    else:
+        persona['name'] = "The Budding Biologist"
+        persona['description'] = "Demonstrates potential but struggles with core concepts. Requires focused attention and practice."
+        persona['strengths'] = "Enthusiastic and curious."
+        persona['weaknesses'] = "Gaps in foundational knowledge, needs a structured approach to learning."
+
+    if weak_topics:
+        persona['specific_weaknesses'] = f"Struggles with: {', '.join([t['topic'] for t in weak_topics])}"
+    else:
+        persona['specific_weaknesses'] = "No significant topic weaknesses identified."
+
+    if difficulty_analysis and all(item['difficulty'] in ["Not Specified", None, ""] for item in difficulty_analysis) is False:
+        valid_difficulties = [
+            d for d in difficulty_analysis if d['difficulty'] != "Not Specified"]
+        easiest = valid_difficulties[-1]['difficulty'] if valid_difficulties else "Unknown"
+        hardest = valid_difficulties[0]['difficulty'] if valid_difficulties else "Unknown"
+        persona['difficulty_profile'] = f"Excels at {easiest} difficulty, struggles with {hardest}."
+    else:
+        persona['difficulty_profile'] = "Difficulty level performance is not specified"
+
+    return persona
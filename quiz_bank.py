@@ -0,0 +1,404 @@
+# quiz_bank.py
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+from difficulty_model import difficulty_model_fingerprint
+from pipeline_timing import stage
+from question_index import QUESTION_INDEX_FILE, load_question_index
+from quiz_compiler import COMPILED_QUIZ_FILE, build_lookup_tables, compile_quiz, load_compiled_quiz
+from shared_quiz import freeze_prepared_quiz
+from topic_registry import topic_aliases_fingerprint
+
+QUIZ_BANK_FILE = 'quiz_bank.bin'
+QUIZ_BANK_MAGIC = b'QUIZBANK'
+QUIZ_BANK_VERSION = 2
+# Magic, then the length of the JSON header as a little-endian uint64.
+PREAMBLE = struct.Struct('<8sQ')
+COLUMN_ALIGNMENT = 64
+
+
+class QuizBank:
+    """
+    Read-only view of a quiz bank compiled by `write_quiz_bank`.
+
+    The file is a small JSON header followed by aligned binary columns:
+    question ids, topic and difficulty codes, confusingness, the option ids
+    and correctness flags of every question (located by `option_offsets`)
+    and the UTF-8 question descriptions stored back to back (located by
+    `description_offsets`). The columns are NumPy views straight into a
+    read-only `mmap`, so opening a bank copies nothing, and worker
+    processes that open the same file share its pages through the OS page
+    cache. Descriptions are only decoded when a question's text is read.
+
+    Difficulties and confusingness are resolved from the question index
+    when the bank is written, so scoring needs neither the quiz JSON nor
+    the index. Nothing in the bank is ever written after it is opened, so
+    one open bank can be scored against from many threads at once.
+    """
+
+    def __init__(self, path=QUIZ_BANK_FILE):
+
+        self.path = path
+        self._lookup_tables = None
+        self._tables_lock = threading.Lock()
+        self._mmap, header, columns = map_column_file(path, QUIZ_BANK_MAGIC, QUIZ_BANK_VERSION)
+
+        self.header = header
+        self.quiz = header['quiz']
+        self.topics = header['topics']
+        self.difficulties = header['difficulties']
+        for name, column in columns.items():
+            setattr(self, name, column)
+
+        self.questions = BankQuestions(self)
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def __reduce__(self):
+        # Processes receive the path and map the file themselves.
+        return (type(self), (self.path,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+
+        self._lookup_tables = None
+        for name in self.header['columns']:
+            delattr(self, name)
+        self._mmap.close()
+
+    def description(self, position):
+
+        start, end = self.description_offsets[position:position + 2]
+        return self.descriptions[start:end].tobytes().decode('utf-8')
+
+    @property
+    def compiled_quiz(self):
+        """The answer lookup tables of `quiz_compiler`."""
+
+        return self._tables()[0]
+
+    @property
+    def prepared_quiz(self):
+        """The bank in the form returned by `quiz_analysis.prepare_quiz`, made read-only."""
+
+        return self._tables()[1]
+
+    def _tables(self):
+        # Built once, on first use, by whichever thread gets there first.
+        tables = self._lookup_tables
+        if tables is None:
+            with self._tables_lock:
+                if self._lookup_tables is None:
+                    self._lookup_tables = self._build_tables()
+                tables = self._lookup_tables
+
+        return tables
+
+    def _build_tables(self):
+
+        compiled_quiz = build_lookup_tables({
+            'quiz_id': self.quiz.get('id'),
+            'question_ids': [str(question_id) for question_id in self.question_ids.tolist()],
+            'question_updated_at': self.header['question_updated_at'],
+            'question_topic_names': [self.topics[code] for code in self.question_topics.tolist()],
+            'option_ids': self.option_ids.tolist(),
+            'option_positions': np.repeat(
+                np.arange(len(self)), np.diff(self.option_offsets)).tolist(),
+            'option_correct': self.option_correct.tolist()
+        })
+
+        return compiled_quiz, freeze_prepared_quiz({
+            'questions': self.questions,
+            'question_positions': compiled_quiz['question_positions'],
+            'option_codes': compiled_quiz['option_codes'],
+            'option_ids': [str(option_id) for option_id in compiled_quiz['option_ids']],
+            'option_positions': np.array(compiled_quiz['option_positions'], dtype=np.int64),
+            'option_correct': np.append(self.option_correct, False),
+            'topic_codes': {topic: code for code, topic in enumerate(self.topics)},
+            'difficulty_codes': {difficulty: code
+                                 for code, difficulty in enumerate(self.difficulties)},
+            'question_topics': self.question_topics.astype(np.int64),
+            'question_difficulties': self.question_difficulties.astype(np.int64),
+            # Copied, so no table handed out holds a pointer into the mmap
+            # and `close` can unmap it.
+            'confusingness': np.array(self.confusingness)
+        })
+
+
+class BankQuestions(Sequence):
+    """The questions of a `QuizBank`, as lazily decoded `BankQuestion` views."""
+
+    def __init__(self, bank):
+        self.bank = bank
+
+    def __len__(self):
+        return len(self.bank)
+
+    def __getitem__(self, position):
+
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if not -len(self) <= position < len(self):
+            raise IndexError(position)
+
+        return BankQuestion(self.bank, int(position) % len(self))
+
+
+class BankQuestion(Mapping):
+    """
+    A question of a `QuizBank`, readable like the question dicts of the quiz
+    JSON. Only the fields used by the reports are available.
+    """
+
+    FIELDS = ('id', 'topic', 'difficulty_level', 'confusingness', 'description', 'options')
+
+    def __init__(self, bank, position):
+        self.bank = bank
+        self.position = position
+
+    def __getitem__(self, field):
+
+        bank = self.bank
+        position = self.position
+
+        if field == 'id':
+            return int(bank.question_ids[position])
+        if field == 'topic':
+            return bank.topics[bank.question_topics[position]]
+        if field == 'difficulty_level':
+            return bank.difficulties[bank.question_difficulties[position]]
+        if field == 'confusingness':
+            return float(bank.confusingness[position])
+        if field == 'description':
+            return bank.description(position)
+        if field == 'options':
+            start, end = bank.option_offsets[position:position + 2]
+            return [{'id': int(option_id), 'is_correct': bool(is_correct)}
+                    for option_id, is_correct in zip(bank.option_ids[start:end],
+                                                     bank.option_correct[start:end])]
+        raise KeyError(field)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return f"BankQuestion(id={self['id']})"
+
+
+def write_quiz_bank(quiz_data, path=QUIZ_BANK_FILE, question_index=None, source=None):
+    """
+    Compiles a quiz into the binary quiz-bank format read by `QuizBank`.
+
+    Only what scoring and the reports use is kept: ids, topics, resolved
+    difficulties, confusingness, options and descriptions. Solutions, photo
+    URLs and most timestamps are dropped.
+
+    Args:
+        quiz_data (dict): The quiz bank, with integer question and option ids.
+        path (str): Where to write the bank.
+        question_index (dict, optional): Preloaded question-feature index.
+        source (dict, optional): Size and mtime of the quiz file, used by
+            `load_quiz_bank` to tell when the bank is stale.
+    """
+
+    # Imported here because quiz_analysis itself reads quiz banks.
+    from quiz_analysis import prepare_quiz
+
+    compiled_quiz = compile_quiz(quiz_data)
+    prepared_quiz = prepare_quiz(quiz_data, question_index, compiled_quiz)
+    questions = prepared_quiz['questions']
+
+    try:
+        question_ids = np.array([int(question['id']) for question in questions], dtype=np.int64)
+        option_ids = np.array([int(option_id) for option_id in compiled_quiz['option_ids']],
+                              dtype=np.int64)
+    except ValueError:
+        raise ValueError("Only quizzes with integer question and option ids "
+                         "can be written as a quiz bank") from None
+
+    descriptions = [question['description'].encode('utf-8') for question in questions]
+    description_offsets = np.zeros(len(descriptions) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in descriptions], out=description_offsets[1:])
+    option_offsets = np.zeros(len(questions) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(prepared_quiz['option_positions'], minlength=len(questions)),
+              out=option_offsets[1:])
+
+    columns = {
+        'question_ids': question_ids,
+        'question_topics': prepared_quiz['question_topics'].astype(np.int32),
+        'question_difficulties': prepared_quiz['question_difficulties'].astype(np.int32),
+        'confusingness': prepared_quiz['confusingness'],
+        'option_offsets': option_offsets,
+        'option_ids': option_ids,
+        'option_correct': prepared_quiz['option_correct'][:-1],
+        'description_offsets': description_offsets,
+        'descriptions': np.frombuffer(b''.join(descriptions), dtype=np.uint8)
+    }
+
+    write_column_file(path, QUIZ_BANK_MAGIC, {
+        'version': QUIZ_BANK_VERSION,
+        'source': source,
+        'difficulty_model': difficulty_model_fingerprint(),
+        'topic_aliases': topic_aliases_fingerprint(),
+        'quiz': {field: quiz_data['quiz'].get(field)
+                 for field in ('id', 'title', 'topic', 'difficulty_level')},
+        'topics': list(prepared_quiz['topic_codes']),
+        'difficulties': list(prepared_quiz['difficulty_codes']),
+        'question_updated_at': compiled_quiz['question_updated_at']
+    }, columns)
+
+
+def write_column_file(path, magic, header, columns):
+    """
+    Writes `header` as JSON, then each of `columns` (name -> 1-D array) at
+    the next aligned offset, atomically. The columns' dtypes, offsets and
+    lengths are recorded in `header['columns']`.
+    """
+
+    # Column offsets are relative to the start of the data section, which
+    # follows the header at the next aligned offset.
+    header['columns'] = {}
+    offset = 0
+    for name, column in columns.items():
+        header['columns'][name] = [column.dtype.str, offset, len(column)]
+        offset = _align(offset + column.nbytes)
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _align(PREAMBLE.size + len(header_bytes))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(PREAMBLE.pack(magic, len(header_bytes)))
+        f.write(header_bytes)
+        for name, column in columns.items():
+            f.seek(data_start + header['columns'][name][1])
+            f.write(column.tobytes())
+    os.replace(tmp_path, path)
+
+
+def map_column_file(path, magic, version):
+    """
+    Maps a file written by `write_column_file` read-only.
+
+    Returns:
+        tuple: The mmap, the header and the columns as zero-copy NumPy
+            views, keyed by name.
+    """
+
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    file_magic, header_length = PREAMBLE.unpack_from(mapped)
+    if file_magic != magic:
+        mapped.close()
+        raise ValueError(f"{path} is not a {magic.decode('ascii').lower()} file")
+    header = json.loads(mapped[PREAMBLE.size:PREAMBLE.size + header_length].decode('utf-8'))
+    if header['version'] != version:
+        mapped.close()
+        raise ValueError(f"{path} has unsupported version {header['version']}")
+
+    data_start = _align(PREAMBLE.size + header_length)
+    columns = {name: np.frombuffer(mapped, dtype=dtype, count=length, offset=data_start + offset)
+               for name, (dtype, offset, length) in header['columns'].items()}
+
+    return mapped, header, columns
+
+
+def _align(offset):
+    return -(-offset // COLUMN_ALIGNMENT) * COLUMN_ALIGNMENT
+
+
+def _file_signature(path):
+
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def load_quiz_bank(quiz_path, path=QUIZ_BANK_FILE, index_path=QUESTION_INDEX_FILE):
+    """
+    Opens the quiz bank compiled from the quiz JSON at `quiz_path`,
+    recompiling it first if the JSON, the difficulty model or the topic
+    aliases (which name the bank's topics) have changed since it was written.
+
+    Args:
+        quiz_path (str): The quiz JSON.
+        path (str): Location of the compiled bank.
+        index_path (str): Question index used when (re)compiling.
+
+    Returns:
+        QuizBank: The open bank.
+    """
+
+    source = _file_signature(quiz_path)
+
+    if os.path.exists(path):
+        try:
+            bank = QuizBank(path)
+        except ValueError:
+            pass
+        else:
+            if bank.header['source'] == source and \
+                    bank.header.get('difficulty_model') == difficulty_model_fingerprint() and \
+                    bank.header.get('topic_aliases') == topic_aliases_fingerprint():
+                return bank
+            bank.close()
+
+    with open(quiz_path, 'r') as f:
+        quiz_data = json.load(f)
+    write_quiz_bank(quiz_data, path, load_question_index(quiz_data, index_path), source)
+
+    return QuizBank(path)
+
+
+def load_quiz(quiz_path, index_path=QUESTION_INDEX_FILE, compiled_path=COMPILED_QUIZ_FILE,
+              bank_path=None):
+    """
+    Loads a quiz for the analyzers: the memory-mapped bank at `bank_path`
+    when one is given, otherwise the quiz JSON with its question index and
+    compiled lookup tables.
+
+    Returns:
+        tuple: The quiz (dict or QuizBank), its question index and its
+            compiled quiz. The index and compiled quiz are None for a bank.
+    """
+
+    if bank_path:
+        return load_quiz_bank(quiz_path, bank_path, index_path), None, None
+
+    with stage('json_load'), open(quiz_path, 'r') as f:
+        quiz_data = json.load(f)
+
+    return (quiz_data, load_question_index(quiz_data, index_path),
+            load_compiled_quiz(quiz_data, compiled_path))
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Compiles a quiz JSON into the memory-mapped quiz-bank format.")
+    parser.add_argument('--quiz', default='current_test_data.txt')
+    parser.add_argument('--index', default=QUESTION_INDEX_FILE)
+    parser.add_argument('--output', default=QUIZ_BANK_FILE)
+    args = parser.parse_args(argv)
+
+    with load_quiz_bank(args.quiz, args.output, args.index) as bank:
+        print(f"Wrote {len(bank)} questions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
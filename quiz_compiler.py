@@ -0,0 +1,157 @@
+# quiz_compiler.py
+import json
+import os
+
+from topic_registry import TopicRegistry
+
+COMPILED_QUIZ_FILE = 'compiled_quiz.json'
+COMPILED_QUIZ_VERSION = 2
+
+# Fields of a compiled quiz that are written to disk; the lookup tables are
+# rebuilt from them on load.
+STORED_FIELDS = ('quiz_id', 'question_ids', 'question_updated_at', 'question_topic_names',
+                 'option_ids', 'option_positions', 'option_correct')
+
+
+def id_keys(value):
+    """
+    Returns every form an id may take in a response map: as stored in the
+    quiz, as a string and, for numeric ids, as an int.
+    """
+
+    text = str(value)
+    keys = {value, text}
+    if text.isdigit():
+        keys.add(int(text))
+
+    return keys
+
+
+def compile_quiz(quiz_data):
+    """
+    Compiles a quiz bank into lookup tables for answer checking.
+
+    Every (question, option) pair gets an integer option code, in question
+    order. The tables map each question id to its position, each option id
+    to its question, and hold per question the option codes and the set of
+    correct options, keyed by every form of the ids (`id_keys`). Checking an
+    answer is then a single set lookup with no string conversions, and
+    questions with several correct options are supported. Topics are
+    resolved to the integer ids of a `TopicRegistry`, in question order.
+
+    Args:
+        quiz_data (dict): The quiz bank.
+
+    Returns:
+        dict: The compiled quiz.
+    """
+
+    question_ids = []
+    question_updated_at = []
+    question_topic_names = []
+    option_ids = []
+    option_positions = []
+    option_correct = []
+
+    for position, question in enumerate(quiz_data['quiz']['questions']):
+        question_ids.append(str(question['id']))
+        question_updated_at.append(question.get('updated_at'))
+        question_topic_names.append(question['topic'])
+        for option in question['options']:
+            option_ids.append(option['id'])
+            option_positions.append(position)
+            option_correct.append(bool(option['is_correct']))
+
+    return build_lookup_tables({
+        'quiz_id': quiz_data['quiz'].get('id'),
+        'question_ids': question_ids,
+        'question_updated_at': question_updated_at,
+        'question_topic_names': question_topic_names,
+        'option_ids': option_ids,
+        'option_positions': option_positions,
+        'option_correct': option_correct
+    })
+
+
+def build_lookup_tables(compiled_quiz):
+    """Adds the lookup tables to a compiled quiz holding only its STORED_FIELDS."""
+
+    question_positions = {}
+    for position, question_id in enumerate(compiled_quiz['question_ids']):
+        for key in id_keys(question_id):
+            question_positions[key] = position
+
+    option_codes = [{} for _ in compiled_quiz['question_ids']]
+    correct_options = [set() for _ in compiled_quiz['question_ids']]
+    option_questions = {}
+
+    for code, (option_id, position, is_correct) in enumerate(zip(
+            compiled_quiz['option_ids'], compiled_quiz['option_positions'],
+            compiled_quiz['option_correct'])):
+        keys = id_keys(option_id)
+        for key in keys:
+            option_codes[position].setdefault(key, code)
+            option_questions[key] = compiled_quiz['question_ids'][position]
+        if is_correct:
+            correct_options[position].update(keys)
+
+    topic_registry = TopicRegistry()
+    compiled_quiz['question_topics'] = topic_registry.topic_ids(compiled_quiz['question_topic_names'])
+    compiled_quiz['topic_codes'] = topic_registry.codes()
+
+    compiled_quiz['question_positions'] = question_positions
+    compiled_quiz['option_codes'] = option_codes
+    compiled_quiz['correct_options'] = [frozenset(options) for options in correct_options]
+    compiled_quiz['option_questions'] = option_questions
+
+    return compiled_quiz
+
+
+def compiled_quiz_matches(compiled_quiz, quiz_data):
+    """Checks that `compiled_quiz` was compiled from the current version of every question."""
+
+    questions = quiz_data['quiz']['questions']
+
+    return compiled_quiz['quiz_id'] == quiz_data['quiz'].get('id') and \
+        compiled_quiz['question_ids'] == [str(question['id']) for question in questions] and \
+        compiled_quiz['question_updated_at'] == [question.get('updated_at') for question in questions]
+
+
+def read_compiled_quiz(path=COMPILED_QUIZ_FILE):
+
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'r') as f:
+        stored = json.load(f)
+
+    if stored.get('version') != COMPILED_QUIZ_VERSION:
+        return None
+
+    return build_lookup_tables({field: stored[field] for field in STORED_FIELDS})
+
+
+def write_compiled_quiz(compiled_quiz, path=COMPILED_QUIZ_FILE):
+
+    stored = {field: compiled_quiz[field] for field in STORED_FIELDS}
+    stored['version'] = COMPILED_QUIZ_VERSION
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(stored, f)
+    os.replace(tmp_path, path)
+
+
+def load_compiled_quiz(quiz_data, path=COMPILED_QUIZ_FILE):
+    """
+    Loads the compiled form of a quiz bank from `path`, recompiling and
+    saving it if the quiz has changed since it was compiled.
+    """
+
+    compiled_quiz = read_compiled_quiz(path)
+
+    if compiled_quiz is None or not compiled_quiz_matches(compiled_quiz, quiz_data):
+        compiled_quiz = compile_quiz(quiz_data)
+        write_compiled_quiz(compiled_quiz, path)
+
+    return compiled_quiz
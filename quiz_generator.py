@@ -0,0 +1,213 @@
+# quiz_generator.py
+import argparse
+import json
+
+import numpy as np
+
+from history_stream import iter_history_records
+from pipeline_timing import stage
+from question_index import QUESTION_INDEX_FILE
+from quiz_analysis import analyze_quiz_data_advanced, prepare_quiz
+from quiz_bank import load_quiz
+from quiz_compiler import COMPILED_QUIZ_FILE
+from topic_registry import topic_key
+
+NEXT_QUIZ_SIZE = 30
+# A weak topic's questions are drawn up to 1 + WEAK_TOPIC_BOOST times as
+# often as those of other topics (at 0% accuracy), and a difficulty level up
+# to 1 + DIFFICULTY_BOOST times as often as a level answered perfectly.
+WEAK_TOPIC_BOOST = 4.0
+DIFFICULTY_BOOST = 1.0
+# Random draws from a bucket before falling back to listing its unseen questions.
+MAX_BUCKET_DRAWS = 32
+
+
+class QuestionBuckets:
+    """
+    The questions of a quiz bank grouped by (canonical topic, difficulty).
+
+    Question positions are sorted once by bucket into `bucket_positions`,
+    and bucket b holds `bucket_positions[bucket_offsets[b]:bucket_offsets[b + 1]]`,
+    with b = topic code * number of difficulties + difficulty code. Drawing
+    a question from a bucket is then one random index into its slice, so
+    generating a quiz costs O(k) draws plus one pass over the (few) buckets,
+    never a pass over the bank. Nothing is written after construction, so
+    one instance can serve many threads.
+    """
+
+    def __init__(self, quiz_data, question_index=None, compiled_quiz=None):
+
+        prepared_quiz = prepare_quiz(quiz_data, question_index, compiled_quiz)
+        self.questions = prepared_quiz['questions']
+        self.question_positions = prepared_quiz['question_positions']
+        self.question_topics = prepared_quiz['question_topics']
+        self.question_difficulties = prepared_quiz['question_difficulties']
+
+        self.topics = list(prepared_quiz['topic_codes'])
+        self.difficulties = list(prepared_quiz['difficulty_codes'])
+        self._topic_codes = {topic_key(topic): code
+                             for topic, code in prepared_quiz['topic_codes'].items()}
+        self._difficulty_codes = {difficulty: code for code, difficulty in enumerate(self.difficulties)}
+
+        question_buckets = prepared_quiz['question_topics'] * len(self.difficulties) + \
+            prepared_quiz['question_difficulties']
+        self.bucket_positions = np.argsort(question_buckets, kind='stable')
+        self.bucket_sizes = np.bincount(
+            question_buckets, minlength=len(self.topics) * len(self.difficulties))
+        self.bucket_offsets = np.zeros(len(self.bucket_sizes) + 1, dtype=np.int64)
+        np.cumsum(self.bucket_sizes, out=self.bucket_offsets[1:])
+
+    def bucket_weights(self, weak_topics, difficulty_analysis):
+        """
+        The sampling weight of every bucket for a student, from the
+        `weak_topics` and `difficulty_analysis` of their analysis results.
+        A topic's share of the quiz depends only on its own weight, however
+        many difficulty levels it has questions at; the difficulty weights
+        split that share between its levels.
+        """
+
+        topic_weights = np.ones(len(self.topics))
+        for weak_topic in weak_topics:
+            code = self._topic_codes.get(topic_key(weak_topic['topic']))
+            if code is not None:
+                topic_weights[code] = 1 + WEAK_TOPIC_BOOST * (1 - weak_topic['accuracy'] / 100)
+
+        difficulty_weights = np.ones(len(self.difficulties))
+        for item in difficulty_analysis:
+            code = self._difficulty_codes.get(item['difficulty'])
+            if code is not None:
+                difficulty_weights[code] = 1 + DIFFICULTY_BOOST * (1 - item['accuracy'] / 100)
+
+        weights = difficulty_weights * (self.bucket_sizes > 0).reshape(len(self.topics), -1)
+        topic_totals = weights.sum(axis=1, keepdims=True)
+        np.divide(weights, topic_totals, out=weights, where=topic_totals > 0)
+
+        return (topic_weights[:, None] * weights).ravel()
+
+    def seen_questions(self, quiz_submissions):
+        """The questions answered in any of `quiz_submissions`, as a container of positions."""
+
+        return _SeenQuestions(self.questions, (
+            quiz_submission_data.get('response_map', {}) for quiz_submission_data in quiz_submissions))
+
+    def sample(self, k, weights, exclude_positions=(), rng=None):
+        """
+        Draws up to `k` distinct question positions, choosing each one's
+        bucket with probability proportional to `weights`. Positions in
+        `exclude_positions` are never drawn. Questions are drawn from a
+        bucket at random until one is new; only when that keeps failing is
+        the bucket scanned for its remaining questions, and a bucket with
+        none left is dropped. Fewer than `k` positions come back only when
+        the weighted buckets run out.
+        """
+
+        rng = np.random.default_rng() if rng is None else rng
+        weights = np.array(weights, dtype=np.float64)
+        drawn = set()
+        positions = []
+
+        while len(positions) < k and weights.sum() > 0:
+            buckets = rng.choice(len(weights), size=k - len(positions), p=weights / weights.sum())
+            for bucket in buckets.tolist():
+                start = self.bucket_offsets[bucket]
+                end = self.bucket_offsets[bucket + 1]
+                for offset in rng.integers(start, end, size=MAX_BUCKET_DRAWS).tolist():
+                    position = int(self.bucket_positions[offset])
+                    if position not in drawn and position not in exclude_positions:
+                        break
+                else:
+                    remaining = [position for position in self.bucket_positions[start:end].tolist()
+                                 if position not in drawn and position not in exclude_positions]
+                    if not remaining:
+                        weights[bucket] = 0
+                        continue
+                    position = remaining[rng.integers(len(remaining))]
+                drawn.add(position)
+                positions.append(position)
+
+        return positions
+
+
+class _SeenQuestions:
+    """
+    The ids answered in a history, collected into one set in a single pass,
+    so checking a drawn question is one lookup however long the history is.
+    """
+
+    def __init__(self, questions, response_maps):
+
+        self.questions = questions
+        self.seen_ids = {str(question_id) for response_map in response_maps
+                         for question_id in response_map}
+
+    def __contains__(self, position):
+
+        return str(self.questions[position]['id']) in self.seen_ids
+
+
+def generate_next_quiz(question_buckets, analysis_results, history=(), k=NEXT_QUIZ_SIZE, rng=None):
+    """
+    Picks a personalised follow-up quiz of `k` questions for a student.
+
+    Args:
+        question_buckets (QuestionBuckets): The bucketed question bank.
+        analysis_results (dict): The student's results from
+            `analyze_quiz_data_advanced`.
+        history (iterable): The student's submissions; no question answered
+            in any of them is picked.
+        k (int): Number of questions.
+        rng (np.random.Generator, optional): Source of randomness.
+
+    Returns:
+        list: The `id`, canonical `topic` and resolved `difficulty` of each
+            question, weighted towards weak topics and the difficulty
+            levels the student answers least accurately.
+    """
+
+    with stage('next_quiz'):
+        weights = question_buckets.bucket_weights(
+            analysis_results['weak_topics'], analysis_results['difficulty_analysis'])
+        positions = question_buckets.sample(
+            k, weights, question_buckets.seen_questions(history), rng)
+
+        return [{'id': question_buckets.questions[position]['id'],
+                 'topic': question_buckets.topics[question_buckets.question_topics[position]],
+                 'difficulty': question_buckets.difficulties[
+                     question_buckets.question_difficulties[position]]}
+                for position in positions]
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Generates a personalised follow-up quiz for a student from the question bank.")
+    parser.add_argument('--quiz', default='current_test_data.txt')
+    parser.add_argument('--submission', default='Quiz_submission_data.txt')
+    parser.add_argument('--history', help="JSON array or NDJSON of the student's earlier submissions")
+    parser.add_argument('--index', default=QUESTION_INDEX_FILE)
+    parser.add_argument('--compiled', default=COMPILED_QUIZ_FILE)
+    parser.add_argument('--bank', help="memory-mapped quiz bank compiled from --quiz by quiz_bank.py")
+    parser.add_argument('-k', type=int, default=NEXT_QUIZ_SIZE, help="number of questions")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    with open(args.submission, 'r') as f:
+        quiz_submission_data = json.load(f)
+    quiz_data, question_index, compiled_quiz = load_quiz(
+        args.quiz, args.index, args.compiled, args.bank)
+
+    analysis_results = analyze_quiz_data_advanced(
+        quiz_data, quiz_submission_data, question_index, compiled_quiz)
+    history = [quiz_submission_data]
+    if args.history:
+        history.extend(iter_history_records(args.history))
+
+    question_buckets = QuestionBuckets(quiz_data, question_index, compiled_quiz)
+    questions = generate_next_quiz(question_buckets, analysis_results, history, args.k,
+                                   np.random.default_rng(args.seed))
+
+    print(json.dumps(questions, indent=2))
+
+
+if __name__ == "__main__":
+    main()
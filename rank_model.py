@@ -0,0 +1,94 @@
+# rank_model.py
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+RANK_TABLE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'neet_rank_table.json')
+
+
+class RankModel:
+    """
+    Maps quiz accuracy to a predicted NEET rank through a score -> rank
+    cutoff table.
+
+    The table is sorted by score once; predictions locate each score with
+    `np.searchsorted` and interpolate linearly between the neighbouring
+    cutoffs, which keeps the predicted rank monotone in the score. Scores
+    outside the table take the rank of the nearest end.
+    """
+
+    def __init__(self, scores, ranks, max_score=720):
+
+        scores = np.asarray(scores, dtype=np.float64)
+        ranks = np.asarray(ranks, dtype=np.float64)
+        if scores.shape != ranks.shape or len(scores) < 2:
+            raise ValueError(
+                "Rank table needs at least two matching score and rank entries")
+
+        order = np.argsort(scores, kind='stable')
+        self.scores = scores[order]
+        self.ranks = ranks[order]
+        self.max_score = max_score
+
+        if np.any(np.diff(self.scores) == 0):
+            raise ValueError("Rank table scores must be unique")
+        if np.any(np.diff(self.ranks) > 0):
+            raise ValueError("Rank table ranks must not increase with score")
+
+    @classmethod
+    def load(cls, path=RANK_TABLE_FILE):
+
+        with open(path, 'r') as f:
+            table = json.load(f)
+
+        return cls(table['score'], table['rank'], table.get('max_score', 720))
+
+    def predict_ranks(self, accuracies):
+        """
+        Predicts the rank of every accuracy in one vectorized call.
+
+        Args:
+            accuracies (array-like): Quiz accuracies in percent.
+
+        Returns:
+            np.ndarray: The predicted ranks, as integers.
+        """
+
+        predicted_scores = np.clip(
+            np.asarray(accuracies, dtype=np.float64) / 100 * self.max_score,
+            self.scores[0], self.scores[-1])
+
+        upper = np.clip(np.searchsorted(self.scores, predicted_scores, side='right'),
+                        1, len(self.scores) - 1)
+        lower = upper - 1
+
+        fraction = (predicted_scores - self.scores[lower]) / \
+            (self.scores[upper] - self.scores[lower])
+        ranks = self.ranks[lower] + fraction * \
+            (self.ranks[upper] - self.ranks[lower])
+
+        return np.rint(ranks).astype(np.int64)
+
+    def predict_rank(self, accuracy):
+
+        return int(self.predict_ranks([accuracy])[0])
+
+
+@lru_cache(maxsize=None)
+def get_rank_model(path=RANK_TABLE_FILE):
+    """Returns the rank model for `path`, loading its table once per process."""
+
+    return RankModel.load(path)
+
+
+def predict_neet_rank(quiz_accuracy):
+
+    return get_rank_model().predict_rank(quiz_accuracy)
+
+
+def predict_neet_ranks(quiz_accuracies):
+
+    return get_rank_model().predict_ranks(quiz_accuracies)
@@ -0,0 +1,138 @@
+# report_renderer.py
+import base64
+import os
+import string
+
+WRITE_CHUNK_SIZE = 1 << 16
+
+_formatter = string.Formatter()
+
+
+class Stream:
+    """
+    Template value that is written piece by piece instead of being formatted
+    into one string, e.g. a list of `<li>` items or a multi-hundred-KB chart.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+
+class CompiledTemplate:
+    """
+    A report template parsed once into literal text and replacement fields.
+
+    Templates use `str.format` syntax (`{field}`, `{field:.2f}`,
+    `{persona[name]}`, `{{` for a literal brace). Rendering walks the parsed
+    segments and yields the output in pieces, so a report is never held in
+    memory as a single string.
+    """
+
+    def __init__(self, text):
+
+        self.segments = list(_formatter.parse(text))
+
+    def iter_chunks(self, context):
+
+        for literal, field_name, format_spec, conversion in self.segments:
+            if literal:
+                yield literal
+            if field_name is None:
+                continue
+
+            value, _ = _formatter.get_field(field_name, (), context)
+            if isinstance(value, Stream):
+                yield from value
+                continue
+
+            if conversion:
+                value = _formatter.convert_field(value, conversion)
+            yield format(value, format_spec)
+
+    def render(self, context):
+
+        return ''.join(self.iter_chunks(context))
+
+    def render_to(self, context, out, chunk_size=WRITE_CHUNK_SIZE):
+        """
+        Streams the rendered template to `out` (anything with a `write`
+        method: a file, a socket file, an HTTP response) in chunks of about
+        `chunk_size` characters. Small pieces are buffered into one write;
+        a piece of `chunk_size` or more is written through in slices rather
+        than joined into the buffer.
+        """
+
+        pending = []
+        pending_size = 0
+        for chunk in self.iter_chunks(context):
+            if len(chunk) >= chunk_size:
+                if pending:
+                    out.write(''.join(pending))
+                    pending = []
+                    pending_size = 0
+                for piece in _slices(chunk, chunk_size):
+                    out.write(piece)
+                continue
+
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= chunk_size:
+                out.write(''.join(pending))
+                pending = []
+                pending_size = 0
+
+        if pending:
+            out.write(''.join(pending))
+
+
+def _slices(text, size=WRITE_CHUNK_SIZE):
+
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def compile_template(text):
+
+    return CompiledTemplate(text)
+
+
+def stream_items(item_template, items):
+    """Streams one formatted `item_template` per item, e.g. `<li>` elements."""
+
+    return Stream(item_template.format_map(item) for item in items)
+
+
+def _data_uri(chart):
+
+    yield "data:image/png;base64,"
+    yield from _slices(chart)
+
+
+def chart_source(chart, chart_dir=None, chart_key=None, report_dir='.'):
+    """
+    Returns the `src` of a chart's `<img>` tag.
+
+    Without `chart_dir` the chart is inlined as a data URI, streamed in
+    WRITE_CHUNK_SIZE slices without copying the base64 text into the
+    document. With `chart_dir`, the PNG is
+    written there once under its content hash (`chart_key`) and referenced by
+    its path relative to `report_dir`, so browsers and proxies can cache it
+    across reports.
+    """
+
+    if chart_dir is None:
+        return Stream(_data_uri(chart))
+
+    file_name = f"{chart_key}.png"
+    path = os.path.join(chart_dir, file_name)
+    if not os.path.exists(path):
+        os.makedirs(chart_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(base64.b64decode(chart))
+        os.replace(tmp_path, path)
+
+    return os.path.relpath(path, report_dir).replace(os.sep, '/')
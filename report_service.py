@@ -0,0 +1,356 @@
+# report_service.py
+import argparse
+import asyncio
+import io
+import json
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from attempt_history import AttemptHistory
+from cohort_analytics import CohortAnalytics, add_cohort_percentiles
+from for_report_html import write_html_report
+from Performance_analyzer import (PERFORMANCE_REPORT_TEMPLATE, performance_report_context,
+                                  summarize_history)
+from pipeline_timing import pipeline_timings
+from practice_index import PracticeIndex, recommend_practice_questions
+from question_index import QUESTION_INDEX_FILE
+from quiz_analysis import analyze_quiz_data_advanced
+from quiz_bank import load_quiz
+from quiz_compiler import COMPILED_QUIZ_FILE
+from rank_model import predict_neet_rank
+from shared_quiz import SharedQuiz
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_PENDING_REPORTS = 32
+CHART_WORKERS = min(4, os.cpu_count() or 1)
+
+STATUS_REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'
+}
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Request:
+
+    def __init__(self, method, target, version, headers, body):
+
+        self.method = method
+        url = urlsplit(target)
+        self.path = url.path
+        self.query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self):
+
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def json(self):
+
+        try:
+            return json.loads(self.body)
+        except ValueError as error:
+            raise HTTPError(400, f"Request body is not valid JSON: {error}") from None
+
+
+async def read_request(reader, max_body_bytes=MAX_BODY_BYTES):
+    """Reads one HTTP/1.x request, or returns None when the client closed the connection."""
+
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+
+    try:
+        method, target, version = request_line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line") from None
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        content_length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length") from None
+    if content_length > max_body_bytes:
+        raise HTTPError(413, f"Request body is larger than {max_body_bytes} bytes")
+    body = await reader.readexactly(content_length) if content_length else b''
+
+    return Request(method, target, version, headers, body)
+
+
+def write_response(writer, status, content_type, body, keep_alive=True, headers=None):
+
+    head = [f"HTTP/1.1 {status} {STATUS_REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    head.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body)
+
+
+def _json_value(value):
+
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def json_body(data):
+
+    return json.dumps(data, default=_json_value).encode('utf-8')
+
+
+def quiz_results_json(analysis_results):
+    """The analysis results with question counts in place of the question objects."""
+
+    results = {key: value for key, value in analysis_results.items()
+               if key != 'question_categories'}
+    results['question_category_counts'] = {
+        category: len(questions)
+        for category, questions in analysis_results['question_categories'].items()}
+    results['predicted_neet_rank'] = predict_neet_rank(analysis_results['overall_accuracy'])
+
+    return results
+
+
+def history_summary_json(performance_data):
+
+    history = AttemptHistory.from_records(performance_data)
+    if not history.size:
+        raise HTTPError(400, "The history has no attempts")
+
+    summary = summarize_history(history)
+    topic_insights = summary['topic_insights']
+    summary['strong_topics'] = [topic for topic, accuracy in topic_insights.items()
+                                if accuracy >= 75]
+    summary['weak_topics'] = [topic for topic, accuracy in topic_insights.items()
+                              if accuracy < 60]
+
+    return summary
+
+
+class ReportService:
+    """
+    Serves quiz and history reports over HTTP from one long-lived process.
+
+    The quiz is loaded once at startup, as a read-only `SharedQuiz` or a
+    memory-mapped quiz bank, and quiz reports are scored against it on the
+    event loop's thread pool, as are history summaries. History reports
+    render their charts on a bounded process pool. At most `max_pending` history reports are in
+    progress at once, and further requests are refused with 503 and a
+    Retry-After header instead of queueing without bound.
+
+    Endpoints:
+        POST /quiz?format=html|json     body: one quiz submission
+        POST /history?format=html|json  body: a JSON array of attempt records
+        GET /health
+        GET /metrics                    stage timings, Prometheus text format
+    """
+
+    def __init__(self, quiz_data, question_index=None, compiled_quiz=None, cohort=None,
+                 chart_workers=CHART_WORKERS, max_pending=MAX_PENDING_REPORTS, practice_index=None):
+
+        if isinstance(quiz_data, dict):
+            quiz_data = SharedQuiz(quiz_data, question_index, compiled_quiz)
+        self.quiz_data = quiz_data
+        self.cohort = cohort
+        self.practice_index = practice_index
+        self.max_pending = max_pending
+        self.pending = 0
+        self.chart_executor = ProcessPoolExecutor(max_workers=chart_workers)
+        self.routes = {
+            ('POST', '/quiz'): self.quiz_report,
+            ('POST', '/history'): self.history_report,
+            ('GET', '/health'): self.health,
+            ('GET', '/metrics'): self.metrics
+        }
+
+    def close(self):
+
+        self.chart_executor.shutdown()
+
+    async def handle_connection(self, reader, writer):
+
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    keep_alive = request.keep_alive
+                    status, content_type, body, headers = await self.dispatch(request)
+                except HTTPError as error:
+                    status, content_type, body, headers = (
+                        error.status, 'application/json',
+                        json_body({'error': str(error)}), error.headers)
+
+                write_response(writer, status, content_type, body, keep_alive, headers)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, request):
+
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self.routes):
+                raise HTTPError(405, f"{request.method} is not allowed on {request.path}")
+            raise HTTPError(404, f"No endpoint at {request.path}")
+
+        output_format = request.query.get('format', 'html')
+        if output_format not in ('html', 'json'):
+            raise HTTPError(400, "format must be html or json")
+
+        try:
+            return await handler(request, output_format)
+        except HTTPError:
+            raise
+        except (KeyError, TypeError, ValueError) as error:
+            raise HTTPError(400, f"Invalid request data: {error!r}") from None
+        except Exception as error:
+            traceback.print_exc()
+            raise HTTPError(500, f"Report failed: {error!r}") from None
+
+    async def quiz_report(self, request, output_format):
+
+        quiz_submission_data = request.json()
+        if not isinstance(quiz_submission_data, dict):
+            raise HTTPError(400, "Expected a submission object")
+
+        body = await asyncio.to_thread(self._render_quiz, quiz_submission_data, output_format)
+        content_type = 'application/json' if output_format == 'json' else 'text/html; charset=utf-8'
+
+        return 200, content_type, body, None
+
+    def _render_quiz(self, quiz_submission_data, output_format):
+
+        analysis_results = analyze_quiz_data_advanced(self.quiz_data, quiz_submission_data)
+        if self.cohort is not None:
+            add_cohort_percentiles(analysis_results, self.cohort)
+        if self.practice_index is not None:
+            recommend_practice_questions(self.practice_index, analysis_results)
+
+        if output_format == 'json':
+            return json_body(quiz_results_json(analysis_results))
+
+        out = io.StringIO()
+        write_html_report(analysis_results, out)
+        return out.getvalue().encode('utf-8')
+
+    async def history_report(self, request, output_format):
+
+        performance_data = request.json()
+        if not isinstance(performance_data, list):
+            raise HTTPError(400, "Expected a JSON array of attempt records")
+
+        if self.pending >= self.max_pending:
+            raise HTTPError(503, "Too many reports in progress", {'Retry-After': '1'})
+
+        render = self._render_history_json if output_format == 'json' else self._render_history_html
+        self.pending += 1
+        try:
+            body = await asyncio.to_thread(render, performance_data)
+        finally:
+            self.pending -= 1
+        content_type = 'application/json' if output_format == 'json' else 'text/html; charset=utf-8'
+
+        return 200, content_type, body, None
+
+    def _render_history_json(self, performance_data):
+
+        return json_body(history_summary_json(performance_data))
+
+    def _render_history_html(self, performance_data):
+
+        if not performance_data:
+            raise HTTPError(400, "The history has no attempts")
+
+        context = performance_report_context(
+            performance_data, chart_executor=self.chart_executor)
+
+        return PERFORMANCE_REPORT_TEMPLATE.render(context).encode('utf-8')
+
+    async def health(self, request, output_format):
+
+        return 200, 'application/json', json_body(
+            {'status': 'ok', 'pending_reports': self.pending}), None
+
+    async def metrics(self, request, output_format):
+
+        return 200, 'text/plain; version=0.0.4', pipeline_timings.to_prometheus().encode(), None
+
+
+async def serve(service, host, port):
+
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    addresses = ', '.join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"Serving reports on {addresses}")
+
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Serves quiz and history reports over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--quiz', default='current_test_data.txt')
+    parser.add_argument('--index', default=QUESTION_INDEX_FILE)
+    parser.add_argument('--compiled', default=COMPILED_QUIZ_FILE)
+    parser.add_argument('--bank', help="memory-mapped quiz bank compiled from --quiz by quiz_bank.py")
+    parser.add_argument('--cohort', help="cohort statistics from cohort_analytics.py, to show percentiles")
+    parser.add_argument('--practice-index', help="practice-question index from practice_index.py, "
+                                                 "to recommend similar questions")
+    parser.add_argument('--chart-workers', type=int, default=CHART_WORKERS,
+                        help="processes rendering history charts")
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING_REPORTS,
+                        help="history reports in progress before new ones get 503")
+    args = parser.parse_args(argv)
+
+    quiz_data, question_index, compiled_quiz = load_quiz(
+        args.quiz, args.index, args.compiled, args.bank)
+    cohort = CohortAnalytics.load(args.cohort) if args.cohort else None
+    practice_index = PracticeIndex(args.practice_index) if args.practice_index else None
+
+    service = ReportService(quiz_data, question_index, compiled_quiz, cohort,
+                            args.chart_workers, args.max_pending, practice_index)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# shared_quiz.py
+from types import MappingProxyType
+
+import numpy as np
+
+
+def freeze(value):
+    """Returns a read-only copy of a JSON value: objects become mapping proxies and arrays tuples."""
+
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+
+    return value
+
+
+def freeze_prepared_quiz(prepared_quiz):
+    """
+    Makes the tables returned by `quiz_analysis.prepare_quiz` read-only:
+    arrays are flagged non-writeable, and lookup dicts (including the
+    per-question option codes) are wrapped in mapping proxies.
+    """
+
+    frozen = {}
+    for name, table in prepared_quiz.items():
+        if isinstance(table, np.ndarray):
+            table = table.view()
+            table.flags.writeable = False
+        elif isinstance(table, dict):
+            table = MappingProxyType(table)
+        elif isinstance(table, list):
+            table = tuple(MappingProxyType(item) if isinstance(item, dict) else item
+                          for item in table)
+        frozen[name] = table
+
+    return MappingProxyType(frozen)
+
+
+class SharedQuiz:
+    """
+    Immutable, prepared copy of a quiz JSON that any number of threads can
+    score submissions against at once.
+
+    The quiz is deep-copied into mapping proxies and tuples, and its
+    difficulties, confusingness and answer lookup tables are resolved once,
+    up front, into the read-only tables of `prepare_quiz`. Scoring reads
+    these and never writes to the quiz, the question index or the compiled
+    quiz, so one copy of a large bank can serve a thread pool (including
+    on free-threaded CPython builds) without locks or per-worker copies.
+
+    Like a `QuizBank`, it can be passed anywhere the analyzers take
+    `quiz_data`, without a question index or compiled quiz.
+    """
+
+    def __init__(self, quiz_data, question_index=None, compiled_quiz=None):
+
+        # Imported here because quiz_analysis itself scores shared quizzes.
+        from quiz_analysis import prepare_quiz
+
+        quiz_data = freeze(quiz_data)
+        self.quiz = quiz_data['quiz']
+        self.prepared_quiz = freeze_prepared_quiz(
+            prepare_quiz(quiz_data, question_index, compiled_quiz))
+        self.questions = self.prepared_quiz['questions']
+
+    def __len__(self):
+        return len(self.questions)
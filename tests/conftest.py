@@ -0,0 +1,90 @@
+# tests/conftest.py
+import json
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
+
+# A fixed stopword list, so results do not depend on whether (or which
+# version of) the NLTK corpus is installed.
+STOP_WORDS = ('a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+              'it', 'of', 'on', 'or', 'that', 'the', 'to', 'which', 'with')
+
+
+def without_questions(results):
+    """Analysis results with each question category reduced to its question ids."""
+
+    results = dict(results)
+    results['question_categories'] = {
+        category: [int(question['id']) for question in questions]
+        for category, questions in results['question_categories'].items()}
+
+    return results
+
+
+class _StopWords:
+
+    @staticmethod
+    def words(language):
+        return list(STOP_WORDS)
+
+
+@pytest.fixture(autouse=True, scope='session')
+def stop_words():
+
+    import nltk.corpus
+
+    import nlp_utils
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(nltk.corpus, 'stopwords', _StopWords)
+        nlp_utils.get_stop_words.cache_clear()
+        yield
+    nlp_utils.get_stop_words.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def isolated_cwd(tmp_path, monkeypatch):
+    # Indexes, compiled quizzes and stores default to the working directory.
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture(scope='session')
+def sample_quiz():
+
+    with open(os.path.join(REPO_DIR, 'current_test_data.txt'), 'r') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='session')
+def sample_submission():
+
+    with open(os.path.join(REPO_DIR, 'Quiz_submission_data.txt'), 'r') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='session')
+def sample_history():
+
+    with open(os.path.join(REPO_DIR, 'Performance_data.txt'), 'r') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='session')
+def synthetic_quiz():
+
+    from synthetic_data import generate_quiz
+
+    return generate_quiz(300, num_topics=6, seed=7)
+
+
+@pytest.fixture(scope='session')
+def synthetic_submissions(synthetic_quiz):
+
+    from synthetic_data import generate_submissions
+
+    return generate_submissions(synthetic_quiz, 40, seed=7)
@@ -0,0 +1,56 @@
+# tests/test_attempt_history.py
+from datetime import timezone
+
+import numpy as np
+import pytest
+
+import attempt_history
+from attempt_history import AttemptHistory
+from synthetic_data import generate_history
+from timestamps import parse_timestamp
+from topic_registry import canonical_topic
+
+
+def test_columns_and_sort_match_the_records(monkeypatch):
+
+    # Small batches and capacity, so timestamps are parsed across growth.
+    monkeypatch.setattr(attempt_history, 'TIMESTAMP_BATCH_SIZE', 5)
+    records = generate_history(50, num_topics=6, seed=11)
+    history = AttemptHistory(capacity=4)
+    for record in records:
+        history.append(record)
+
+    assert history.size == len(records)
+    assert history.user_id == records[0]['user_id']
+    assert history.scores.tolist() == [record['score'] for record in records]
+
+    history.sort_by_date()
+    oldest_first = sorted(records, key=lambda record: parse_timestamp(record['submitted_at']))
+    assert history.scores.tolist() == [record['score'] for record in oldest_first]
+    assert history.accuracies.tolist() == [
+        float(record['accuracy'].replace("%", "")) for record in oldest_first]
+    assert history.title_labels() == [record['quiz']['title'] for record in oldest_first]
+    assert [history.topics[code] for code in history.topic_codes.tolist()] == [
+        canonical_topic(record['quiz']['topic']) for record in oldest_first]
+    assert (np.diff(history.submitted_at.astype(np.int64)) >= 0).all()
+    # Submission times are stored in UTC.
+    assert history.submitted_at[0] == np.datetime64(parse_timestamp(
+        oldest_first[0]['submitted_at']).astimezone(timezone.utc).replace(tzinfo=None), 'ms')
+
+
+def test_topic_accuracy_in_first_attempt_order():
+
+    records = generate_history(50, num_topics=6, seed=11)
+    history = AttemptHistory.from_records(records)
+    history.sort_by_date()
+    oldest_first = sorted(records, key=lambda record: parse_timestamp(record['submitted_at']))
+
+    accuracies = {}
+    for record in oldest_first:
+        accuracies.setdefault(canonical_topic(record['quiz']['topic']), []).append(
+            float(record['accuracy'].replace("%", "")))
+
+    topic_accuracy = history.topic_accuracy()
+    assert list(topic_accuracy) == list(accuracies)
+    assert topic_accuracy == pytest.approx(
+        {topic: np.mean(values) for topic, values in accuracies.items()})
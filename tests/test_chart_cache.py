@@ -0,0 +1,55 @@
+# tests/test_chart_cache.py
+import os
+
+import numpy as np
+
+import chart_cache as chart_cache_module
+from chart_cache import ChartCache, chart_cache_key
+
+
+def test_key_follows_the_plotted_data():
+
+    key = chart_cache_key('bar', ['a', 'b'], np.array([1.0, 2.0]))
+
+    assert key == chart_cache_key('bar', ['a', 'b'], np.array([1.0, 2.0]))
+    assert key != chart_cache_key('bar', ['b', 'a'], np.array([1.0, 2.0]))
+    assert key != chart_cache_key('line', ['a', 'b'], np.array([1.0, 2.0]))
+
+
+def test_hits_misses_and_memory_eviction():
+
+    cache = ChartCache(max_entries=2)
+    assert cache.get('a') is None
+    cache.put('a', 'chart a')
+    cache.put('b', 'chart b')
+    assert cache.get('a') == 'chart a'
+    cache.put('c', 'chart c')
+
+    # 'b' was the least recently used.
+    assert cache.get('b') is None
+    assert cache.get('c') == 'chart c'
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_disk_tier_is_shared_and_pruned(tmp_path, monkeypatch):
+
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(chart_cache_module.os, 'scandir',
+                        lambda path: scans.append(path) or scandir(path))
+
+    writer = ChartCache(cache_dir=str(tmp_path), max_disk_bytes=1000)
+    for number in range(20):
+        path = tmp_path / f"{number:02}.b64"
+        writer.put(f"{number:02}", 'x' * 100)
+        os.utime(path, (number, number))
+
+    files = sorted(os.listdir(tmp_path))
+    assert sum(os.path.getsize(tmp_path / name) for name in files) <= 1000
+    # The most recently written charts are kept, and prunes do not scan on every write.
+    assert files[-1] == '19.b64'
+    assert len(scans) < 20
+
+    reader = ChartCache(cache_dir=str(tmp_path))
+    assert reader.get('19') == 'x' * 100
+    assert reader.get('00') is None
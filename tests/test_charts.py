@@ -0,0 +1,46 @@
+# tests/test_charts.py
+import base64
+from concurrent.futures import ThreadPoolExecutor
+
+from attempt_history import AttemptHistory
+from chart_cache import chart_cache
+from charts import render_charts, render_png
+from synthetic_data import generate_history
+
+
+def _chart_specs(seed):
+
+    history = AttemptHistory.from_records(generate_history(14, num_topics=6, seed=seed))
+    history.sort_by_date()
+
+    return [
+        ('bar', (history.title_labels(), history.scores)),
+        ('line', (history.submitted_at, history.accuracies)),
+        ('scatter', (history.scores, history.accuracies)),
+        ('topic', (history.topic_accuracy(),))
+    ]
+
+
+def test_concurrent_renders_match_sequential_ones():
+
+    chart_specs = [spec for seed in range(2) for spec in _chart_specs(seed)]
+    expected = [render_png(chart_type, chart_data) for chart_type, chart_data in chart_specs]
+
+    chart_cache.clear()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        charts = render_charts(chart_specs, executor)
+
+    assert charts == expected
+    assert all(base64.b64decode(chart).startswith(b'\x89PNG') for chart in charts)
+
+
+def test_rendered_charts_are_cached():
+
+    chart_specs = _chart_specs(7)
+    chart_cache.clear()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        charts = render_charts(chart_specs, executor)
+
+    hits = chart_cache.hits
+    assert render_charts(chart_specs) == charts
+    assert chart_cache.hits == hits + len(chart_specs)
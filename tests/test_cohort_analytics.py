@@ -0,0 +1,59 @@
+# tests/test_cohort_analytics.py
+import numpy as np
+import pytest
+
+from cohort_analytics import CohortAnalytics
+
+
+def _correct_matrix(quiz_data, quiz_submissions):
+    """Which questions each submission answered correctly, straight from the JSON."""
+
+    correct_options = [next(option['id'] for option in question['options'] if option['is_correct'])
+                       for question in quiz_data['quiz']['questions']]
+    question_ids = [str(question['id']) for question in quiz_data['quiz']['questions']]
+
+    return np.array([[submission['response_map'].get(question_id) == option_id
+                      for question_id, option_id in zip(question_ids, correct_options)]
+                     for submission in quiz_submissions], dtype=np.int64)
+
+
+def test_discrimination_matches_corrcoef_with_rest_score(synthetic_quiz, synthetic_submissions):
+
+    cohort = CohortAnalytics.from_quiz(synthetic_quiz)
+    cohort.add_stream(synthetic_submissions, chunk_size=7)
+    correct = _correct_matrix(synthetic_quiz, synthetic_submissions)
+    rest_scores = correct.sum(axis=1)[:, None] - correct
+
+    discrimination = cohort.discrimination()
+    for question in range(correct.shape[1]):
+        if correct[:, question].std() == 0 or rest_scores[:, question].std() == 0:
+            assert np.isnan(discrimination[question])
+        else:
+            expected = np.corrcoef(correct[:, question], rest_scores[:, question])[0, 1]
+            assert np.isclose(discrimination[question], expected)
+
+
+def test_p_values_and_percentiles(synthetic_quiz, synthetic_submissions):
+
+    cohort = CohortAnalytics.from_quiz(synthetic_quiz)
+    cohort.add_stream(synthetic_submissions, chunk_size=7)
+    correct = _correct_matrix(synthetic_quiz, synthetic_submissions)
+    scores = correct.sum(axis=1)
+
+    assert np.allclose(cohort.p_values(), correct.mean(axis=0))
+    for score in scores[:5].tolist():
+        assert cohort.percentile(score / correct.shape[1] * 100) == \
+            pytest.approx((scores < score).mean() * 100)
+
+
+def test_saved_statistics_load_back(synthetic_quiz, synthetic_submissions, tmp_path):
+
+    path = tmp_path / 'cohort_stats.npz'
+    cohort = CohortAnalytics.from_quiz(synthetic_quiz)
+    cohort.add_submissions(synthetic_submissions)
+    cohort.save(path)
+
+    loaded = CohortAnalytics.load(path)
+    assert loaded.submission_count == cohort.submission_count
+    assert np.allclose(loaded.discrimination(), cohort.discrimination(), equal_nan=True)
+    assert loaded.item_statistics() == cohort.item_statistics()
@@ -0,0 +1,52 @@
+# tests/test_difficulty_model.py
+import numpy as np
+
+from difficulty_model import (DifficultyModel, difficulty_model_fingerprint, labels_from_correct_rates,
+                              predict_difficulty_levels, question_text)
+from nlp_utils import predict_difficulty_level
+
+
+def _training_set(quiz_data):
+
+    questions = quiz_data['quiz']['questions']
+    texts = [question_text(question) for question in questions]
+    labels = [predict_difficulty_level(question['description'], question['detailed_solution'])
+              for question in questions]
+
+    return questions, texts, labels
+
+
+def test_model_round_trips(synthetic_quiz, tmp_path):
+
+    path = tmp_path / 'difficulty_model.npz'
+    questions, texts, labels = _training_set(synthetic_quiz)
+    model = DifficultyModel.fit(texts, labels)
+    model.save(path)
+
+    loaded = DifficultyModel.load(path)
+    assert loaded.labels == model.labels
+    assert loaded.vocabulary == model.vocabulary
+    assert np.array_equal(loaded.weights, model.weights)
+    assert loaded.predict(texts) == model.predict(texts)
+    # The fitted model learns the heuristic it was trained on.
+    assert np.mean(np.array(model.predict(texts)) == np.array(labels)) > 0.9
+
+    assert predict_difficulty_levels(questions, path) == model.predict(texts)
+    assert loaded.fingerprint is not None
+    assert difficulty_model_fingerprint(path) == loaded.fingerprint
+
+
+def test_heuristic_is_used_without_a_model(synthetic_quiz, tmp_path):
+
+    questions, _, labels = _training_set(synthetic_quiz)
+    path = tmp_path / 'missing.npz'
+
+    assert predict_difficulty_levels(questions, path) == labels
+    assert difficulty_model_fingerprint(path) is None
+    assert DifficultyModel([], [], np.zeros((1, 1)), [0], ['Easy']).predict([]) == []
+
+
+def test_labels_from_correct_rates():
+
+    assert labels_from_correct_rates([1.0, 0.7, 0.69, 0.4, 0.39, 0.0]) == \
+        ['Easy', 'Easy', 'Medium', 'Medium', 'Hard', 'Hard']
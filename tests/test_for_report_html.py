@@ -0,0 +1,24 @@
+# tests/test_for_report_html.py
+from cohort_analytics import CohortAnalytics, add_cohort_percentiles
+from for_report_html import generate_html_report
+from quiz_analysis import analyze_quiz_data_advanced
+
+
+def test_report_shows_cohort_topic_percentiles(synthetic_quiz, synthetic_submissions):
+
+    cohort = CohortAnalytics.from_quiz(synthetic_quiz)
+    cohort.add_submissions(synthetic_submissions)
+    analysis_results = add_cohort_percentiles(
+        analyze_quiz_data_advanced(synthetic_quiz, synthetic_submissions[0]), cohort)
+
+    html = generate_html_report(analysis_results)
+    assert "Cohort Topic Percentiles" in html
+    for topic, percentile in analysis_results['topic_percentiles'].items():
+        assert f"<li>{topic}: {percentile:.1f}% of the cohort scored lower</li>" in html
+
+
+def test_report_without_cohort_has_no_percentiles(sample_quiz, sample_submission):
+
+    html = generate_html_report(analyze_quiz_data_advanced(sample_quiz, sample_submission))
+    assert "Cohort Topic Percentiles" not in html
+    assert "Cohort Percentile" not in html
@@ -0,0 +1,49 @@
+# tests/test_history_stream.py
+import json
+import sys
+
+import pytest
+
+from history_stream import iter_history_records
+
+
+@pytest.fixture
+def without_ijson(monkeypatch):
+    # A None entry makes `import ijson` raise ImportError.
+    monkeypatch.setitem(sys.modules, 'ijson', None)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096])
+def test_fallback_parser_reads_records_across_chunk_boundaries(
+        sample_history, tmp_path, without_ijson, chunk_size):
+
+    path = tmp_path / 'history.json'
+    path.write_text("  \n" + json.dumps(sample_history, indent=2) + "\n")
+
+    assert list(iter_history_records(path, chunk_size)) == sample_history
+
+
+@pytest.mark.parametrize('text', ["", "  \n", "[]", " [ \n ] "])
+def test_empty_exports_have_no_records(tmp_path, without_ijson, text):
+
+    path = tmp_path / 'history.json'
+    path.write_text(text)
+
+    assert list(iter_history_records(path, chunk_size=2)) == []
+
+
+def test_truncated_array_is_an_error(sample_history, tmp_path, without_ijson):
+
+    path = tmp_path / 'history.json'
+    path.write_text(json.dumps(sample_history)[:-40])
+
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_history_records(path, chunk_size=64))
+
+
+def test_ndjson_skips_blank_lines(sample_history, tmp_path):
+
+    path = tmp_path / 'history.ndjson'
+    path.write_text("\n".join(json.dumps(record) for record in sample_history) + "\n\n")
+
+    assert list(iter_history_records(path)) == sample_history
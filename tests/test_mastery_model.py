@@ -0,0 +1,100 @@
+# tests/test_mastery_model.py
+import numpy as np
+import pytest
+
+from mastery_model import MasteryModel, load_mastery_model
+from synthetic_data import generate_history
+
+
+def _mastery(model, approx=False):
+
+    return {user_id: pytest.approx(model.topic_mastery(user_id)) if approx
+            else model.topic_mastery(user_id) for user_id in model.user_ids}
+
+
+def test_submission_batch_replays_like_one_at_a_time(synthetic_quiz, synthetic_submissions):
+
+    # Eight students with five submissions each, so a batch takes several rounds.
+    submissions = [dict(submission, user_id=f"user-{number % 8}")
+                   for number, submission in enumerate(synthetic_submissions)]
+
+    batch = MasteryModel()
+    assert batch.record_submissions(synthetic_quiz, submissions) == len(submissions)
+
+    sequential = MasteryModel()
+    for submission in sorted(submissions, key=lambda submission: submission['submitted_at']):
+        assert sequential.record_submissions(synthetic_quiz, [submission]) == 1
+
+    assert _mastery(batch) == _mastery(sequential, approx=True)
+    assert sorted(batch.topics) == sorted(sequential.topics)
+
+
+def test_history_batch_replays_like_one_at_a_time():
+
+    records = [record for user in range(5)
+               for record in generate_history(30, num_topics=6, seed=user, user_id=f"user-{user}")]
+
+    batch = MasteryModel()
+    assert batch.record_history(records) == len(records)
+
+    sequential = MasteryModel()
+    for record in sorted(records, key=lambda record: record['submitted_at']):
+        sequential.record_history([record])
+
+    assert _mastery(batch) == _mastery(sequential, approx=True)
+
+
+def test_replaying_an_overlapping_export_only_adds_new_attempts():
+
+    records = generate_history(30, num_topics=6, seed=3)
+    oldest_first = records[::-1]
+
+    model = MasteryModel()
+    model.record_history(oldest_first[:20])
+    assert model.record_history(oldest_first) == 10
+
+    replayed = MasteryModel()
+    replayed.record_history(oldest_first)
+    assert _mastery(model) == _mastery(replayed, approx=True)
+
+
+def test_older_export_after_newer_one_is_recorded():
+
+    oldest_first = generate_history(30, num_topics=6, seed=3)[::-1]
+
+    model = MasteryModel()
+    assert model.record_history(oldest_first[20:]) == 10
+    # Older attempts, and a newer attempt on one topic, hide nothing.
+    assert model.record_history(oldest_first[:20]) == 20
+    assert model.record_history(oldest_first) == 0
+    assert model.attempts.sum() == sum(
+        record['correct_answers'] + record['incorrect_answers'] > 0 for record in oldest_first)
+
+
+def test_recorded_attempts_survive_save_and_load(tmp_path):
+
+    path = tmp_path / 'mastery_state.npz'
+    records = generate_history(30, num_topics=6, seed=3)
+
+    model = MasteryModel()
+    model.record_history(records[:10])
+    model.save(path)
+
+    loaded = load_mastery_model(path)
+    assert loaded.record_history(records) == 20
+    assert loaded.record_history(records) == 0
+
+
+def test_legacy_state_skips_attempts_up_to_its_watermark(tmp_path):
+
+    path = tmp_path / 'mastery_state.npz'
+    oldest_first = generate_history(30, num_topics=6, seed=3)[::-1]
+
+    model = MasteryModel()
+    model.record_history(oldest_first[:10])
+    # States saved before attempts were recorded by id have no recorded_attempts.
+    np.savez(path, user_ids=np.asarray(model.user_ids, dtype=str),
+             topics=np.asarray(model.topics, dtype=str), ratings=model.ratings,
+             attempts=model.attempts, last_submitted_at=model.last_submitted_at)
+
+    assert load_mastery_model(path).record_history(oldest_first) == 20
@@ -0,0 +1,100 @@
+# tests/test_performance_store.py
+import sqlite3
+
+import pytest
+
+from attempt_history import AttemptHistory
+from batch_reports import generate_reports
+from performance_store import SCHEMA_VERSION, PerformanceStore, submission_attempt
+from Performance_analyzer import summarize_history
+from synthetic_data import generate_history
+
+# The schema of stores written before topics were canonical.
+UNVERSIONED_SCHEMA = """
+CREATE TABLE recorded_attempts (attempt_id TEXT PRIMARY KEY, user_id TEXT NOT NULL);
+CREATE TABLE user_aggregates (
+    user_id TEXT PRIMARY KEY, attempt_count INTEGER NOT NULL, score_sum REAL NOT NULL,
+    highest_score REAL NOT NULL, lowest_score REAL NOT NULL, accuracy_sum REAL NOT NULL);
+CREATE TABLE topic_aggregates (
+    user_id TEXT NOT NULL, topic TEXT NOT NULL, attempt_count INTEGER NOT NULL,
+    accuracy_sum REAL NOT NULL, first_submitted_at INTEGER NOT NULL,
+    PRIMARY KEY (user_id, topic));
+"""
+
+
+def test_unversioned_store_is_migrated(tmp_path):
+
+    path = tmp_path / 'store.sqlite3'
+    connection = sqlite3.connect(path)
+    connection.executescript(UNVERSIONED_SCHEMA)
+    connection.execute("INSERT INTO user_aggregates VALUES ('u1', 5, 500, 150, 50, 350)")
+    connection.executemany("INSERT INTO topic_aggregates VALUES (?, ?, ?, ?, ?)", [
+        ('u1', 'reproductive health ', 2, 100.0, 300),
+        ('u1', 'Reproductive Health', 1, 80.0, 100),
+        ('u1', 'Body Fluids and Circulation ', 1, 70.0, 200),
+        ('u1', 'Body Fluids and Circulation', 1, 100.0, 400),
+        ('u2', 'reproductive health', 1, 10.0, 50)
+    ])
+    connection.commit()
+    connection.close()
+
+    with PerformanceStore(path) as store:
+        topic_insights = store.summary('u1')['topic_insights']
+        assert topic_insights == {'Reproductive Health': pytest.approx(60.0),
+                                  'Body Fluids and Circulation': pytest.approx(85.0)}
+        assert store.connection.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        first_submitted_at = dict(store.connection.execute(
+            "SELECT topic, first_submitted_at FROM topic_aggregates WHERE user_id = 'u1'"))
+        assert first_submitted_at == {'Reproductive Health': 100,
+                                      'Body Fluids and Circulation': 200}
+
+        # New attempts land in the migrated row.
+        store.record_attempt({'id': 1, 'user_id': 'u1', 'score': 100, 'accuracy': '90 %',
+                              'submitted_at': '2024-01-01T00:00:00.000+05:30',
+                              'quiz': {'topic': 'REPRODUCTIVE HEALTH'}})
+        assert store.summary('u1')['topic_insights']['Reproductive Health'] == pytest.approx(67.5)
+
+
+@pytest.mark.parametrize('history_name', ['sample_history', 'synthetic_history'])
+def test_summary_matches_summarize_history(history_name, request, tmp_path):
+
+    if history_name == 'sample_history':
+        records = request.getfixturevalue('sample_history')
+    else:
+        records = generate_history(200, num_topics=8, seed=5)
+    history = AttemptHistory.from_records(records)
+    history.sort_by_date()
+    expected = summarize_history(history)
+
+    with PerformanceStore(tmp_path / 'store.sqlite3') as store:
+        for record in records:
+            store.record_attempt(record)
+        # Replaying the same records adds nothing.
+        assert not any(store.record_attempt(record) for record in records)
+        summary = store.summary(history.user_id)
+
+    assert summary['attempt_count'] == expected['attempt_count']
+    for name in ('average_score', 'highest_score', 'lowest_score', 'average_accuracy'):
+        assert summary[name] == pytest.approx(expected[name])
+    assert list(summary['topic_insights']) == list(expected['topic_insights'])
+    assert summary['topic_insights'] == pytest.approx(expected['topic_insights'])
+
+
+def test_submissions_are_recorded_once_as_scored(synthetic_quiz, synthetic_submissions, tmp_path):
+
+    path = tmp_path / 'store.sqlite3'
+    for _ in range(2):
+        generate_reports(synthetic_quiz, synthetic_submissions, tmp_path / 'reports',
+                         workers=2, chunk_size=7, threads=True, store_path=path)
+
+    with PerformanceStore(path) as store:
+        for submission in synthetic_submissions:
+            summary = store.summary(submission['user_id'])
+            assert summary['attempt_count'] == 1
+            assert summary['average_score'] == submission['score']
+            assert summary['topic_insights'] == {
+                'Structural Organisation in Animals':
+                    pytest.approx(float(submission['accuracy'].replace("%", "")))}
+
+        # Submissions without an id cannot be recorded once, so are not recorded.
+        assert submission_attempt(dict(synthetic_submissions[0], id=None), synthetic_quiz) is None
@@ -0,0 +1,56 @@
+# tests/test_pipeline_timing.py
+import pytest
+
+from batch_reports import generate_reports
+from pipeline_timing import StageTimings, pipeline_timings
+
+
+@pytest.fixture
+def enabled_timings(monkeypatch):
+
+    monkeypatch.setattr(pipeline_timings, 'enabled', True)
+    pipeline_timings.drain()
+    yield pipeline_timings
+    pipeline_timings.drain()
+
+
+def test_merged_timings_equal_timings_recorded_in_one_process():
+
+    durations = {'json_load': [0.5, 0.25, 2.0], 'html_build': [1.0], 'aggregation': [0.75, 3.0]}
+    combined = StageTimings(enabled=True)
+    parent = StageTimings(enabled=True)
+    workers = [StageTimings(enabled=True) for _ in range(2)]
+    for number, (name, seconds) in enumerate(
+            (name, seconds) for name, values in durations.items() for seconds in values):
+        combined.record(name, seconds)
+        workers[number % 2].record(name, seconds)
+
+    for worker in workers:
+        parent.merge(worker.drain())
+        assert worker.summary() == {}
+
+    assert parent.summary() == combined.summary()
+    assert parent.summary()['aggregation'] == {'count': 2, 'total_seconds': 3.75,
+                                               'max_seconds': 3.0}
+
+
+def test_disabled_timings_record_nothing():
+
+    timings = StageTimings()
+    with timings.stage('html_build'):
+        pass
+
+    assert timings.stage('json_load') is timings.stage('html_build')
+    assert timings.summary() == {}
+
+
+def test_worker_timings_are_merged_into_the_parent(enabled_timings, synthetic_quiz,
+                                                   synthetic_submissions, tmp_path):
+
+    generate_reports(synthetic_quiz, synthetic_submissions, tmp_path / 'reports',
+                     workers=2, chunk_size=5)
+
+    stages = enabled_timings.summary()
+    assert stages['batch_scoring']['count'] == len(synthetic_submissions) // 5
+    assert stages['html_build']['count'] == len(synthetic_submissions)
+    assert stages['html_build']['max_seconds'] <= stages['html_build']['total_seconds']
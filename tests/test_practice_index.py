@@ -0,0 +1,104 @@
+# tests/test_practice_index.py
+import pickle
+
+import numpy as np
+import pytest
+
+from for_report_html import generate_html_report
+from practice_index import PracticeIndex, recommend_practice_questions, write_practice_index
+from quiz_analysis import analyze_quiz_data_advanced
+from synthetic_data import generate_quiz
+from topic_registry import canonical_topic
+
+
+def _dense_vectors(practice_index):
+
+    vectors = np.zeros((len(practice_index), len(practice_index.vocabulary)))
+    for position in range(len(practice_index)):
+        start, end = practice_index.row_offsets[position:position + 2]
+        vectors[position, practice_index.row_terms[start:end]] = \
+            practice_index.row_weights[start:end]
+
+    return vectors
+
+
+def test_index_round_trips(synthetic_quiz, tmp_path):
+
+    path = tmp_path / 'practice_index.bin'
+    questions = synthetic_quiz['quiz']['questions']
+    write_practice_index(questions, path)
+
+    with PracticeIndex(path) as practice_index:
+        assert len(practice_index) == len(questions)
+        assert practice_index.question_ids.tolist() == [question['id'] for question in questions]
+        for position, question in enumerate(questions):
+            assert practice_index.description(position) == question['description']
+            assert practice_index.topics[practice_index.question_topics[position]] == \
+                canonical_topic(question['topic'])
+
+        vectors = _dense_vectors(practice_index)
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1, atol=1e-6)
+
+        pickled = pickle.loads(pickle.dumps(practice_index))
+        assert pickled.question_ids.tolist() == practice_index.question_ids.tolist()
+        pickled.close()
+
+
+def test_similar_matches_brute_force(synthetic_quiz, tmp_path):
+
+    path = tmp_path / 'practice_index.bin'
+    questions = synthetic_quiz['quiz']['questions']
+    write_practice_index(questions, path)
+
+    with PracticeIndex(path) as practice_index:
+        vectors = _dense_vectors(practice_index)
+        for position in (0, 17, len(questions) - 1):
+            question_id = questions[position]['id']
+            practice = practice_index.similar(
+                practice_index.question_vector([question_id]), 10, [question_id])
+
+            scores = vectors @ vectors[position]
+            scores[position] = 0
+            expected = np.sort(scores)[::-1][:10]
+            assert [item['similarity'] for item in practice] == pytest.approx(expected, abs=1e-5)
+            assert question_id not in [item['id'] for item in practice]
+
+
+def test_index_closes_after_recommending(synthetic_quiz, synthetic_submissions, tmp_path):
+
+    # The quiz's own questions are never recommended, so index another quiz with it.
+    other_quiz = generate_quiz(200, num_topics=6, seed=8, quiz_id=2,
+                               first_question_id=100001, first_option_id=1000001)
+    path = tmp_path / 'practice_index.bin'
+    write_practice_index(synthetic_quiz['quiz']['questions'] +
+                         other_quiz['quiz']['questions'], path)
+    analysis_results = analyze_quiz_data_advanced(synthetic_quiz, synthetic_submissions[0])
+
+    with PracticeIndex(path) as practice_index:
+        recommend_practice_questions(practice_index, analysis_results, k=3)
+
+    practice_questions = analysis_results['practice_questions']
+    assert practice_questions['by_question']
+    for item in practice_questions['by_question']:
+        assert len(item['practice']) <= 3
+        assert all(question['id'] > 100000 for question in item['practice'])
+        assert all(isinstance(question['description'], str) for question in item['practice'])
+
+
+def test_report_shows_practice_only_when_there_is_some(synthetic_quiz, synthetic_submissions, tmp_path):
+
+    path = tmp_path / 'practice_index.bin'
+    write_practice_index(synthetic_quiz['quiz']['questions'], path)
+    analysis_results = analyze_quiz_data_advanced(synthetic_quiz, synthetic_submissions[0])
+
+    with PracticeIndex(path) as practice_index:
+        recommend_practice_questions(practice_index, analysis_results)
+
+    assert analysis_results['practice_questions'] == {'by_question': [], 'by_topic': {}}
+    assert "Practice Questions" not in generate_html_report(analysis_results)
+
+    analysis_results['practice_questions']['by_topic'] = {
+        'Cell Cycle': [{'id': 7, 'description': "Which phase follows prophase?"}]}
+    html = generate_html_report(analysis_results)
+    assert "Practice Questions" in html
+    assert "<li>Cell Cycle<ul><li>#7: Which phase follows prophase?...</li></ul></li>" in html
@@ -0,0 +1,42 @@
+# tests/test_quiz_analysis.py
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import without_questions
+from question_index import build_question_index
+from quiz_analysis import analyze_quiz_data_advanced, analyze_quiz_submissions_batch
+from shared_quiz import SharedQuiz
+
+
+def test_batch_scores_like_one_at_a_time(synthetic_quiz, synthetic_submissions):
+
+    question_index = build_question_index(synthetic_quiz)
+    expected = [without_questions(analyze_quiz_data_advanced(
+        synthetic_quiz, submission, question_index)) for submission in synthetic_submissions]
+
+    results = analyze_quiz_submissions_batch(synthetic_quiz, synthetic_submissions, question_index)
+    assert [without_questions(result) for result in results] == expected
+
+
+def test_sample_submission_scores_like_the_batch(sample_quiz, sample_submission):
+
+    expected = without_questions(analyze_quiz_data_advanced(sample_quiz, sample_submission))
+    [result] = analyze_quiz_submissions_batch(sample_quiz, [sample_submission])
+
+    assert without_questions(result) == expected
+
+
+def test_shared_quiz_scores_like_the_quiz(synthetic_quiz, synthetic_submissions):
+
+    question_index = build_question_index(synthetic_quiz)
+    expected = [without_questions(analyze_quiz_data_advanced(
+        synthetic_quiz, submission, question_index)) for submission in synthetic_submissions]
+    shared_quiz = SharedQuiz(synthetic_quiz, question_index)
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(
+            lambda submission: analyze_quiz_data_advanced(shared_quiz, submission),
+            synthetic_submissions))
+    assert [without_questions(result) for result in results] == expected
+
+    results = analyze_quiz_submissions_batch(shared_quiz, synthetic_submissions)
+    assert [without_questions(result) for result in results] == expected
@@ -0,0 +1,73 @@
+# tests/test_quiz_bank.py
+import json
+import os
+
+import numpy as np
+
+from conftest import without_questions
+from question_index import build_question_index
+from quiz_analysis import analyze_quiz_data_advanced, analyze_quiz_submissions_batch
+from quiz_bank import QuizBank, load_quiz_bank, write_quiz_bank
+import topic_registry
+
+
+def test_bank_round_trips(synthetic_quiz, tmp_path):
+
+    path = tmp_path / 'quiz_bank.bin'
+    write_quiz_bank(synthetic_quiz, path)
+    questions = synthetic_quiz['quiz']['questions']
+
+    with QuizBank(path) as bank:
+        assert len(bank) == len(questions)
+        assert bank.question_ids.tolist() == [question['id'] for question in questions]
+        assert bank.option_correct.tolist() == [
+            option['is_correct'] for question in questions for option in question['options']]
+        for position in (0, len(questions) // 2, len(questions) - 1):
+            assert bank.questions[position]['description'] == questions[position]['description']
+            assert bank.questions[position]['topic'] == questions[position]['topic']
+
+
+def test_bank_scores_like_the_quiz(synthetic_quiz, synthetic_submissions, tmp_path):
+
+    path = tmp_path / 'quiz_bank.bin'
+    question_index = build_question_index(synthetic_quiz)
+    write_quiz_bank(synthetic_quiz, path, question_index)
+    expected = [without_questions(analyze_quiz_data_advanced(
+        synthetic_quiz, submission, question_index)) for submission in synthetic_submissions]
+
+    with QuizBank(path) as bank:
+        results = analyze_quiz_submissions_batch(bank, synthetic_submissions)
+        assert [without_questions(result) for result in results] == expected
+
+
+def test_bank_closes_after_scoring(sample_quiz, sample_submission, tmp_path):
+
+    path = tmp_path / 'quiz_bank.bin'
+    write_quiz_bank(sample_quiz, path)
+
+    with QuizBank(path) as bank:
+        analyze_quiz_data_advanced(bank, sample_submission)
+        prepared_quiz = bank.prepared_quiz
+
+    # Tables handed out before closing stay readable afterwards.
+    assert np.isfinite(prepared_quiz['confusingness']).all()
+
+
+def test_bank_is_rebuilt_when_the_topic_aliases_change(synthetic_quiz, tmp_path, monkeypatch):
+
+    quiz_path = tmp_path / 'quiz.json'
+    bank_path = tmp_path / 'quiz_bank.bin'
+    quiz_path.write_text(json.dumps(synthetic_quiz))
+    topic = synthetic_quiz['quiz']['questions'][0]['topic']
+
+    with load_quiz_bank(quiz_path, bank_path, tmp_path / 'question_index.json') as bank:
+        assert 'Renamed Topic' not in bank.topics
+    written_at = os.stat(bank_path).st_mtime_ns
+
+    with load_quiz_bank(quiz_path, bank_path, tmp_path / 'question_index.json'):
+        assert os.stat(bank_path).st_mtime_ns == written_at
+
+    aliases = {topic_registry.normalize_topic(topic): 'Renamed Topic'}
+    monkeypatch.setattr(topic_registry, 'load_topic_aliases', lambda path=None: aliases)
+    with load_quiz_bank(quiz_path, bank_path, tmp_path / 'question_index.json') as bank:
+        assert 'Renamed Topic' in bank.topics
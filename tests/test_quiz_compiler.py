@@ -0,0 +1,77 @@
+# tests/test_quiz_compiler.py
+import copy
+
+import numpy as np
+
+from quiz_compiler import compile_quiz, id_keys, load_compiled_quiz, read_compiled_quiz, write_compiled_quiz
+
+COMPILED_FIELDS = ('question_ids', 'question_positions', 'option_codes', 'correct_options',
+                   'option_questions', 'topic_codes')
+
+
+def _dict_path_is_correct(question, selected_option_id):
+    """The answer check the compiled tables replace: a scan of the options by string id."""
+
+    for option in question['options']:
+        if str(option['id']) == str(selected_option_id):
+            return bool(option['is_correct'])
+
+    return False
+
+
+def _mixed_quiz(synthetic_quiz):
+    """The synthetic quiz with string ids and a question with two correct options."""
+
+    quiz_data = copy.deepcopy(synthetic_quiz)
+    questions = quiz_data['quiz']['questions']
+    for question in questions[::3]:
+        question['id'] = str(question['id'])
+        for option in question['options']:
+            option['id'] = str(option['id'])
+    for option in questions[1]['options'][:2]:
+        option['is_correct'] = True
+
+    return quiz_data
+
+
+def test_compiled_lookups_match_the_dict_path(synthetic_quiz):
+
+    quiz_data = _mixed_quiz(synthetic_quiz)
+    compiled_quiz = compile_quiz(quiz_data)
+    questions = quiz_data['quiz']['questions']
+    other_option_id = questions[-1]['options'][0]['id']
+
+    for position, question in enumerate(questions):
+        for key in id_keys(question['id']):
+            assert compiled_quiz['question_positions'][key] == position
+
+        correct_options = compiled_quiz['correct_options'][position]
+        answers = [option['id'] for option in question['options']] + [other_option_id, 'missing']
+        for answer in answers:
+            for key in id_keys(answer):
+                assert (key in correct_options) == _dict_path_is_correct(question, key)
+                if _dict_path_is_correct(question, key):
+                    assert compiled_quiz['option_questions'][key] == str(question['id'])
+
+
+def test_compiled_quiz_round_trips_and_recompiles_on_change(synthetic_quiz, tmp_path):
+
+    path = tmp_path / 'compiled_quiz.json'
+    quiz_data = _mixed_quiz(synthetic_quiz)
+    compiled_quiz = compile_quiz(quiz_data)
+    write_compiled_quiz(compiled_quiz, path)
+
+    loaded = read_compiled_quiz(path)
+    for field in COMPILED_FIELDS:
+        assert loaded[field] == compiled_quiz[field]
+    assert np.array_equal(loaded['question_topics'], compiled_quiz['question_topics'])
+
+    changed = copy.deepcopy(quiz_data)
+    question = changed['quiz']['questions'][0]
+    question['updated_at'] = '2023-01-01T00:00:00.000+05:30'
+    for option in question['options']:
+        option['is_correct'] = not option['is_correct']
+
+    recompiled = load_compiled_quiz(changed, path)
+    assert recompiled['correct_options'][0] != compiled_quiz['correct_options'][0]
+    assert read_compiled_quiz(path)['correct_options'] == recompiled['correct_options']
@@ -0,0 +1,88 @@
+# tests/test_quiz_generator.py
+import numpy as np
+import pytest
+
+from quiz_analysis import analyze_quiz_data_advanced
+from quiz_generator import WEAK_TOPIC_BOOST, QuestionBuckets, generate_next_quiz
+from topic_registry import topic_key
+
+
+@pytest.fixture(scope='module')
+def question_buckets(synthetic_quiz):
+
+    return QuestionBuckets(synthetic_quiz)
+
+
+def _bucket_of(question_buckets, position):
+
+    return int(question_buckets.question_topics[position]) * len(question_buckets.difficulties) + \
+        int(question_buckets.question_difficulties[position])
+
+
+def test_questions_answered_in_the_history_are_never_drawn(question_buckets, synthetic_quiz,
+                                                           synthetic_submissions):
+
+    # Earlier submissions answering 40 questions each, in different parts of the bank.
+    history = [dict(submission, response_map=dict(list(submission['response_map'].items())
+                                                  [number * 50:number * 50 + 40]))
+               for number, submission in enumerate(synthetic_submissions[:5])]
+    seen_ids = {str(question_id) for submission in history for question_id in submission['response_map']}
+    unseen_ids = {question['id'] for question in synthetic_quiz['quiz']['questions']
+                  if str(question['id']) not in seen_ids}
+    analysis_results = analyze_quiz_data_advanced(synthetic_quiz, history[0])
+
+    rng = np.random.default_rng(1)
+    for k in (10, len(unseen_ids) // 2):
+        questions = generate_next_quiz(question_buckets, analysis_results, history, k, rng)
+        ids = [question['id'] for question in questions]
+        assert len(ids) == k == len(set(ids))
+        assert set(ids) <= unseen_ids
+
+    # Asking for the whole bank returns every unseen question exactly once.
+    questions = generate_next_quiz(question_buckets, analysis_results, iter(history),
+                                   len(synthetic_quiz['quiz']['questions']), rng)
+    assert sorted(question['id'] for question in questions) == sorted(unseen_ids)
+
+
+def test_topic_shares_follow_only_the_topic_weights(question_buckets):
+
+    weak_topics = [{'topic': question_buckets.topics[0].upper(), 'accuracy': 25.0}]
+    difficulty_analysis = [{'difficulty': difficulty, 'accuracy': 100.0 * code / 2}
+                           for code, difficulty in enumerate(question_buckets.difficulties)]
+    weights = question_buckets.bucket_weights(weak_topics, difficulty_analysis)
+
+    topic_shares = weights.reshape(len(question_buckets.topics), -1).sum(axis=1)
+    expected = np.ones(len(question_buckets.topics))
+    expected[0] = 1 + WEAK_TOPIC_BOOST * 0.75
+    assert topic_shares == pytest.approx(expected)
+    assert np.all(weights[question_buckets.bucket_sizes == 0] == 0)
+    assert topic_key(weak_topics[0]['topic']) == topic_key(question_buckets.topics[0])
+
+
+def test_buckets_are_drawn_in_proportion_to_their_weights(question_buckets):
+
+    rng = np.random.default_rng(2)
+    # Only buckets too large to run out within one quiz, so draws are not topped up elsewhere.
+    weights = np.where(question_buckets.bucket_sizes >= 20,
+                       np.arange(len(question_buckets.bucket_sizes)) % 4 + 1.0, 0)
+    counts = np.zeros(len(weights))
+    for _ in range(400):
+        for position in question_buckets.sample(10, weights, rng=rng):
+            counts[_bucket_of(question_buckets, position)] += 1
+
+    assert counts / counts.sum() == pytest.approx(weights / weights.sum(), abs=0.015)
+
+
+def test_exhausted_buckets_are_topped_up_from_the_others(question_buckets):
+
+    sizes = question_buckets.bucket_sizes
+    favoured, other = np.argsort(sizes)[-2:]
+    weights = np.zeros(len(sizes))
+    weights[favoured] = 1000.0
+    weights[other] = 1.0
+
+    positions = question_buckets.sample(int(sizes[favoured]) + 5, weights, rng=np.random.default_rng(3))
+    buckets = [_bucket_of(question_buckets, position) for position in positions]
+    assert len(set(positions)) == len(positions)
+    assert buckets.count(favoured) == sizes[favoured]
+    assert buckets.count(other) == 5
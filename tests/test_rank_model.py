@@ -0,0 +1,55 @@
+# tests/test_rank_model.py
+import numpy as np
+import pytest
+
+from rank_model import RankModel, get_rank_model, predict_neet_rank, predict_neet_ranks
+
+
+def _nearest_cutoff_ranks(model, accuracies):
+    """The original lookup: the rank of the table score nearest each prediction."""
+
+    predicted_scores = np.asarray(accuracies, dtype=np.float64) / 100 * model.max_score
+    nearest = np.argmin(np.abs(model.scores[None, :] - predicted_scores[:, None]), axis=1)
+
+    return model.ranks[nearest]
+
+
+def test_ranks_match_the_lookup_at_every_cutoff():
+
+    model = get_rank_model()
+    accuracies = model.scores / model.max_score * 100
+
+    assert np.array_equal(model.predict_ranks(accuracies),
+                          _nearest_cutoff_ranks(model, accuracies))
+
+
+def test_ranks_between_cutoffs_lie_between_the_neighbouring_cutoffs():
+
+    model = get_rank_model()
+    accuracies = np.linspace(0, 100, 2001)
+    ranks = model.predict_ranks(accuracies)
+    nearest = _nearest_cutoff_ranks(model, accuracies)
+
+    scores = list(model.scores)
+    for accuracy, rank, nearest_rank in zip(accuracies, ranks, nearest):
+        score = min(max(accuracy / 100 * model.max_score, scores[0]), scores[-1])
+        upper = next(i for i, cutoff in enumerate(scores) if cutoff >= score)
+        lower = max(upper - 1, 0)
+        # Never better than the higher cutoff nor worse than the lower one,
+        # and never further from the lookup than the gap between them.
+        assert model.ranks[upper] <= rank <= model.ranks[lower]
+        assert abs(rank - nearest_rank) <= model.ranks[lower] - model.ranks[upper]
+
+    assert np.all(np.diff(ranks) <= 0)
+    assert predict_neet_rank(accuracies[1000]) == ranks[1000]
+    assert np.array_equal(predict_neet_ranks(accuracies), ranks)
+
+
+def test_invalid_tables_are_rejected():
+
+    with pytest.raises(ValueError):
+        RankModel([100], [1000])
+    with pytest.raises(ValueError):
+        RankModel([100, 100], [1000, 500])
+    with pytest.raises(ValueError):
+        RankModel([100, 200], [500, 1000])
@@ -0,0 +1,53 @@
+# tests/test_report_renderer.py
+import base64
+import io
+
+import pytest
+
+from report_renderer import WRITE_CHUNK_SIZE, chart_source, compile_template, stream_items
+
+TEMPLATE = compile_template(
+    "<h1>{name}</h1><p>{{literal}} {accuracy:.2f}% {persona[kind]!r}</p>"
+    "<ul>{items}</ul><img src=\"{chart}\">{tail}")
+
+
+class RecordingWriter(io.StringIO):
+
+    def __init__(self):
+        super().__init__()
+        self.sizes = []
+
+    def write(self, text):
+        self.sizes.append(len(text))
+        return super().write(text)
+
+
+def _context(chart):
+
+    return {
+        'name': 'Report', 'accuracy': 71.256, 'persona': {'kind': 'steady'},
+        'items': stream_items("<li>{topic}</li>", [{'topic': f"Topic {n}"} for n in range(200)]),
+        'chart': chart_source(chart), 'tail': 'x' * 100,
+    }
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096, WRITE_CHUNK_SIZE])
+def test_streamed_output_matches_the_full_render(chunk_size):
+
+    chart = base64.b64encode(bytes(range(256)) * 1024).decode('ascii')
+    expected = TEMPLATE.render(_context(chart))
+    assert expected.count(chart) == 1
+
+    out = RecordingWriter()
+    TEMPLATE.render_to(_context(chart), out, chunk_size=chunk_size)
+    assert out.getvalue() == expected
+
+
+def test_large_values_are_written_in_bounded_slices():
+
+    chart = base64.b64encode(bytes(range(256)) * 4096).decode('ascii')
+    out = RecordingWriter()
+    TEMPLATE.render_to(_context(chart), out)
+
+    assert len(chart) > 4 * WRITE_CHUNK_SIZE
+    assert max(out.sizes) <= 2 * WRITE_CHUNK_SIZE
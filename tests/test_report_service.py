@@ -0,0 +1,129 @@
+# tests/test_report_service.py
+import asyncio
+import json
+
+import pytest
+
+from quiz_analysis import analyze_quiz_data_advanced
+from report_service import ReportService, history_summary_json, json_body, quiz_results_json
+
+
+@pytest.fixture
+def service(sample_quiz):
+
+    service = ReportService(sample_quiz, chart_workers=1)
+    yield service
+    service.close()
+
+
+def _request(method, path, body=None, headers=None):
+
+    if body is not None and not isinstance(body, bytes):
+        body = json.dumps(body).encode('utf-8')
+    head = [f"{method} {path} HTTP/1.1", "Host: localhost"]
+    if body is not None:
+        head.append(f"Content-Length: {len(body)}")
+    head.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+
+    return ("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + (body or b'')
+
+
+async def _read_response(reader):
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1')
+        if line in ('\r\n', ''):
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    return status, headers, await reader.readexactly(int(headers['content-length']))
+
+
+async def _exchange(service, requests):
+
+    server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+    async with server:
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        responses = []
+        for request in requests:
+            writer.write(request)
+            await writer.drain()
+            responses.append(await _read_response(reader))
+        writer.close()
+        await writer.wait_closed()
+
+    return responses
+
+
+def _call(service, *requests):
+    """Sends `requests` over one keep-alive connection and returns the responses."""
+
+    return asyncio.run(_exchange(service, requests))
+
+
+def test_routing_and_errors(service):
+
+    responses = _call(
+        service, _request('GET', '/health'), _request('GET', '/metrics'),
+        _request('GET', '/missing'), _request('GET', '/quiz'),
+        _request('POST', '/quiz?format=pdf', {}), _request('POST', '/quiz', b'{not json'),
+        _request('POST', '/quiz', [1, 2]))
+
+    assert [status for status, _, _ in responses] == [200, 200, 404, 405, 400, 400, 400]
+    assert json.loads(responses[0][2]) == {'status': 'ok', 'pending_reports': 0}
+    assert responses[1][1]['content-type'].startswith('text/plain')
+    for _, headers, body in responses[2:]:
+        assert headers['content-type'] == 'application/json'
+        assert 'error' in json.loads(body)
+
+
+def test_oversized_body_is_refused(service):
+
+    (status, headers, _), = _call(
+        service, _request('POST', '/quiz', headers={'Content-Length': 1 << 30}))
+
+    assert status == 413
+    assert headers['connection'] == 'close'
+
+
+def test_quiz_report_matches_the_analysis(service, sample_quiz, sample_submission):
+
+    (json_status, _, json_report), (html_status, headers, html_report) = _call(
+        service, _request('POST', '/quiz?format=json', sample_submission),
+        _request('POST', '/quiz', sample_submission))
+
+    expected = quiz_results_json(analyze_quiz_data_advanced(sample_quiz, sample_submission))
+    assert json_status == 200
+    assert json.loads(json_report) == json.loads(json_body(expected))
+    assert html_status == 200
+    assert headers['content-type'] == 'text/html; charset=utf-8'
+    assert f"{expected['overall_accuracy']:.2f}".encode() in html_report
+
+
+def test_history_report_matches_the_summary(service, sample_history):
+
+    (json_status, _, summary), (html_status, _, html_report), (empty_status, _, _) = _call(
+        service, _request('POST', '/history?format=json', sample_history),
+        _request('POST', '/history', sample_history),
+        _request('POST', '/history?format=json', []))
+
+    assert json_status == 200
+    assert json.loads(summary) == json.loads(json_body(history_summary_json(sample_history)))
+    assert html_status == 200
+    assert b'data:image/png;base64,' in html_report
+    assert empty_status == 400
+
+
+def test_history_reports_over_the_limit_are_refused(sample_quiz, sample_history):
+
+    service = ReportService(sample_quiz, chart_workers=1, max_pending=0)
+    try:
+        (status, headers, _), = _call(service, _request('POST', '/history?format=json', sample_history))
+    finally:
+        service.close()
+
+    assert status == 503
+    assert headers['retry-after'] == '1'
@@ -0,0 +1,51 @@
+# tests/test_timestamps.py
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from timestamps import parse_timestamp, parse_timestamps
+
+# 2025-01-17T10:21:29.859Z written in different offsets and precisions.
+SAME_INSTANT = [
+    "2025-01-17T15:51:29.859+05:30",
+    "2025-01-17T15:51:29.859+0530",
+    "2025-01-17T15:51:29.859000+05:30",
+    "2025-01-17T10:21:29.859Z",
+    "2025-01-17T10:21:29.8590000Z",
+    "2025-01-17T10:21:29.859",
+    "2025-01-17T10:21:29.859+00",
+    "2025-01-17T02:21:29.859-08:00",
+    "2025-01-17T02:21:29.859-0800",
+    " 2025-01-17 02:21:29.859-08 ",
+]
+INSTANT = datetime(2025, 1, 17, 10, 21, 29, 859000, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize('value', SAME_INSTANT)
+def test_offsets_and_precisions(value):
+
+    assert parse_timestamp(value) == INSTANT
+
+
+def test_offset_is_kept():
+
+    parsed = parse_timestamp("2025-01-17T15:51:29.859+05:30")
+
+    assert parsed.utcoffset() == timedelta(hours=5, minutes=30)
+    assert parse_timestamp("2025-01-17T02:21:29-08:00").utcoffset() == timedelta(hours=-8)
+
+
+def test_date_only_is_utc_midnight():
+
+    assert parse_timestamp("2025-01-17") == datetime(2025, 1, 17, tzinfo=timezone.utc)
+
+
+def test_column_matches_one_at_a_time():
+
+    values = SAME_INSTANT + ["2024-02-29T23:59:59.999+05:45", "2023-06-01T00:00:00-03:30"]
+
+    expected = [np.datetime64(parse_timestamp(value).astimezone(timezone.utc)
+                              .replace(tzinfo=None), 'ms') for value in values]
+    assert parse_timestamps(values).tolist() == [value.tolist() for value in expected]
+    assert parse_timestamps([]).dtype == np.dtype('datetime64[ms]')
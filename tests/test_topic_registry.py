@@ -0,0 +1,55 @@
+# tests/test_topic_registry.py
+import json
+
+from attempt_history import AttemptHistory
+from topic_registry import (TopicRegistry, canonical_topic, load_topic_aliases, normalize_topic,
+                            topic_aliases_fingerprint, topic_key)
+
+ALIASES = {'breathing and exchange of gases': "Respiration and Gas Exchange",
+           'respiration and gas exchange': "Respiration and Gas Exchange"}
+
+
+def test_spellings_and_aliases_share_one_key():
+
+    assert normalize_topic("  Cell \t Cycle ") == "cell cycle"
+    assert canonical_topic(" Cell  Cycle ", ALIASES) == "Cell Cycle"
+    assert canonical_topic("BREATHING and exchange of  gases", ALIASES) == "Respiration and Gas Exchange"
+    assert topic_key("Breathing and Exchange of Gases ", ALIASES) == \
+        topic_key("respiration and gas exchange", ALIASES)
+    assert topic_key("Cell Cycle", ALIASES) != topic_key("Cell Division", ALIASES)
+
+
+def test_registry_numbers_canonical_topics_in_order_of_appearance():
+
+    registry = TopicRegistry(["cell cycle ", "Breathing and exchange of gases", "Cell Cycle"], ALIASES)
+
+    assert registry.names == ["cell cycle", "Respiration and Gas Exchange"]
+    assert registry.topic_ids(["CELL CYCLE", "respiration and gas exchange", "Genetics"]).tolist() == \
+        [0, 1, 2]
+    assert registry.get(" Respiration  and Gas Exchange") == 1
+    assert registry.get("Ecology") is None
+    assert len(registry) == 3
+    assert registry.codes() == {"cell cycle": 0, "Respiration and Gas Exchange": 1, "Genetics": 2}
+
+
+def test_aliases_are_read_from_their_file(tmp_path):
+
+    path = tmp_path / 'topic_aliases.json'
+    path.write_text(json.dumps({"Breathing and Exchange of Gases ": "Respiration and Gas Exchange"}))
+
+    assert load_topic_aliases(str(path)) == {
+        'breathing and exchange of gases': "Respiration and Gas Exchange"}
+    assert topic_aliases_fingerprint(str(path)) is not None
+    assert load_topic_aliases(str(tmp_path / 'missing.json')) == {}
+    assert topic_aliases_fingerprint(str(tmp_path / 'missing.json')) is None
+
+
+def test_sample_history_variants_are_merged(sample_history):
+
+    history = AttemptHistory.from_records(sample_history)
+    raw_topics = {record['quiz']['topic'] for record in sample_history}
+
+    assert len(history.topics) < len(raw_topics)
+    assert sorted(history.topics) == sorted({canonical_topic(topic) for topic in raw_topics})
+    assert "Body Fluids and Circulation" in history.topics
+    assert "reproductive health " not in history.topics
@@ -0,0 +1,83 @@
+# timestamps.py
+import datetime
+import re
+from functools import lru_cache
+
+import numpy as np
+
+TIMESTAMP_UNIT = 'datetime64[ms]'
+
+# Trailing UTC offset of an ISO-8601 timestamp: Z, +HH, +HHMM or +HH:MM.
+OFFSET_PATTERN = re.compile(r'(Z|[+-]\d{2}(?::?\d{2})?)$')
+FRACTION_PATTERN = re.compile(r'\.(\d+)')
+
+
+def split_offset(value):
+    """
+    Splits an ISO-8601 timestamp into its local part and its UTC offset in
+    minutes. Timestamps without an offset are taken to be in UTC.
+    """
+
+    value = value.strip()
+    # A date-only value has no time part for the offset to follow.
+    match = OFFSET_PATTERN.search(value) if 'T' in value or ' ' in value else None
+    if match is None:
+        return value, 0
+
+    offset = match.group(1)
+    local = value[:match.start()]
+    if offset == 'Z':
+        return local, 0
+
+    digits = offset[1:].replace(':', '')
+    minutes = int(digits[:2]) * 60 + int(digits[2:4] or 0)
+
+    return local, -minutes if offset[0] == '-' else minutes
+
+
+@lru_cache(maxsize=4096)
+def parse_timestamp(value):
+    """
+    Parses one ISO-8601 timestamp with any UTC offset (or none) into a
+    timezone-aware datetime. Results are cached, since the same timestamps
+    recur across records (e.g. a quiz's start and end times).
+    """
+
+    local, offset_minutes = split_offset(value)
+    # datetime.fromisoformat only accepts 3 or 6 fractional digits before
+    # Python 3.11, so normalize to microseconds.
+    local = FRACTION_PATTERN.sub(
+        lambda match: '.' + match.group(1)[:6].ljust(6, '0'), local, count=1)
+
+    parsed = datetime.datetime.fromisoformat(local)
+    tz = datetime.timezone(datetime.timedelta(minutes=offset_minutes))
+
+    return parsed.replace(tzinfo=tz)
+
+
+def parse_timestamps(values):
+    """
+    Converts a column of ISO-8601 timestamps to UTC `datetime64[ms]` in one
+    pass.
+
+    Offsets are split off with string slicing, the local times are parsed by
+    NumPy's ISO parser in a single call, and each offset is subtracted as a
+    vectorized timedelta, so timestamps from any timezone, with or without
+    fractional seconds, end up on the same UTC axis.
+
+    Args:
+        values (list): ISO-8601 timestamp strings.
+
+    Returns:
+        np.ndarray: The UTC instants as datetime64[ms].
+    """
+
+    if not len(values):
+        return np.empty(0, dtype=TIMESTAMP_UNIT)
+
+    local_parts, offsets = zip(*(split_offset(value) for value in values))
+
+    local_times = np.array(local_parts, dtype=TIMESTAMP_UNIT)
+    offsets = np.array(offsets, dtype='timedelta64[m]')
+
+    return local_times - offsets
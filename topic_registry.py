@@ -0,0 +1,117 @@
+# topic_registry.py
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+TOPIC_ALIASES_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'topic_aliases.json')
+
+
+def normalize_topic(topic):
+    """Folds case and whitespace, so "Cell Cycle " and "cell cycle" compare equal."""
+
+    return " ".join(str(topic).split()).casefold()
+
+
+@lru_cache(maxsize=None)
+def load_topic_aliases(path=TOPIC_ALIASES_FILE):
+    """
+    Returns the topic aliases at `path`, keyed by normalised alias, loading
+    them once per process. The file maps each alias (any spelling, case or
+    spacing) to its canonical topic name; without it there are no aliases.
+    """
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, 'r') as f:
+        aliases = json.load(f)
+
+    return {normalize_topic(alias): canonical for alias, canonical in aliases.items()}
+
+
+def topic_aliases_fingerprint(path=TOPIC_ALIASES_FILE):
+    """Identifies the aliases `TopicRegistry` resolves topics with; None without aliases."""
+
+    aliases = load_topic_aliases(path)
+    if not aliases:
+        return None
+
+    payload = json.dumps(aliases, sort_keys=True, separators=(',', ':'))
+
+    return hashlib.sha256(payload.encode('utf8')).hexdigest()[:16]
+
+
+def canonical_topic(topic, aliases=None):
+    """The canonical name of `topic`: its alias target, or the topic with its whitespace collapsed."""
+
+    if aliases is None:
+        aliases = load_topic_aliases()
+
+    return aliases.get(normalize_topic(topic)) or " ".join(str(topic).split())
+
+
+def topic_key(topic, aliases=None):
+    """The key all spellings and aliases of `topic` share."""
+
+    return normalize_topic(canonical_topic(topic, aliases))
+
+
+class TopicRegistry:
+    """
+    Canonical topics with compact integer ids.
+
+    Raw topic strings are resolved to canonical names (aliases, case and
+    whitespace folded) and numbered 0, 1, 2, ... in order of first
+    appearance, so variants such as "structural organisation in animals "
+    and "Structural Organisation in Animals" share one id. A topic is
+    named after its alias target, or else its first spelling seen. Each
+    raw string is resolved once; aggregation then indexes arrays by id.
+    """
+
+    def __init__(self, topics=(), aliases=None):
+
+        self.names = []
+        self._aliases = load_topic_aliases() if aliases is None else aliases
+        self._ids = {}
+        self._raw_ids = {}
+        for topic in topics:
+            self.topic_id(topic)
+
+    def __len__(self):
+        return len(self.names)
+
+    def topic_id(self, topic):
+        """The id of `topic`, registering it if it is new."""
+
+        topic_id = self._raw_ids.get(topic)
+        if topic_id is None:
+            name = canonical_topic(topic, self._aliases)
+            topic_id = self._ids.setdefault(normalize_topic(name), len(self.names))
+            if topic_id == len(self.names):
+                self.names.append(name)
+            self._raw_ids[topic] = topic_id
+
+        return topic_id
+
+    def topic_ids(self, topics):
+        """The ids of `topics` as an int64 array, registering new ones."""
+
+        return np.fromiter(map(self.topic_id, topics), dtype=np.int64, count=len(topics))
+
+    def get(self, topic):
+        """The id of `topic`, or None if it is not registered."""
+
+        topic_id = self._raw_ids.get(topic)
+        if topic_id is None:
+            topic_id = self._ids.get(topic_key(topic, self._aliases))
+
+        return topic_id
+
+    def codes(self):
+        """Canonical name -> id, in id order."""
+
+        return {name: topic_id for topic_id, name in enumerate(self.names)}